@@ -0,0 +1,474 @@
+"""
+ALMACÉN DE SERIES DE VITALES (almacen_vitales.py)
+─────────────────────────────────────────────────
+enfermeria.py imprimía cada muestra y la perdía. Acá se guardan, y una
+pregunta como "las últimas 24 h del paciente X" se contesta leyendo unos
+pocos KB en vez de 86.400 muestras crudas.
+
+Por paciente (vitales/<id>/):
+
+    crudo/001700000000000.col   bloques en columnas, mapeados en memoria (mmap):
+                                [cabecera][hora f8 x N][bpm f4 x N][spo2 f4 x N]
+                                sólo se agrega al final; lleno → bloque nuevo
+    crudo/dia_20231114.npz      bloques viejos compactados (comprimidos) por día
+    1m.rollup, 1h.rollup        resúmenes por minuto y por hora: registros fijos
+                                de 36 bytes (inicio, n, min/max/media de bpm y SpO2)
+
+Los resúmenes se arman al ingresar (el minuto/hora abierto vive en memoria
+y se escribe al cerrarse), así que consultar 24 h por hora son 24 registros.
+Con resolucion='auto' se elige sola según el rango pedido.
+
+La compactación (en segundo plano) junta los bloques llenos que ya tienen
+más de COMPACTAR_DESPUES segundos en un .npz por día, y borra el crudo
+de más de RETENCION_CRUDO días. Los resúmenes no se borran nunca.
+
+Durabilidad: los mmap se bajan a disco cuando el sistema quiere (o al
+cerrar). Es un monitor, no una historia clínica: un corte de luz puede
+perder los últimos segundos.
+
+Uso:
+    python almacen_vitales.py consultar vitales/ 000123 --horas 24
+    python almacen_vitales.py compactar vitales/
+"""
+
+import argparse
+import datetime
+import glob
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from ingesta_vitales import AnilloAcotado
+
+MUESTRAS_POR_BLOQUE = 4096
+COMPACTAR_DESPUES = 3600
+RETENCION_CRUDO = 7
+MAGICO = b'VITC'
+TAMANIO_CABECERA = 16
+
+NIVELES = {'1m': 60, '1h': 3600}
+RESUMEN = np.dtype([('inicio', '<i8'), ('n', '<u4'),
+                    ('bpm_min', '<f4'), ('bpm_max', '<f4'), ('bpm_media', '<f4'),
+                    ('spo2_min', '<f4'), ('spo2_max', '<f4'), ('spo2_media', '<f4')])
+
+
+def _bloque_vacio(ruta, capacidad=MUESTRAS_POR_BLOQUE):
+    tamanio = TAMANIO_CABECERA + capacidad * 16
+    temporal = ruta + '.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(MAGICO + np.array([1, 0, capacidad], dtype='<u4').tobytes())
+        f.truncate(tamanio)
+    os.replace(temporal, ruta)
+
+
+class Bloque:
+    """Un bloque crudo en columnas, mapeado en memoria."""
+
+    def __init__(self, ruta, modo='r+'):
+        self.ruta = ruta
+        self.mapa = np.memmap(ruta, dtype=np.uint8, mode=modo)
+        if bytes(self.mapa[:4]) != MAGICO:
+            raise ValueError(f"{ruta}: no es un bloque de vitales")
+        self.cabecera = self.mapa[4:TAMANIO_CABECERA].view('<u4')
+        capacidad = int(self.cabecera[2])
+        fin_hora = TAMANIO_CABECERA + capacidad * 8
+        self.hora = self.mapa[TAMANIO_CABECERA:fin_hora].view('<f8')
+        self.bpm = self.mapa[fin_hora:fin_hora + capacidad * 4].view('<f4')
+        self.spo2 = self.mapa[fin_hora + capacidad * 4:fin_hora + capacidad * 8].view('<f4')
+
+    @property
+    def cuenta(self):
+        return int(self.cabecera[1])
+
+    @property
+    def lleno(self):
+        return self.cuenta >= len(self.hora)
+
+    def agregar(self, hora, bpm, spo2):
+        i = int(self.cabecera[1])
+        self.hora[i], self.bpm[i], self.spo2[i] = hora, bpm, spo2
+        # La cuenta se actualiza al final: un lector nunca ve una fila a medias
+        self.cabecera[1] = i + 1
+
+    def columnas(self):
+        n = self.cuenta
+        return self.hora[:n], self.bpm[:n], self.spo2[:n]
+
+    def cerrar(self):
+        if self.mapa.mode != 'r':
+            self.mapa.flush()
+        del self.mapa
+
+
+class Cubeta:
+    """El minuto (u hora) abierto de un paciente, todavía en memoria."""
+    __slots__ = ('inicio', 'n', 'bpm_min', 'bpm_max', 'bpm_suma', 'spo2_min', 'spo2_max', 'spo2_suma')
+
+    def __init__(self, inicio):
+        self.inicio, self.n = inicio, 0
+        self.bpm_min = self.spo2_min = float('inf')
+        self.bpm_max = self.spo2_max = float('-inf')
+        self.bpm_suma = self.spo2_suma = 0.0
+
+    def sumar(self, bpm, spo2):
+        self.n += 1
+        if bpm < self.bpm_min:
+            self.bpm_min = bpm
+        if bpm > self.bpm_max:
+            self.bpm_max = bpm
+        if spo2 < self.spo2_min:
+            self.spo2_min = spo2
+        if spo2 > self.spo2_max:
+            self.spo2_max = spo2
+        self.bpm_suma += bpm
+        self.spo2_suma += spo2
+
+    def registro(self):
+        return np.array([(self.inicio, self.n, self.bpm_min, self.bpm_max, self.bpm_suma / self.n,
+                          self.spo2_min, self.spo2_max, self.spo2_suma / self.n)], dtype=RESUMEN)
+
+
+def _concatenar(partes):
+    if not partes:
+        return np.empty(0, '<f8'), np.empty(0, '<f4'), np.empty(0, '<f4')
+    return tuple(np.concatenate([p[i] for p in partes]) for i in range(3))
+
+
+class SerieVitales:
+    """Todo lo de un paciente. No es segura entre hilos: AlmacenVitales pone el candado."""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.dir_crudo = os.path.join(directorio, 'crudo')
+        self.tardias = 0
+        self.activo = None
+        self.cubetas = {nivel: None for nivel in NIVELES}
+        if not os.path.isdir(self.dir_crudo):
+            # Paciente nuevo: no hay nada que recuperar (con 10.000 pacientes
+            # que aparecen juntos, cada milisegundo acá cuenta)
+            os.makedirs(self.dir_crudo)
+            return
+        bloques = self._bloques()
+        if bloques:
+            self.activo = Bloque(bloques[-1])
+        self._recuperar_cubetas()
+
+    def _bloques(self):
+        return sorted(glob.glob(os.path.join(self.dir_crudo, '*.col')))
+
+    def _dias(self):
+        return sorted(glob.glob(os.path.join(self.dir_crudo, 'dia_*.npz')))
+
+    def _ruta_resumen(self, nivel):
+        return os.path.join(self.directorio, f"{nivel}.rollup")
+
+    def _recuperar_cubetas(self):
+        """Después de reiniciar: rearma el minuto y la hora abiertos desde el crudo."""
+        for nivel, periodo in NIVELES.items():
+            ultimo = self._leer_resumen(nivel)
+            desde = int(ultimo['inicio'][-1]) + periodo if len(ultimo) else 0
+            hora, bpm, spo2 = self.crudo(desde, float('inf'))
+            for t, b, s in zip(hora.tolist(), bpm.tolist(), spo2.tolist()):
+                self._sumar_nivel(nivel, periodo, t, b, s)
+
+    # --- ESCRITURA ---
+
+    def _sumar_nivel(self, nivel, periodo, hora, bpm, spo2):
+        inicio = int(hora // periodo) * periodo
+        cubeta = self.cubetas[nivel]
+        if cubeta is None or inicio > cubeta.inicio:
+            if cubeta is not None:
+                with open(self._ruta_resumen(nivel), 'ab') as f:
+                    f.write(cubeta.registro().tobytes())
+            cubeta = self.cubetas[nivel] = Cubeta(inicio)
+        elif inicio < cubeta.inicio:
+            # Muestra atrasada: queda en el crudo pero su minuto ya se cerró
+            return False
+        cubeta.sumar(bpm, spo2)
+        return True
+
+    def agregar(self, hora, bpm, spo2):
+        if self.activo is None or self.activo.lleno:
+            if self.activo is not None:
+                self.activo.cerrar()
+            # El nombre es la hora de la primera muestra (en ms)
+            inicio = int(hora * 1000)
+            while os.path.exists(os.path.join(self.dir_crudo, f"{inicio:015d}.col")):
+                inicio += 1
+            ruta = os.path.join(self.dir_crudo, f"{inicio:015d}.col")
+            _bloque_vacio(ruta)
+            self.activo = Bloque(ruta)
+        self.activo.agregar(hora, bpm, spo2)
+        for nivel, periodo in NIVELES.items():
+            if not self._sumar_nivel(nivel, periodo, hora, bpm, spo2) and nivel == '1m':
+                self.tardias += 1
+
+    # --- LECTURA ---
+
+    def crudo(self, desde, hasta):
+        """Muestras crudas con desde <= hora < hasta: (hora, bpm, spo2)."""
+        partes = []
+        for ruta in self._dias():
+            dia = datetime.datetime.strptime(os.path.basename(ruta)[4:12], '%Y%m%d').replace(
+                tzinfo=datetime.timezone.utc).timestamp()
+            if dia + 86400 <= desde or dia >= hasta:
+                continue
+            with np.load(ruta) as datos:
+                partes.append((datos['hora'], datos['bpm'], datos['spo2']))
+        bloques = self._bloques()
+        for i, ruta in enumerate(bloques):
+            inicio = int(os.path.basename(ruta).split('.')[0]) / 1000
+            siguiente = (int(os.path.basename(bloques[i + 1]).split('.')[0]) / 1000
+                         if i + 1 < len(bloques) else float('inf'))
+            if siguiente <= desde or inicio >= hasta:
+                continue
+            if self.activo is not None and ruta == self.activo.ruta:
+                partes.append(tuple(np.array(c) for c in self.activo.columnas()))
+            else:
+                bloque = Bloque(ruta, 'r')
+                partes.append(tuple(np.array(c) for c in bloque.columnas()))
+                bloque.cerrar()
+        hora, bpm, spo2 = _concatenar(partes)
+        filtro = (hora >= desde) & (hora < hasta)
+        return hora[filtro], bpm[filtro], spo2[filtro]
+
+    def _leer_resumen(self, nivel):
+        ruta = self._ruta_resumen(nivel)
+        if not os.path.exists(ruta) or not os.path.getsize(ruta):
+            return np.empty(0, dtype=RESUMEN)
+        return np.memmap(ruta, dtype=RESUMEN, mode='r')
+
+    def resumen(self, nivel, desde, hasta):
+        """Registros RESUMEN del nivel ('1m' o '1h') que empiezan en [desde, hasta)."""
+        registros = self._leer_resumen(nivel)
+        # Búsqueda binaria sobre el archivo mapeado: sólo se leen las páginas del rango
+        i, j = np.searchsorted(registros['inicio'], [desde, hasta])
+        partes = [np.array(registros[i:j])]
+        cubeta = self.cubetas[nivel]
+        if cubeta is not None and cubeta.n and desde <= cubeta.inicio < hasta:
+            partes.append(cubeta.registro())
+        return np.concatenate(partes)
+
+    # --- COMPACTACIÓN ---
+
+    def compactar(self, ahora):
+        """Bloques llenos y viejos → un .npz por día; borra el crudo vencido. Retorna bloques compactados."""
+        por_dia = {}
+        for ruta in self._bloques():
+            if self.activo is not None and ruta == self.activo.ruta:
+                continue
+            bloque = Bloque(ruta, 'r')
+            hora, bpm, spo2 = (np.array(c) for c in bloque.columnas())
+            bloque.cerrar()
+            if len(hora) and hora[-1] > ahora - COMPACTAR_DESPUES:
+                continue
+            dias = (hora // 86400).astype(np.int64)
+            for dia in np.unique(dias):
+                filtro = dias == dia
+                por_dia.setdefault(int(dia), []).append((hora[filtro], bpm[filtro], spo2[filtro]))
+            por_dia.setdefault(None, []).append(ruta)
+
+        compactados = por_dia.pop(None, [])
+        for dia, partes in por_dia.items():
+            fecha = datetime.datetime.fromtimestamp(dia * 86400, datetime.timezone.utc)
+            ruta = os.path.join(self.dir_crudo, f"dia_{fecha:%Y%m%d}.npz")
+            if os.path.exists(ruta):
+                with np.load(ruta) as datos:
+                    partes.insert(0, (datos['hora'], datos['bpm'], datos['spo2']))
+            hora, bpm, spo2 = _concatenar(partes)
+            orden = np.argsort(hora, kind='stable')
+            temporal = ruta + '.tmp.npz'
+            np.savez_compressed(temporal, hora=hora[orden], bpm=bpm[orden], spo2=spo2[orden])
+            os.replace(temporal, ruta)
+        # Recién ahora (con los .npz ya escritos) se borran los bloques
+        for ruta in compactados:
+            os.remove(ruta)
+
+        limite = ahora - RETENCION_CRUDO * 86400
+        for ruta in self._dias():
+            dia = datetime.datetime.strptime(os.path.basename(ruta)[4:12], '%Y%m%d').replace(
+                tzinfo=datetime.timezone.utc).timestamp()
+            if dia + 86400 < limite:
+                os.remove(ruta)
+        return len(compactados)
+
+    def cerrar(self):
+        if self.activo is not None:
+            self.activo.cerrar()
+            self.activo = None
+
+
+def _nombre_directorio(id_paciente):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(id_paciente)) or '_'
+
+
+class AlmacenVitales:
+    def __init__(self, raiz):
+        self.raiz = raiz
+        os.makedirs(raiz, exist_ok=True)
+        self.series = {}
+        self.candados = {}
+        self._candado = threading.Lock()
+        self.agregadas = 0
+        self._anillo = None
+        self._escritor = None
+
+    def _serie(self, id_paciente, crear=True):
+        """(serie, candado). Con crear=False, (None, None) si el paciente no tiene datos en disco."""
+        serie = self.series.get(id_paciente)
+        if serie is not None:
+            return serie, self.candados[id_paciente]
+        directorio = os.path.join(self.raiz, _nombre_directorio(id_paciente))
+        if not crear and not os.path.isdir(os.path.join(directorio, 'crudo')):
+            # Una consulta no debe dejar un directorio vacío por cada ID mal tipeado
+            return None, None
+        with self._candado:
+            candado = self.candados.setdefault(id_paciente, threading.Lock())
+        # Abrir una serie toca el disco (mkdir, mmap): se hace sólo con el
+        # candado del paciente, así los pacientes nuevos no frenan a los demás
+        with candado:
+            serie = self.series.get(id_paciente)
+            if serie is None:
+                serie = SerieVitales(directorio)
+                self.series[id_paciente] = serie
+        return serie, candado
+
+    def agregar(self, muestras):
+        """Muestras decodificadas (dicts de formato_vitales.py), de cualquier paciente."""
+        for m in muestras:
+            serie, candado = self._serie(m.get("id_paciente", m.get("id")))
+            with candado:
+                serie.agregar(m["timestamp"], m.get("bpm", np.nan), m.get("spo2", np.nan))
+        self.agregadas += len(muestras)
+
+    def iniciar_escritura(self, capacidad=10000):
+        """
+        Escritura en segundo plano: encolar() sólo deja la lista de muestras
+        en un anillo acotado y un hilo la escribe. Un paciente nuevo cuesta
+        un mkdir y un mmap; con miles que aparecen juntos eso no puede
+        frenar a los trabajadores de la ingesta ni a las alertas.
+        """
+        self._anillo = AnilloAcotado(capacidad, 'descartar')
+        self._escritor = threading.Thread(target=self._escribir, name="almacen-escritura", daemon=True)
+        self._escritor.start()
+        return self
+
+    def encolar(self, muestras):
+        if self._anillo is None:
+            self.agregar(muestras)
+        elif muestras:
+            self._anillo.poner(muestras)
+
+    def _escribir(self):
+        while True:
+            lotes = self._anillo.tomar_lote(64)
+            if not lotes:
+                if self._anillo.cerrado and not len(self._anillo):
+                    return
+                continue
+            for muestras in lotes:
+                self.agregar(muestras)
+
+    @property
+    def descartados(self):
+        """Listas de muestras que no se llegaron a escribir (anillo lleno)."""
+        return self._anillo.descartados if self._anillo is not None else 0
+
+    def consultar(self, id_paciente, desde, hasta=None, resolucion='auto'):
+        """
+        resolucion: 'crudo', '1m', '1h' o 'auto' (crudo hasta 1 h, por minuto
+        hasta 6 h, por hora más allá). Retorna (resolucion, datos): con
+        'crudo' datos = (hora, bpm, spo2); si no, un arreglo RESUMEN. Un
+        paciente sin datos da arreglos vacíos (y no se crea nada en disco).
+        """
+        hasta = time.time() if hasta is None else hasta
+        if resolucion == 'auto':
+            rango = hasta - desde
+            resolucion = 'crudo' if rango <= 3600 else '1m' if rango <= 6 * 3600 else '1h'
+        serie, candado = self._serie(id_paciente, crear=False)
+        if serie is None:
+            return resolucion, _concatenar([]) if resolucion == 'crudo' else np.empty(0, dtype=RESUMEN)
+        with candado:
+            if resolucion == 'crudo':
+                return resolucion, serie.crudo(desde, hasta)
+            return resolucion, serie.resumen(resolucion, desde, hasta)
+
+    def compactar(self, ahora=None):
+        ahora = time.time() if ahora is None else ahora
+        total = 0
+        for id_paciente in list(self.series):
+            serie, candado = self._serie(id_paciente)
+            with candado:
+                total += serie.compactar(ahora)
+        return total
+
+    def iniciar_compactacion(self, cada=600):
+        """Hilo de fondo que compacta cada `cada` segundos."""
+        detener = threading.Event()
+
+        def bucle():
+            while not detener.wait(cada):
+                self.compactar()
+
+        threading.Thread(target=bucle, name="almacen-compactacion", daemon=True).start()
+        return detener
+
+    def abrir_todo(self):
+        """Carga todas las series que hay en disco (para consultar o compactar desde la CLI)."""
+        for nombre in sorted(os.listdir(self.raiz)):
+            if os.path.isdir(os.path.join(self.raiz, nombre, 'crudo')):
+                self._serie(nombre)
+        return self
+
+    def cerrar(self):
+        if self._escritor is not None:
+            # Lo que quedó en el anillo se escribe antes de cerrar
+            self._anillo.cerrar()
+            self._escritor.join()
+        for id_paciente, serie in list(self.series.items()):
+            with self.candados[id_paciente]:
+                serie.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Almacén de series de signos vitales")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    consultar = sub.add_parser('consultar', help="Últimas N horas de un paciente")
+    consultar.add_argument('raiz')
+    consultar.add_argument('paciente')
+    consultar.add_argument('--horas', type=float, default=24)
+    consultar.add_argument('--resolucion', choices=['auto', 'crudo', *NIVELES], default='auto')
+    compactar = sub.add_parser('compactar', help="Compactar ahora los bloques viejos")
+    compactar.add_argument('raiz')
+    args = parser.parse_args()
+
+    almacen = AlmacenVitales(args.raiz)
+    try:
+        if args.comando == 'compactar':
+            print(f"[+] {almacen.abrir_todo().compactar()} bloques compactados.")
+            return
+        ahora = time.time()
+        t0 = time.perf_counter()
+        resolucion, datos = almacen.consultar(args.paciente, ahora - args.horas * 3600, ahora,
+                                              args.resolucion)
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"--- PACIENTE {args.paciente}: últimas {args.horas:g} h ({resolucion}, {ms:.2f} ms) ---")
+        if resolucion == 'crudo':
+            hora, bpm, spo2 = datos
+            for t, b, s in zip(hora[-20:], bpm[-20:], spo2[-20:]):
+                print(f" {datetime.datetime.fromtimestamp(t):%H:%M:%S}  {b:5.0f} BPM  {s:5.1f}% SpO2")
+            print(f"[i] {len(hora)} muestras (se muestran las últimas 20)")
+        else:
+            for r in datos:
+                print(f" {datetime.datetime.fromtimestamp(int(r['inicio'])):%Y-%m-%d %H:%M}  "
+                      f"BPM {r['bpm_min']:3.0f}/{r['bpm_media']:5.1f}/{r['bpm_max']:3.0f}  "
+                      f"SpO2 {r['spo2_min']:3.0f}/{r['spo2_media']:5.1f}/{r['spo2_max']:3.0f}  (n={r['n']})")
+    finally:
+        almacen.cerrar()
+
+
+if __name__ == "__main__":
+    main()
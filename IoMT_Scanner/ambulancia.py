@@ -31,12 +31,23 @@ FLUJO DE EJECUCIÓN:
 [6] Cerrar Conexión            → Liberar recursos
 """
 
-import pydicom
 import sys
 import os
 import glob
-from pynetdicom import AE, debug_logger
-from pynetdicom.sop_class import CTImageStorage as CT_IMAGE_STORAGE
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pynetdicom import AE, debug_logger, _config
+import contextos_dicom
+import indice_dicom
+import manifiesto_envios
+
+# Al pasarle a send_c_store la RUTA (no un Dataset), pynetdicom manda el
+# archivo tal cual, leyéndolo del disco de a un PDU por vez: no decodifica
+# ni carga el pixel data en memoria. Exige un contexto con la misma
+# transfer syntax que el archivo (ver contextos_dicom.py).
+_config.STORE_SEND_CHUNKED_DATASET = True
 
 # ═══════════════════════════════════════════════════════════════════════════
 # OPCIONAL: Descomenta para ver TODOS los detalles técnicos del envío
@@ -71,6 +82,22 @@ ARCHIVO_A_ENVIAR = 'paciente_anonimo.dcm'
     NUEVO: Ahora puedes pasar:
        - Un archivo: python ambulancia.py paciente_anonimo.dcm
        - Una carpeta: python ambulancia.py Anonymized_20260129
+
+    MODO LOTE (series grandes, p. ej. una TC de 500+ cortes):
+       python ambulancia.py Anonymized_20260129 --asociaciones 4
+    → Cada asociación envía MUCHAS imágenes (el handshake se paga una vez)
+      y se abren N asociaciones en paralelo. Ver SECCIÓN 1.2.
+
+    CONTEXTOS (MR, CR, imágenes comprimidas...):
+    → Antes de enviar se leen sólo las cabeceras del lote y se propone un
+      contexto por cada par (clase SOP, transfer syntax) encontrado, así
+      cada archivo viaja tal cual está. Ver contextos_dicom.py.
+      --solo-ct vuelve al comportamiento anterior (sólo CT).
+
+    REANUDAR (ver manifiesto_envios.py):
+    → Lo que el PACS ya confirmó queda anotado por SOP Instance UID; si el
+      envío se corta, la próxima corrida sólo manda lo que falta.
+      --reenviar fuerza el envío completo.
 """
 
 # Dirección del Servidor PACS (Orthanc en Docker)
@@ -120,27 +147,27 @@ def obtener_archivos_dcm(ruta):
     return sorted(archivos)
 
 
-def procesar_archivo_dicom(archivo_dicom, ae, ip_servidor, puerto_servidor, aet_servidor):
+def procesar_archivo_dicom(archivo_dicom, ae, ip_servidor, puerto_servidor, aet_servidor,
+                           fila=None):
     """
     Procesa un archivo DICOM individual:
-    1. Carga el archivo
+    1. Toma sus metadatos del índice (sólo cabecera, ver indice_dicom.py)
     2. Se conecta al PACS
-    3. Envía la imagen
+    3. Envía la imagen (directo desde el disco, sin decodificarla)
     4. Verifica la respuesta
     
     Retorna: True si fue exitoso, False si falló
     """
-    try:
-        # Cargar imagen DICOM
-        ds = pydicom.dcmread(archivo_dicom)
-        print(f"\n[→] Procesando: {archivo_dicom}")
-        print(f"    - ID Paciente: {ds.PatientID}")
-        print(f"    - Tipo de estudio: {ds.Modality if hasattr(ds, 'Modality') else 'Desconocido'}")
-        
-    except Exception as e:
+    if fila is None:
+        fila = indice_dicom.leer_cabecera(os.path.abspath(archivo_dicom))
+    if not fila['valido']:
         print(f"[✗] Error al cargar {archivo_dicom}")
-        print(f"    → {str(e)}")
+        print(f"    → No es un archivo DICOM válido")
         return False
+
+    print(f"\n[→] Procesando: {archivo_dicom}")
+    print(f"    - ID Paciente: {fila['patient_id']}")
+    print(f"    - Tipo de estudio: {fila['modality'] or 'Desconocido'}")
     
     # Establecer conexión DICOM
     try:
@@ -148,7 +175,7 @@ def procesar_archivo_dicom(archivo_dicom, ae, ip_servidor, puerto_servidor, aet_
         
         if assoc.is_established:
             # Enviar imagen usando C-STORE
-            status = assoc.send_c_store(ds)
+            status = assoc.send_c_store(archivo_dicom)
             
             # Verificar respuesta
             if status and status.Status == 0x0000:
@@ -170,114 +197,371 @@ def procesar_archivo_dicom(archivo_dicom, ae, ip_servidor, puerto_servidor, aet_
 
 
 # ═══════════════════════════════════════════════════════════════════════════
-# SECCIÓN 1.2: PARSEAR ARGUMENTOS DE LÍNEA DE COMANDOS
+# SECCIÓN 1.2: MODO LOTE (UNA ASOCIACIÓN, MUCHAS IMÁGENES, N EN PARALELO)
 # ═══════════════════════════════════════════════════════════════════════════
+"""
+¿POR QUÉ?
+─────────
+Abrir una asociación (A-ASSOCIATE) cuesta varios viajes de ida y vuelta y
+negociación. Para 500 cortes de una TC, pagarlo 500 veces cuesta más que
+la transferencia misma. En modo lote:
+
+    asociación 1: [img 1][img 5][img 9] ...   ─┐
+    asociación 2: [img 2][img 6][img 10] ...   ├─► PACS
+    asociación 3: [img 3][img 7][img 11] ...   │
+    asociación 4: [img 4][img 8][img 12] ...  ─┘
+
+Si una imagen falla se reintenta (hasta `reintentos` veces); si la
+asociación se cae, se abre otra y se sigue con la misma imagen. Si el PACS
+rechaza la asociación, se espera cada vez más antes de volver a pedirla.
+"""
 
-if len(sys.argv) > 1:
-    # Si se pasó un argumento, usarlo
-    ARCHIVO_A_ENVIAR = sys.argv[1]
-    print(f"[i] Usando argumento: {ARCHIVO_A_ENVIAR}")
-else:
-    # Si no, usar el valor por defecto
-    print(f"[i] Usando ruta por defecto: {ARCHIVO_A_ENVIAR}")
+# Espera tras una asociación rechazada: 0.5 s, 1 s, 2 s... (se duplica por intento)
+ESPERA_ASOCIACION = 0.5
+
+class ResumenEnvio:
+    def __init__(self):
+        self.exitosos = 0
+        self.fallidos = []
+        self.reintentos = 0
+        self.bytes_enviados = 0
+        self.asociaciones = 0
+        self._lock = threading.Lock()
+
+    def registrar(self, archivo, exito, tamanio=0):
+        with self._lock:
+            if exito:
+                self.exitosos += 1
+                self.bytes_enviados += tamanio
+            else:
+                self.fallidos.append(archivo)
 
-print("\n" + "=" * 80)
-print("--- INICIANDO PROTOCOLO DE TRANSMISIÓN DICOM (C-STORE) ---")
-print("=" * 80)
+    def sumar(self, campo, cantidad=1):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + cantidad)
 
-# ═══════════════════════════════════════════════════════════════════════════
-# SECCIÓN 2: OBTENER LISTA DE ARCHIVOS DICOM A PROCESAR
-# ═══════════════════════════════════════════════════════════════════════════
 
-archivos_dicom = obtener_archivos_dcm(ARCHIVO_A_ENVIAR)
-cantidad_archivos = len(archivos_dicom)
+def crear_ae(contextos=None):
+    """
+    AE para el modo lote: igual que el de la SECCIÓN 3. Con `contextos`
+    (pares del pre-escaneo, ver contextos_dicom.py) se propone exactamente
+    uno por par; sin ellos, sólo CT como antes.
+    """
+    ae = AE()
+    contextos_dicom.agregar_contextos(ae, contextos or contextos_dicom.CONTEXTOS_SOLO_CT)
+    return ae
+
 
-print(f"\n[i] Archivos DICOM encontrados: {cantidad_archivos}")
-if cantidad_archivos <= 5:
-    for archivo in archivos_dicom:
-        print(f"    - {archivo}")
-else:
-    for archivo in archivos_dicom[:3]:
+def enviar_por_asociacion(archivos, ip_servidor, puerto_servidor, aet_servidor,
+                          reintentos, resumen, contextos=None, al_confirmar=None):
+    """
+    Envía una lista de archivos por UNA asociación (reabriéndola sólo si se
+    cae). Corre dentro de un hilo del pool: cada hilo tiene su propio AE.
+    `al_confirmar(archivo)` se llama apenas el PACS acepta cada imagen.
+    """
+    ae = crear_ae(contextos)
+    assoc = None
+    try:
+        for archivo in archivos:
+            exito = False
+            # El tamaño se toma ANTES de enviar: si el archivo desaparece
+            # después, un stat fallido no puede tirar abajo el lote
+            try:
+                tamanio = os.path.getsize(archivo)
+            except OSError:
+                tamanio = 0
+            for intento in range(reintentos + 1):
+                if intento:
+                    resumen.sumar('reintentos')
+                try:
+                    if assoc is None or not assoc.is_established:
+                        assoc = ae.associate(ip_servidor, puerto_servidor, ae_title=aet_servidor)
+                        resumen.sumar('asociaciones')
+                        if not assoc.is_established:
+                            # Rechazada o sin respuesta: el PACS suele estar
+                            # saturado, reintentar enseguida sólo lo empeora
+                            assoc = None
+                            if intento < reintentos:
+                                time.sleep(ESPERA_ASOCIACION * 2 ** intento)
+                            continue
+                    status = assoc.send_c_store(archivo)
+                    if status and status.Status == 0x0000:
+                        exito = True
+                        break
+                except Exception as e:
+                    print(f"    [✗] {os.path.basename(archivo)}: {e}")
+            resumen.registrar(archivo, exito, tamanio if exito else 0)
+            if exito and al_confirmar:
+                al_confirmar(archivo)
+            if not exito:
+                print(f"    [✗] {os.path.basename(archivo)}: falló tras {reintentos + 1} intentos")
+    finally:
+        if assoc is not None and assoc.is_established:
+            assoc.release()
+
+
+def enviar_lote(archivos, ip_servidor, puerto_servidor, aet_servidor,
+                asociaciones=4, reintentos=2, contextos=None, al_confirmar=None):
+    """
+    Reparte los archivos entre `asociaciones` hilos (en forma circular, para
+    que cada uno reciba una mezcla de tamaños) y retorna (ResumenEnvio, segundos).
+    """
+    resumen = ResumenEnvio()
+    asociaciones = max(1, min(asociaciones, len(archivos)))
+    porciones = [archivos[i::asociaciones] for i in range(asociaciones)]
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=asociaciones) as pool:
+        tareas = [pool.submit(enviar_por_asociacion, porcion, ip_servidor, puerto_servidor,
+                              aet_servidor, reintentos, resumen, contextos, al_confirmar)
+                  for porcion in porciones]
+        for tarea in tareas:
+            tarea.result()
+    return resumen, time.perf_counter() - t0
+
+
+def imprimir_resumen_lote(resumen, segundos):
+    print(f"\n\n" + "=" * 80)
+    print("--- RESUMEN DE TRANSMISIÓN (MODO LOTE) ---")
+    print("=" * 80)
+    print(f"Total procesados: {resumen.exitosos + len(resumen.fallidos)}")
+    print(f"[✓] Exitosos:    {resumen.exitosos}")
+    print(f"[✗] Fallidos:    {len(resumen.fallidos)}")
+    print(f"    Reintentos:   {resumen.reintentos}")
+    print(f"    Asociaciones: {resumen.asociaciones}")
+    print(f"    Tiempo:       {segundos:.2f} s")
+    if segundos > 0:
+        print(f"    Velocidad:    {resumen.exitosos / segundos:.1f} imágenes/s | "
+              f"{resumen.bytes_enviados / 1e6 / segundos:.2f} MB/s")
+    for archivo in resumen.fallidos[:10]:
         print(f"    - {archivo}")
-    print(f"    ... y {cantidad_archivos - 3} archivos más")
+
 
 # ═══════════════════════════════════════════════════════════════════════════
-# SECCIÓN 3: CREAR LA "APLICACIÓN DICOM" (AE = Application Entity)
+# SECCIÓN 1.3: PARSEAR ARGUMENTOS DE LÍNEA DE COMANDOS
 # ═══════════════════════════════════════════════════════════════════════════
-"""
-PASO 2: DEFINIR QUIÉN ERES TÚ EN LA RED DICOM
-──────────────────────────────────────────────
-Una "Aplicación DICOM" es cualquier software/máquina que habla DICOM:
-  - Una tomografía
-  - Una resonancia
-  - Un servidor PACS
-  - Un script Python (como este)
-
-El AE (Application Entity) de tu script puede tener cualquier nombre.
-En pynetdicom, por defecto es 'PYNETDICOM' pero podría ser 'MI_SCRIPT', etc.
-
-¿QUÉ SIGNIFICA add_requested_context?
-→ Le dices al servidor: "Yo puedo enviar imágenes CTImageStorage"
-→ Es como decir: "Tengo una tomografía para guardar"
-
-CTImageStorage = Imágenes de TAC/Tomografía
-Otros ejemplos:
-  - RTImageStorage = Imágenes de Radioterapia
-  - MRImageStorage = Imágenes de Resonancia Magnética
-  - XCImageStorage = Radiografías
-"""
 
-print("\n[.] Preparando comunicación DICOM...")
+def main():
+    global IP_SERVIDOR, PUERTO_SERVIDOR, AET_SERVIDOR, ARCHIVO_A_ENVIAR
+
+    parser = argparse.ArgumentParser(description="Envío de imágenes DICOM al PACS (C-STORE)")
+    parser.add_argument('ruta', nargs='?', help="Archivo .dcm o carpeta")
+    parser.add_argument('--ip', default=IP_SERVIDOR)
+    parser.add_argument('--puerto', type=int, default=PUERTO_SERVIDOR)
+    parser.add_argument('--aet', default=AET_SERVIDOR)
+    parser.add_argument('--asociaciones', type=int, default=0,
+                        help="Modo lote: N asociaciones en paralelo, muchas imágenes por asociación")
+    parser.add_argument('--reintentos', type=int, default=2, help="Reintentos por archivo (modo lote)")
+    parser.add_argument('--solo-ct', action='store_true',
+                        help="No pre-escanear: proponer sólo CT con las sintaxis por defecto")
+    parser.add_argument('--reenviar', action='store_true',
+                        help="Ignorar el manifiesto y mandar todo de nuevo")
+    parser.add_argument('--sin-manifiesto', action='store_true',
+                        help="No consultar ni actualizar el manifiesto de envíos")
+    parser.add_argument('--sin-indice', action='store_true',
+                        help="Leer todas las cabeceras sin usar ni actualizar el índice")
+    args = parser.parse_args()
+    IP_SERVIDOR, PUERTO_SERVIDOR, AET_SERVIDOR = args.ip, args.puerto, args.aet
+
+    if args.ruta:
+        # Si se pasó un argumento, usarlo
+        ARCHIVO_A_ENVIAR = args.ruta
+        print(f"[i] Usando argumento: {ARCHIVO_A_ENVIAR}")
+    else:
+        # Si no, usar el valor por defecto
+        print(f"[i] Usando ruta por defecto: {ARCHIVO_A_ENVIAR}")
 
-# Crear una aplicación DICOM (nosotros somos una "máquina médica" simulada)
-ae = AE()
+    print("\n" + "=" * 80)
+    print("--- INICIANDO PROTOCOLO DE TRANSMISIÓN DICOM (C-STORE) ---")
+    print("=" * 80)
 
-# Declarar: "Soy capaz de ENVIAR imágenes de Tomografía"
-ae.add_requested_context(CT_IMAGE_STORAGE)
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SECCIÓN 2: OBTENER LISTA DE ARCHIVOS DICOM A PROCESAR
+    # ═══════════════════════════════════════════════════════════════════════════
 
-print(f"[✓] Aplicación DICOM creada")
-print(f"    - Puedo enviar: CT (Tomografía)")
+    archivos_dicom = obtener_archivos_dcm(ARCHIVO_A_ENVIAR)
+    cantidad_archivos = len(archivos_dicom)
 
-# ═══════════════════════════════════════════════════════════════════════════
-# SECCIÓN 4: PROCESAR TODOS LOS ARCHIVOS DICOM
-# ═══════════════════════════════════════════════════════════════════════════
-"""
-PASO 3: CONECTAR Y ENVIAR CADA IMAGEN
-──────────────────────────────────────
-Iteramos sobre cada archivo DICOM encontrado y lo procesamos.
-"""
+    print(f"\n[i] Archivos DICOM encontrados: {cantidad_archivos}")
+    if cantidad_archivos <= 5:
+        for archivo in archivos_dicom:
+            print(f"    - {archivo}")
+    else:
+        for archivo in archivos_dicom[:3]:
+            print(f"    - {archivo}")
+        print(f"    ... y {cantidad_archivos - 3} archivos más")
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SECCIÓN 2.1: ÍNDICE DE CABECERAS Y CONTEXTOS (ver indice_dicom.py)
+    # ═══════════════════════════════════════════════════════════════════════════
+    # Leemos sólo la cabecera de los archivos nuevos o modificados; el resto
+    # sale del índice. Con eso sabemos qué pares (clase SOP, transfer syntax)
+    # hay en el lote para proponer exactamente esos.
+
+    t0 = time.perf_counter()
+    with indice_dicom.IndiceDICOM(None if args.sin_indice else indice_dicom.ARCHIVO_INDICE) as indice:
+        filas = indice.actualizar(archivos_dicom)
+        print(f"\n[i] Índice: {indice.leidos} cabeceras leídas, {indice.sin_cambios} sin cambios "
+              f"({(time.perf_counter() - t0) * 1000:.0f} ms)")
+
+    ilegibles = [ruta for ruta, fila in filas.items() if not fila['valido']]
+    if ilegibles:
+        # No se pueden mandar: cuentan como fallidos (el lote no está completo)
+        print(f"[!] {len(ilegibles)} archivos sin cabecera DICOM válida (fallidos):")
+        for archivo in ilegibles[:5]:
+            print(f"    - {archivo}")
+    # Un archivo que se borró entre el listado y el índice no tiene fila:
+    # no se puede mandar y cuenta como fallido
+    desaparecidos = [archivo for archivo in archivos_dicom if os.path.abspath(archivo) not in filas]
+    if desaparecidos:
+        print(f"[!] {len(desaparecidos)} archivos desaparecieron antes de indexarlos (fallidos):")
+        for archivo in desaparecidos[:5]:
+            print(f"    - {archivo}")
+    # De acá en adelante todo archivo de la lista tiene su fila en `filas`
+    archivos_dicom = [archivo for archivo in archivos_dicom
+                      if filas.get(os.path.abspath(archivo), {}).get('valido')]
+    cantidad_archivos = len(archivos_dicom)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SECCIÓN 2.2: MANIFIESTO (REANUDAR SIN DUPLICAR, ver manifiesto_envios.py)
+    # ═══════════════════════════════════════════════════════════════════════════
+    # Las instancias que este PACS ya confirmó se saltean por SOP Instance UID
+    # (sale del índice, no se abre ningún archivo).
+
+    manifiesto = None
+    al_confirmar = None
+    if not args.sin_manifiesto:
+        manifiesto = manifiesto_envios.ManifiestoEnvios(
+            manifiesto_envios.nombre_destino(IP_SERVIDOR, PUERTO_SERVIDOR, AET_SERVIDOR))
+        if args.reenviar:
+            manifiesto.olvidar()
+        archivos_dicom, ya_confirmados, duplicados = manifiesto_envios.pendientes(
+            archivos_dicom, filas, manifiesto.confirmados())
+        cantidad_archivos = len(archivos_dicom)
+        if ya_confirmados or duplicados:
+            print(f"[i] Manifiesto ({manifiesto.destino}): {len(ya_confirmados)} ya confirmadas, "
+                  f"{len(duplicados)} duplicadas en el lote → quedan {cantidad_archivos}")
+
+        def al_confirmar(archivo):
+            fila = filas.get(os.path.abspath(archivo))
+            if fila is not None:
+                manifiesto.registrar(fila['sop_instance_uid'], archivo)
+
+    contextos = None
+    if not args.solo_ct:
+        pares = contextos_dicom.pares_de({archivo: filas[os.path.abspath(archivo)]
+                                          for archivo in archivos_dicom})
+        contextos = contextos_dicom.contextos_necesarios(pares.values())
+        print(f"[i] Contextos a proponer: {len(contextos)}")
+        for linea in contextos_dicom.describir(contextos):
+            print(linea)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # MODO LOTE: salta las secciones 3 a 5 (cada hilo crea su propio AE)
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    if args.asociaciones:
+        print(f"\n[.] Modo lote: {args.asociaciones} asociaciones en paralelo con "
+              f"{IP_SERVIDOR}:{PUERTO_SERVIDOR}...")
+        resumen, segundos = enviar_lote(archivos_dicom, IP_SERVIDOR, PUERTO_SERVIDOR, AET_SERVIDOR,
+                                        args.asociaciones, args.reintentos, contextos, al_confirmar)
+        resumen.fallidos.extend(desaparecidos + ilegibles)
+        imprimir_resumen_lote(resumen, segundos)
+        return 1 if resumen.fallidos else 0
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SECCIÓN 3: CREAR LA "APLICACIÓN DICOM" (AE = Application Entity)
+    # ═══════════════════════════════════════════════════════════════════════════
+    """
+    PASO 2: DEFINIR QUIÉN ERES TÚ EN LA RED DICOM
+    ──────────────────────────────────────────────
+    Una "Aplicación DICOM" es cualquier software/máquina que habla DICOM:
+      - Una tomografía
+      - Una resonancia
+      - Un servidor PACS
+      - Un script Python (como este)
+
+    El AE (Application Entity) de tu script puede tener cualquier nombre.
+    En pynetdicom, por defecto es 'PYNETDICOM' pero podría ser 'MI_SCRIPT', etc.
+
+    ¿QUÉ SIGNIFICA add_requested_context?
+    → Le dices al servidor: "Yo puedo enviar imágenes CTImageStorage"
+    → Es como decir: "Tengo una tomografía para guardar"
+
+    CTImageStorage = Imágenes de TAC/Tomografía
+    Otros ejemplos:
+      - RTImageStorage = Imágenes de Radioterapia
+      - MRImageStorage = Imágenes de Resonancia Magnética
+      - XCImageStorage = Radiografías
+    """
 
-print(f"\n[.] Conectando con PACS en {IP_SERVIDOR}:{PUERTO_SERVIDOR}...")
-print(f"    (Si se cuelga aquí, el servidor PACS no está disponible)")
+    print("\n[.] Preparando comunicación DICOM...")
 
-exitosos = 0
-fallidos = 0
+    # Crear una aplicación DICOM (nosotros somos una "máquina médica" simulada)
+    ae = AE()
 
-for idx, archivo in enumerate(archivos_dicom, 1):
-    print(f"\n[{idx}/{cantidad_archivos}]", end=" ")
-    
-    if procesar_archivo_dicom(archivo, ae, IP_SERVIDOR, PUERTO_SERVIDOR, AET_SERVIDOR):
-        exitosos += 1
+    if contextos:
+        # Declarar: "Soy capaz de ENVIAR exactamente lo que hay en el lote"
+        contextos_dicom.agregar_contextos(ae, contextos)
+        print(f"[✓] Aplicación DICOM creada")
+        print(f"    - Puedo enviar: {len(contextos)} combinaciones clase/sintaxis (ver arriba)")
     else:
-        fallidos += 1
+        # Declarar: "Soy capaz de ENVIAR imágenes de Tomografía"
+        # (una sintaxis por contexto: el envío desde disco exige coincidencia exacta)
+        contextos_dicom.agregar_contextos(ae, contextos_dicom.CONTEXTOS_SOLO_CT)
+
+        print(f"[✓] Aplicación DICOM creada")
+        print(f"    - Puedo enviar: CT (Tomografía)")
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SECCIÓN 4: PROCESAR TODOS LOS ARCHIVOS DICOM
+    # ═══════════════════════════════════════════════════════════════════════════
+    """
+    PASO 3: CONECTAR Y ENVIAR CADA IMAGEN
+    ──────────────────────────────────────
+    Iteramos sobre cada archivo DICOM encontrado y lo procesamos.
+    """
+
+    print(f"\n[.] Conectando con PACS en {IP_SERVIDOR}:{PUERTO_SERVIDOR}...")
+    print(f"    (Si se cuelga aquí, el servidor PACS no está disponible)")
+
+    exitosos = 0
+    fallidos = len(desaparecidos) + len(ilegibles)
+
+    for idx, archivo in enumerate(archivos_dicom, 1):
+        print(f"\n[{idx}/{cantidad_archivos}]", end=" ")
+
+        if procesar_archivo_dicom(archivo, ae, IP_SERVIDOR, PUERTO_SERVIDOR, AET_SERVIDOR,
+                                  filas.get(os.path.abspath(archivo))):
+            exitosos += 1
+            if al_confirmar:
+                al_confirmar(archivo)
+        else:
+            fallidos += 1
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SECCIÓN 5: RESUMEN FINAL
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    print(f"\n\n" + "=" * 80)
+    print("--- RESUMEN DE TRANSMISIÓN ---")
+    print("=" * 80)
+    print(f"Total procesados: {cantidad_archivos + len(desaparecidos) + len(ilegibles)}")
+    print(f"[✓] Exitosos:    {exitosos}")
+    print(f"[✗] Fallidos:    {fallidos}")
+
+    if fallidos == 0:
+        print(f"\n[✓✓✓] ¡TODAS LAS IMÁGENES FUERON ENVIADAS EXITOSAMENTE! ✓✓✓")
+        print(f"    → Las imágenes están disponibles en: http://127.0.0.1:8042")
+    else:
+        print(f"\n[!] Algunas imágenes no pudieron ser procesadas.")
+        print(f"    → Verifica que el servidor PACS esté disponible")
+        print(f"    → Intenta nuevamente: python ambulancia.py {ARCHIVO_A_ENVIAR}")
+
+    print("\n" + "=" * 80)
+    # Mismo código de salida que el modo lote: 1 si algo no llegó
+    return 1 if fallidos else 0
 
-# ═══════════════════════════════════════════════════════════════════════════
-# SECCIÓN 5: RESUMEN FINAL
-# ═══════════════════════════════════════════════════════════════════════════
 
-print(f"\n\n" + "=" * 80)
-print("--- RESUMEN DE TRANSMISIÓN ---")
-print("=" * 80)
-print(f"Total procesados: {cantidad_archivos}")
-print(f"[✓] Exitosos:    {exitosos}")
-print(f"[✗] Fallidos:    {fallidos}")
-
-if fallidos == 0:
-    print(f"\n[✓✓✓] ¡TODAS LAS IMÁGENES FUERON ENVIADAS EXITOSAMENTE! ✓✓✓")
-    print(f"    → Las imágenes están disponibles en: http://127.0.0.1:8042")
-else:
-    print(f"\n[!] Algunas imágenes no pudieron ser procesadas.")
-    print(f"    → Verifica que el servidor PACS esté disponible")
-    print(f"    → Intenta nuevamente: python ambulancia.py {ARCHIVO_A_ENVIAR}")
-
-print("\n" + "=" * 80)
+if __name__ == "__main__":
+    sys.exit(main())
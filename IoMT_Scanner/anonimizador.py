@@ -0,0 +1,368 @@
+"""
+ANONIMIZADOR DICOM EN LOTE (anonimizador.py)
+────────────────────────────────────────────
+medico.py censura UN archivo de prueba pisando tres tags. Para
+des-identificar archivos de estudios completos hace falta lo mismo, pero:
+
+  - Con un PERFIL configurable (JSON): tags a borrar, a reemplazar por un
+    valor fijo y a reemplazar por un hash (seudónimo estable).
+  - Con los UIDs (Study/Series/SOP Instance...) remapeados de forma
+    CONSISTENTE: el mismo UID original → el mismo UID nuevo, en todos los
+    archivos y en todos los procesos, sin estado compartido (el UID nuevo
+    se deriva del original + la sal del perfil). Así el estudio sigue
+    armado: las series apuntan al estudio correcto.
+  - En paralelo (pool de procesos) y con memoria plana: la carpeta se
+    recorre de a poco y nunca hay más de unos pocos lotes en vuelo.
+  - Sin decodificar el pixel data: se copian los bytes tal cual (no se
+    descomprime un JPEG ni se toca un píxel).
+  - Con --streaming, ni siquiera se carga: reescritor_dicom.py copia el
+    archivo elemento por elemento y el pixel data va de disco a disco
+    (memoria constante aunque la imagen pese 1 GB). Sólo reescribe el
+    nivel superior: si una secuencia tiene UIDs del perfil o tags privados
+    adentro, o si la transfer syntax no se puede, ese archivo cae al modo
+    normal (la salida es la misma con o sin --streaming).
+
+Uso:
+    python anonimizador.py Estudios/ Anonymized_20260129/
+    python anonimizador.py Estudios/ salida/ --perfil mi_perfil.json --procesos 8
+    python anonimizador.py Estudios/ salida/ --verificar    # + auditor.py sobre la salida
+    python anonimizador.py --mostrar-perfil > mi_perfil.json   # punto de partida
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pydicom
+from pydicom.datadict import dictionary_VR, keyword_for_tag, tag_for_keyword
+
+import reescritor_dicom
+
+from indice_dicom import IndiceDICOM, fila_desde_dataset, leer_cabecera, recorrer_dcm
+
+# Perfil por defecto: lo de medico.py (nombre, ID y comentarios) más los
+# identificadores directos habituales.
+PERFIL_BASICO = {
+    # Cambiar antes de usarlo en serio: con la sal se pueden recalcular los hashes
+    "sal": "iomt-lab",
+    "eliminar": [
+        "PatientBirthDate", "PatientBirthTime", "PatientAddress",
+        "PatientTelephoneNumbers", "OtherPatientIDs", "OtherPatientNames",
+        "PatientMotherBirthName", "MilitaryRank", "EthnicGroup",
+        "ReferringPhysicianName", "PerformingPhysicianName", "OperatorsName",
+        "InstitutionName", "InstitutionAddress", "StationName",
+        "DeviceSerialNumber", "RequestingPhysician",
+    ],
+    "reemplazar": {
+        "PatientName": "ANONIMO",
+        # Sin nombres: el texto de reemplazo también pasa por la auditoría
+        # (detector_phi.py marcaría "Ing. Emanuel" como nombre)
+        "ImageComments": "ANONIMIZADO",
+    },
+    "hash": ["PatientID", "AccessionNumber", "StudyID"],
+    "uids": [
+        "StudyInstanceUID", "SeriesInstanceUID", "SOPInstanceUID",
+        "FrameOfReferenceUID", "ReferencedSOPInstanceUID",
+    ],
+    "eliminar_privados": True,
+}
+
+# Archivos por tarea: amortiza el ida y vuelta al proceso hijo
+ARCHIVOS_POR_LOTE = 32
+# Lotes en vuelo por proceso: acota la memoria sin dejar procesos ociosos
+LOTES_EN_VUELO = 4
+
+_perfil = None
+_streaming = False
+
+
+def cargar_perfil(ruta=None):
+    perfil = dict(PERFIL_BASICO)
+    if ruta:
+        with open(ruta, encoding='utf-8') as f:
+            perfil.update(json.load(f))
+    return perfil
+
+
+def seudonimo(valor, sal, largo=16):
+    """Hash estable y corto: el mismo paciente siempre da el mismo seudónimo."""
+    return hashlib.sha256(f"{sal}|{valor}".encode('utf-8')).hexdigest()[:largo].upper()
+
+
+def remapear_uid(uid, sal):
+    """
+    UID nuevo (raíz 2.25 + entero de 128 bits) derivado del original:
+    consistente entre archivos y procesos. Ojo: generate_uid(prefix=None)
+    ignora entropy_srcs y da uno al azar, por eso lo armamos a mano.
+    """
+    digest = hashlib.sha256(f"{sal}|{uid}".encode('ascii')).digest()[:16]
+    return f"2.25.{int.from_bytes(digest, 'big')}"
+
+
+def _remapear_uids(ds, uids, sal):
+    """
+    Recorre el dataset (y sus secuencias) remapeando los UIDs del perfil.
+    Mira el VR en el elemento CRUDO: así el pixel data diferido ni se lee.
+    """
+    for tag in list(ds.keys()):
+        crudo = ds.get_item(tag)
+        vr = crudo.VR
+        if vr is None:
+            # VR implícito: sale del diccionario (los privados desconocidos se saltean)
+            try:
+                vr = dictionary_VR(tag)
+            except KeyError:
+                continue
+        if vr == 'SQ':
+            for item in ds[tag].value:
+                _remapear_uids(item, uids, sal)
+        elif vr == 'UI' and keyword_for_tag(tag) in uids:
+            elemento = ds[tag]
+            if not elemento.value:
+                continue
+            if elemento.VM > 1:
+                elemento.value = [remapear_uid(uid, sal) for uid in elemento.value]
+            else:
+                elemento.value = remapear_uid(elemento.value, sal)
+
+
+def anonimizar_dataset(ds, perfil):
+    sal = perfil['sal']
+
+    for palabra in perfil['eliminar']:
+        if palabra in ds:
+            delattr(ds, palabra)
+    for palabra, valor in perfil['reemplazar'].items():
+        if palabra in ds:
+            setattr(ds, palabra, valor)
+    for palabra in perfil['hash']:
+        if palabra in ds and ds.data_element(palabra).value:
+            setattr(ds, palabra, seudonimo(ds.data_element(palabra).value, sal))
+    if perfil.get('eliminar_privados'):
+        ds.remove_private_tags()
+
+    _remapear_uids(ds, set(perfil['uids']), sal)
+
+    if 'SOPInstanceUID' in ds:
+        ds.file_meta.MediaStorageSOPInstanceUID = ds.SOPInstanceUID
+
+
+def _inicializar(perfil, streaming=False):
+    global _perfil, _streaming
+    _perfil, _streaming = perfil, streaming
+
+
+def anonimizar_archivo(origen, destino, perfil):
+    """
+    Anonimiza un archivo. Retorna (bytes_escritos, fila_indice) o lanza excepción.
+    defer_size: los valores grandes (el pixel data) no se leen al parsear;
+    pydicom los copia crudos del archivo original recién al escribir.
+    """
+    ds = pydicom.dcmread(origen, defer_size='64 KB')
+    anonimizar_dataset(ds, perfil)
+    os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+    ds.save_as(destino, enforce_file_format=True)
+    return os.path.getsize(destino), fila_desde_dataset(ds, os.path.abspath(destino))
+
+
+def transformador_streaming(perfil):
+    """
+    Traduce el perfil a las funciones de reescritor_dicom.reescribir().
+    Retorna (transformar, transformar_meta, revisar_anidado).
+    """
+    sal = perfil['sal']
+    eliminar = {tag_for_keyword(p) for p in perfil['eliminar']} - {None}
+    reemplazar = {tag_for_keyword(p): v for p, v in perfil['reemplazar'].items()}
+    hashear = {tag_for_keyword(p) for p in perfil['hash']} - {None}
+    uids = {tag_for_keyword(p) for p in perfil['uids']} - {None}
+    tag_sop_instance = tag_for_keyword('SOPInstanceUID')
+    nuevo_sop_instance = []
+
+    def transformar(tag, vr, leer_valor):
+        if tag in eliminar or (perfil.get('eliminar_privados') and (tag >> 16) % 2):
+            return None
+        if tag in reemplazar:
+            return str(reemplazar[tag]).encode('latin-1', errors='replace')
+        if tag in hashear:
+            valor = reescritor_dicom.texto(leer_valor())
+            return seudonimo(valor, sal).encode('ascii') if valor else reescritor_dicom.MANTENER
+        if tag in uids:
+            valores = reescritor_dicom.texto(leer_valor())
+            if not valores:
+                return reescritor_dicom.MANTENER
+            nuevo = '\\'.join(remapear_uid(uid, sal) for uid in valores.split('\\'))
+            if tag == tag_sop_instance:
+                nuevo_sop_instance.append(nuevo)
+            return nuevo.encode('ascii')
+        return reescritor_dicom.MANTENER
+
+    def transformar_meta(meta):
+        if not nuevo_sop_instance:
+            return meta
+        return reescritor_dicom.reemplazar_meta(
+            meta, reescritor_dicom.TAG_MEDIA_SOP_INSTANCE, 'UI', nuevo_sop_instance[-1].encode('ascii'))
+
+    def revisar_anidado(tag):
+        # Lo que anonimizar_dataset() también cambia dentro de las secuencias
+        return tag in uids or (perfil.get('eliminar_privados') and (tag >> 16) % 2)
+
+    return transformar, transformar_meta, revisar_anidado
+
+
+def anonimizar_archivo_streaming(origen, destino, perfil):
+    """
+    Igual que anonimizar_archivo() pero sin armar el dataset: memoria
+    constante. Si el archivo no se puede reescribir en streaming (big
+    endian, deflate, secuencias con UIDs o privados a cambiar, un archivo
+    que el reescritor no sabe recorrer), usa el camino normal: la salida
+    tiene que ser la misma (ver benchmark_reescritura.py --comparar).
+    """
+    os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+    transformar, transformar_meta, revisar_anidado = transformador_streaming(perfil)
+    try:
+        tamanio = reescritor_dicom.reescribir(origen, destino, transformar, transformar_meta, revisar_anidado)
+    except reescritor_dicom.ErrorReescritura:
+        return anonimizar_archivo(origen, destino, perfil)
+    return tamanio, leer_cabecera(os.path.abspath(destino))
+
+
+def _procesar_lote(pares):
+    """Corre en el proceso hijo. Retorna [(origen, bytes, fila, error)]."""
+    resultados = []
+    for origen, destino in pares:
+        try:
+            if _streaming:
+                tamanio, fila = anonimizar_archivo_streaming(origen, destino, _perfil)
+            else:
+                tamanio, fila = anonimizar_archivo(origen, destino, _perfil)
+            resultados.append((origen, tamanio, fila, None))
+        except Exception as e:
+            resultados.append((origen, 0, None, f"{type(e).__name__}: {e}"))
+    return resultados
+
+
+def _lotes(origen, destino):
+    lote = []
+    for ruta in recorrer_dcm(origen):
+        lote.append((ruta, os.path.join(destino, os.path.relpath(ruta, origen))))
+        if len(lote) == ARCHIVOS_POR_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class ResumenAnonimizacion:
+    def __init__(self):
+        self.exitosos = 0
+        self.fallidos = []
+        self.bytes_escritos = 0
+        self.segundos = 0.0
+
+    def imprimir(self):
+        total = self.exitosos + len(self.fallidos)
+        print("\n--- RESUMEN DE ANONIMIZACIÓN ---")
+        print(f" Procesados:  {total}")
+        print(f" [✓] Exitosos: {self.exitosos}")
+        print(f" [✗] Fallidos: {len(self.fallidos)}")
+        print(f" Tiempo:      {self.segundos:.2f} s")
+        if self.segundos:
+            print(f" Velocidad:   {total / self.segundos:.1f} archivos/s | "
+                  f"{self.bytes_escritos / 1e6 / self.segundos:.2f} MB/s")
+        for origen, error in self.fallidos[:10]:
+            print(f"   ✗ {origen}: {error}")
+
+
+def anonimizar_arbol(origen, destino, perfil, procesos=None, indice=None, streaming=False):
+    """
+    Anonimiza todos los .dcm de `origen` en `destino` (misma estructura de
+    carpetas). Si se pasa un IndiceDICOM, registra ahí los archivos nuevos
+    para que ambulancia.py no tenga que abrirlos.
+    """
+    resumen = ResumenAnonimizacion()
+    procesos = procesos or os.cpu_count()
+    t0 = time.perf_counter()
+
+    def recoger(tareas):
+        filas = []
+        for tarea in tareas:
+            for ruta, tamanio, fila, error in tarea.result():
+                if error:
+                    resumen.fallidos.append((ruta, error))
+                else:
+                    resumen.exitosos += 1
+                    resumen.bytes_escritos += tamanio
+                    filas.append(fila)
+        if indice is not None and filas:
+            indice.guardar(filas)
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar,
+                             initargs=(perfil, streaming)) as pool:
+        en_vuelo = set()
+        for lote in _lotes(origen, destino):
+            if len(en_vuelo) >= procesos * LOTES_EN_VUELO:
+                listas, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                recoger(listas)
+            en_vuelo.add(pool.submit(_procesar_lote, lote))
+        recoger(en_vuelo)
+
+    resumen.segundos = time.perf_counter() - t0
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anonimizador DICOM en lote")
+    parser.add_argument('origen', nargs='?', help="Carpeta con los estudios originales")
+    parser.add_argument('destino', nargs='?', help="Carpeta de salida")
+    parser.add_argument('--perfil', help="Perfil JSON (se mezcla con el básico)")
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--streaming', action='store_true',
+                        help="Reescribir elemento por elemento sin cargar el pixel data (reescritor_dicom.py)")
+    parser.add_argument('--sin-indice', action='store_true',
+                        help="No registrar la salida en el índice de metadatos")
+    parser.add_argument('--verificar', action='store_true',
+                        help="Auditar la salida con las reglas básicas de auditor.py al terminar")
+    parser.add_argument('--mostrar-perfil', action='store_true',
+                        help="Imprimir el perfil efectivo en JSON y salir")
+    args = parser.parse_args()
+
+    perfil = cargar_perfil(args.perfil)
+    if args.mostrar_perfil:
+        print(json.dumps(perfil, indent=2, ensure_ascii=False))
+        return
+    if not args.origen or not args.destino:
+        parser.error("faltan origen y destino")
+    if os.path.abspath(args.destino).startswith(os.path.abspath(args.origen) + os.sep):
+        parser.error("el destino no puede estar dentro del origen")
+
+    print("--- ANONIMIZADOR DICOM EN LOTE ---")
+    print(f"[i] {args.origen} → {args.destino}")
+    if perfil['sal'] == PERFIL_BASICO['sal']:
+        print("[!] Usando la sal por defecto: definí 'sal' en tu perfil para datos reales")
+
+    indice = None if args.sin_indice else IndiceDICOM()
+    try:
+        resumen = anonimizar_arbol(args.origen, args.destino, perfil, args.procesos, indice,
+                                   args.streaming)
+    finally:
+        if indice is not None:
+            indice.cerrar()
+    resumen.imprimir()
+    if args.verificar:
+        # auditor.py importa este módulo: se importa recién acá
+        import auditor
+        print("\n--- VERIFICACIÓN (auditor.py, reglas básicas) ---")
+        auditoria = auditor.auditar(args.destino, auditor.cargar_reglas(), args.procesos, completo=True,
+                                    al_hallazgo=lambda h: print(f" ❌ {h['ruta']}: [{h.get('regla', 'ilegible')}] "
+                                                                f"{h.get('tag', '')} {h['detalle']}"))
+        auditoria.imprimir()
+        if auditoria.con_violaciones or auditoria.errores:
+            return 1
+    return 1 if resumen.fallidos else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
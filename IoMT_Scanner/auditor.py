@@ -1,31 +1,392 @@
-import pydicom
+"""
+AUDITORÍA DE PRIVACIDAD (auditor.py)
+────────────────────────────────────
+Antes: abría paciente_anonimo.dcm y miraba que PatientName y PatientID
+tuvieran dos valores fijos. Ahora recorre carpetas enteras (en paralelo) y
+evalúa un conjunto de REGLAS configurable (JSON):
+
+  privados         → tags privados (grupo impar): ahí los equipos esconden de todo
+  tags_prohibidos  → tags que el anonimizador debía borrar (PatientBirthDate...)
+  permitidos       → valores aceptados para un tag (PatientName: ANONIMO...)
+  fechas           → fechas a más de N días de una referencia (si se configura)
+  texto_libre      → nombres, historias clínicas, fechas y teléfonos escondidos
+                     en comentarios y descripciones ("LEDESMA^EMANUEL",
+                     "Dr. House", "HC 00123456"...), con detector_phi.py
+
+Se lee SÓLO la cabecera (stop_before_pixels) y, por defecto, un archivo se
+corta en la primera violación: para decidir PASA/FALLA no hace falta más.
+El auditor NO usa el índice de metadatos (indice_dicom.py), a propósito:
+el índice guarda unas pocas columnas (clase SOP, UIDs, nombre, ID...) y
+la auditoría tiene que ver TODOS los tags, privados incluidos, con su
+valor. Un archivo "sin cambios" para el índice tampoco está auditado: lo
+que decide si se vuelve a mirar es --incremental (fecha de modificación
+contra la última corrida). Del índice sólo se reusa recorrer_dcm().
+
+El reporte es JSON Lines (una línea por hallazgo + una de resumen), así se
+puede escribir y procesar de a poco aunque el export tenga millones de
+archivos. Con --incremental sólo se auditan los archivos creados o
+modificados desde la última corrida.
+
+Uso:
+    python auditor.py                                  # paciente_anonimo.dcm
+    python auditor.py Anonymized_20260129/ --reporte auditoria.jsonl
+    python auditor.py /exports/noche/ --incremental --procesos 8
+    python auditor.py --mostrar-reglas > mis_reglas.json
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pydicom
+from pydicom.datadict import tag_for_keyword
+
+from anonimizador import PERFIL_BASICO
+from detector_phi import DETECTORES, NOMBRES_BASICOS, DetectorPHI, cargar_nombres
+from indice_dicom import recorrer_dcm
+
+REGLAS_BASICAS = {
+    "privados": True,
+    # Lo mismo que borra el perfil básico del anonimizador
+    "tags_prohibidos": PERFIL_BASICO["eliminar"],
+    "permitidos": {
+        "PatientName": ["ANONIMO", "ANONIMO_001", ""],
+    },
+    # Ej.: {"tags": ["StudyDate"], "referencia": "20000101", "tolerancia_dias": 365}
+    "fechas": {
+        "tags": ["StudyDate", "SeriesDate", "AcquisitionDate", "ContentDate"],
+        "referencia": None,
+        "tolerancia_dias": 0,
+    },
+    "texto_libre": {
+        "tags": [
+            "ImageComments", "StudyDescription", "SeriesDescription",
+            "PatientComments", "AdditionalPatientHistory",
+            "RequestedProcedureDescription", "PerformedProcedureStepDescription",
+            "DerivationDescription",
+        ],
+        # Detectores de detector_phi.py (todos en una sola regex por campo)
+        "detectores": list(DETECTORES),
+        # Diccionario de nombres: archivo con uno por línea (None = el básico)
+        "nombres": None,
+        # Regex propias, p. ej. ["\\bCAMA\\s*\\d+\\b"]
+        "patrones": [],
+        # Mirar también los tags privados de texto (si "privados" está apagado)
+        "privados": False,
+    },
+}
+
+ARCHIVO_ESTADO = '.auditoria_estado.json'
+# VRs de texto que se revisan en los tags privados
+VR_TEXTO = {'LO', 'LT', 'SH', 'ST', 'UT', 'PN', 'UC'}
+ARCHIVOS_POR_LOTE = 64
+LOTES_EN_VUELO = 4
+
+_reglas = None
+_completo = False
+
+
+def cargar_reglas(ruta=None):
+    reglas = dict(REGLAS_BASICAS)
+    if ruta:
+        with open(ruta, encoding='utf-8') as f:
+            reglas.update(json.load(f))
+    return reglas
+
+
+def huella_reglas(reglas):
+    """Si cambian las reglas, lo auditado antes ya no vale (--incremental)."""
+    return hashlib.sha256(json.dumps(reglas, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class ReglasCompiladas:
+    """Las reglas con tags numéricos y el detector PHI compilado, una vez por proceso."""
+
+    def __init__(self, reglas):
+        self.privados = reglas.get('privados', False)
+        self.prohibidos = {tag_for_keyword(p): p for p in reglas.get('tags_prohibidos', [])}
+        self.prohibidos.pop(None, None)
+        self.permitidos = {p: set(v) for p, v in reglas.get('permitidos', {}).items()}
+
+        fechas = reglas.get('fechas') or {}
+        self.tags_fecha = fechas.get('tags', []) if fechas.get('referencia') else []
+        self.referencia = (datetime.datetime.strptime(fechas['referencia'], '%Y%m%d').date()
+                           if fechas.get('referencia') else None)
+        self.tolerancia = datetime.timedelta(days=fechas.get('tolerancia_dias', 0))
+
+        texto = reglas.get('texto_libre') or {}
+        self.tags_texto = texto.get('tags', [])
+        self.texto_privados = texto.get('privados', False)
+        nombres = cargar_nombres(texto['nombres']) if texto.get('nombres') else NOMBRES_BASICOS
+        extra = {f"patron_{i}": p for i, p in enumerate(texto.get('patrones', []))}
+        self.detector = DetectorPHI(nombres, texto.get('detectores'), extra) if texto else None
+
+
+def _hallazgo(ruta, regla, tag, detalle):
+    return {"tipo": "hallazgo", "ruta": ruta, "regla": regla, "tag": tag, "detalle": detalle}
+
+
+def evaluar(ds, ruta, reglas, completo=False):
+    """
+    Aplica las reglas (de la más barata a la más cara) y retorna la lista de
+    hallazgos. Sin `completo`, vuelve en el primero.
+    """
+    hallazgos = []
+
+    def agregar(*hallazgo):
+        hallazgos.append(_hallazgo(ruta, *hallazgo))
+        return not completo
+
+    # 1. Tags privados y prohibidos: sólo mirar qué tags hay (no se decodifica nada)
+    for tag in ds.keys():
+        if reglas.privados and tag.is_private:
+            if agregar('privados', f"({tag.group:04X},{tag.element:04X})", "tag privado presente"):
+                return hallazgos
+        elif tag in reglas.prohibidos and ds[tag].value not in (None, '', b''):
+            if agregar('tags_prohibidos', reglas.prohibidos[tag], "tag prohibido con valor"):
+                return hallazgos
+
+    # 2. Valores permitidos
+    for palabra, permitidos in reglas.permitidos.items():
+        valor = ds.get(palabra)
+        if valor is not None and str(valor) not in permitidos:
+            if agregar('permitidos', palabra, f"valor no permitido: {str(valor)[:64]!r}"):
+                return hallazgos
+
+    # 3. Fechas fuera de tolerancia
+    for palabra in reglas.tags_fecha:
+        valor = ds.get(palabra)
+        if not valor:
+            continue
+        try:
+            fecha = datetime.datetime.strptime(str(valor)[:8], '%Y%m%d').date()
+        except ValueError:
+            if agregar('fechas', palabra, f"fecha inválida: {valor!r}"):
+                return hallazgos
+            continue
+        if abs(fecha - reglas.referencia) > reglas.tolerancia:
+            if agregar('fechas', palabra, f"{valor} fuera de {reglas.referencia:%Y%m%d} "
+                                          f"± {reglas.tolerancia.days} días"):
+                return hallazgos
+
+    # 4. PHI en texto libre (una sola regex por campo con todos los detectores)
+    if reglas.detector is not None:
+        campos = [(palabra, ds.get(palabra)) for palabra in reglas.tags_texto]
+        if reglas.texto_privados:
+            campos += [(f"({e.tag.group:04X},{e.tag.element:04X})", e.value) for e in ds
+                       if e.tag.is_private and e.VR in VR_TEXTO]
+        for nombre, valor in campos:
+            if not valor:
+                continue
+            coincidencia = reglas.detector.primero(str(valor))
+            if coincidencia and agregar('texto_libre', nombre,
+                                        f"posible {coincidencia[0]}: {coincidencia[1]!r}"):
+                return hallazgos
+    return hallazgos
+
+
+def auditar_archivo(ruta, reglas, completo=False):
+    try:
+        ds = pydicom.dcmread(ruta, stop_before_pixels=True)
+    except Exception as e:
+        return [{"tipo": "error", "ruta": ruta, "detalle": f"{type(e).__name__}: {e}"}]
+    return evaluar(ds, ruta, reglas, completo)
 
-print("--- AUDITORÍA DE PRIVACIDAD ---")
-
-try:
-    # Intentamos leer el archivo que TU creaste
-    dataset = pydicom.dcmread("paciente_anonimo.dcm")
-    
-    print(f"Archivo analizado: paciente_anonimo.dcm")
-    print("-" * 40)
-    
-    # Verificamos los campos críticos
-    nombre = dataset.PatientName
-    id_paciente = dataset.PatientID
-    comentarios = dataset.ImageComments
-    
-    print(f"Nombre encontrado: {nombre}")
-    print(f"ID encontrado:     {id_paciente}")
-    print(f"Comentarios:       {comentarios}")
-    print("-" * 40)
-    
+
+def _inicializar(reglas, completo):
+    global _reglas, _completo
+    _reglas, _completo = ReglasCompiladas(reglas), completo
+
+
+def _auditar_lote(rutas):
+    """Corre en el proceso hijo. Retorna [(ruta, hallazgos)]."""
+    return [(ruta, auditar_archivo(ruta, _reglas, _completo)) for ruta in rutas]
+
+
+def rutas_a_auditar(raiz, desde_ns=0):
+    """
+    Archivos .dcm de `raiz` (o `raiz` si es un archivo). Con desde_ns, sólo
+    los creados o modificados desde entonces: se mira también el ctime
+    porque un `cp -p` o un `mv` conservan el mtime viejo.
+    """
+    rutas = [raiz] if os.path.isfile(raiz) else recorrer_dcm(raiz)
+    for ruta in rutas:
+        if desde_ns:
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                continue
+            if max(st.st_mtime_ns, st.st_ctime_ns) < desde_ns:
+                continue
+        yield ruta
+
+
+def _lotes(rutas):
+    lote = []
+    for ruta in rutas:
+        lote.append(ruta)
+        if len(lote) == ARCHIVOS_POR_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class ResumenAuditoria:
+    def __init__(self):
+        self.archivos = 0
+        self.con_violaciones = 0
+        self.errores = 0
+        self.por_regla = {}
+        self.segundos = 0.0
+
+    def como_dict(self):
+        return {"tipo": "resumen", "archivos": self.archivos,
+                "con_violaciones": self.con_violaciones, "errores": self.errores,
+                "por_regla": self.por_regla, "segundos": round(self.segundos, 3),
+                "archivos_por_segundo": round(self.archivos / self.segundos, 1) if self.segundos else 0}
+
+    def imprimir(self):
+        print("-" * 40)
+        print(f"Archivos auditados: {self.archivos}")
+        print(f"Con violaciones:    {self.con_violaciones}")
+        print(f"Ilegibles:          {self.errores}")
+        for regla, cantidad in sorted(self.por_regla.items()):
+            print(f"   - {regla}: {cantidad}")
+        if self.segundos:
+            print(f"Velocidad:          {self.archivos / self.segundos:.0f} archivos/s")
+        print("-" * 40)
+
+
+def auditar(raiz, reglas, procesos=None, completo=False, desde_ns=0, al_hallazgo=None):
+    """
+    Audita `raiz` y retorna un ResumenAuditoria. `al_hallazgo(dict)` se llama
+    por cada hallazgo (para ir escribiendo el reporte sin acumularlos).
+    """
+    resumen = ResumenAuditoria()
+    procesos = procesos or os.cpu_count()
+    t0 = time.perf_counter()
+
+    def recoger(tareas):
+        for tarea in tareas:
+            for ruta, hallazgos in tarea.result():
+                resumen.archivos += 1
+                if hallazgos and hallazgos[0]['tipo'] == 'error':
+                    resumen.errores += 1
+                elif hallazgos:
+                    resumen.con_violaciones += 1
+                for hallazgo in hallazgos:
+                    regla = hallazgo.get('regla', 'ilegible')
+                    resumen.por_regla[regla] = resumen.por_regla.get(regla, 0) + 1
+                    if al_hallazgo:
+                        al_hallazgo(hallazgo)
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar,
+                             initargs=(reglas, completo)) as pool:
+        en_vuelo = set()
+        for lote in _lotes(rutas_a_auditar(raiz, desde_ns)):
+            if len(en_vuelo) >= procesos * LOTES_EN_VUELO:
+                listas, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                recoger(listas)
+            en_vuelo.add(pool.submit(_auditar_lote, lote))
+        recoger(en_vuelo)
+
+    resumen.segundos = time.perf_counter() - t0
+    return resumen
+
+
+def cargar_estado(ruta=ARCHIVO_ESTADO):
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_estado(estado, ruta=ARCHIVO_ESTADO):
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f)
+    os.replace(temporal, ruta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auditoría de privacidad DICOM (reglas PHI)")
+    parser.add_argument('ruta', nargs='?', default="paciente_anonimo.dcm", help="Archivo .dcm o carpeta")
+    parser.add_argument('--reglas', help="Reglas JSON (se mezclan con las básicas)")
+    parser.add_argument('--reporte', metavar='ARCHIVO', help="Reporte JSON Lines")
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--completo', action='store_true',
+                        help="Reportar TODAS las violaciones de cada archivo, no sólo la primera")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Sólo archivos creados/modificados desde la última corrida")
+    parser.add_argument('--estado', default=ARCHIVO_ESTADO, help="Archivo de estado de --incremental")
+    parser.add_argument('--mostrar-reglas', action='store_true',
+                        help="Imprimir las reglas efectivas en JSON y salir")
+    args = parser.parse_args()
+
+    reglas = cargar_reglas(args.reglas)
+    if args.mostrar_reglas:
+        print(json.dumps(reglas, indent=2, ensure_ascii=False))
+        return 0
+
+    print("--- AUDITORÍA DE PRIVACIDAD ---")
+    if not os.path.exists(args.ruta):
+        print(f"Error: No encuentro '{args.ruta}'.")
+        print("¿Seguro que corriste el script 'medico.py' antes?")
+        return 2
+
+    huella = huella_reglas(reglas)
+    clave = os.path.abspath(args.ruta)
+    estado = cargar_estado(args.estado) if args.incremental else {}
+    anterior = estado.get(clave, {})
+    desde_ns = 0
+    if args.incremental and anterior.get('reglas') == huella:
+        desde_ns = anterior['inicio_ns']
+        print(f"[i] Incremental: sólo cambios desde "
+              f"{datetime.datetime.fromtimestamp(desde_ns / 1e9):%Y-%m-%d %H:%M:%S}")
+    elif args.incremental:
+        print("[i] Incremental: primera corrida (o cambiaron las reglas) → auditoría completa")
+    # Se toma ANTES de empezar: lo que cambie durante la corrida entra en la próxima
+    inicio_ns = time.time_ns()
+
+    salida = open(args.reporte, 'w', encoding='utf-8') if args.reporte else None
+
+    mostrados = []
+
+    def al_hallazgo(hallazgo):
+        if salida:
+            salida.write(json.dumps(hallazgo, ensure_ascii=False) + '\n')
+        if len(mostrados) < 20:
+            mostrados.append(hallazgo)
+            print(f"❌ {hallazgo['ruta']}: [{hallazgo.get('regla', 'ilegible')}] "
+                  f"{hallazgo.get('tag', '')} {hallazgo['detalle']}")
+
+    try:
+        resumen = auditar(args.ruta, reglas, args.procesos, args.completo, desde_ns, al_hallazgo)
+        if salida:
+            salida.write(json.dumps(resumen.como_dict(), ensure_ascii=False) + '\n')
+    finally:
+        if salida:
+            salida.close()
+
+    if args.incremental:
+        estado[clave] = {"inicio_ns": inicio_ns, "reglas": huella}
+        guardar_estado(estado, args.estado)
+
+    resumen.imprimir()
     # Veredicto Automático
-    if str(nombre) == "ANONIMO_001" and str(id_paciente) == "123456":
-        print("✅ VEREDICTO: PASA (El archivo es seguro y anónimo).")
-    else:
+    if resumen.con_violaciones or resumen.errores:
         print("❌ VEREDICTO: FALLA (Todavía hay datos sensibles).")
+        return 1
+    print("✅ VEREDICTO: PASA (Los archivos son seguros y anónimos).")
+    return 0
+
 
-except FileNotFoundError:
-    print("Error: No encuentro el archivo 'paciente_anonimo.dcm'.")
-    print("¿Seguro que corriste el script 'medico.py' antes?")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
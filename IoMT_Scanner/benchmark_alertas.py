@@ -0,0 +1,143 @@
+"""
+BENCHMARK DEL MOTOR DE ALERTAS (motor_alertas.py)
+─────────────────────────────────────────────────
+Simula N pacientes a 1 Hz: en cada tick llega una muestra por paciente
+y se evalúan todas las reglas. Mide, por tick:
+
+    ingesta (dicts)    → motor.agregar() con las muestras decodificadas
+    ingesta (arreglos) → motor.agregar_arreglos() con columnas
+    evaluación         → motor.evaluar() (todas las reglas, todos los pacientes)
+    ingenuo            → lo mismo con un deque y un bucle de Python por paciente
+
+Para 1 Hz en un núcleo, ingesta + evaluación tiene que quedar muy por
+debajo de 1000 ms por tick.
+
+Uso:
+    python benchmark_alertas.py
+    python benchmark_alertas.py --pacientes 1000 10000 50000 --ticks 120
+"""
+
+import argparse
+import collections
+import time
+
+import numpy as np
+
+from motor_alertas import REGLAS, VENTANA, MotorAlertas
+
+
+class MotorIngenuo:
+    """Las mismas reglas, un paciente a la vez (para comparar)."""
+
+    def __init__(self):
+        self.ventanas = {}
+        self.activas = {}
+
+    def agregar(self, muestras):
+        for m in muestras:
+            ventana = self.ventanas.get(m["id_paciente"])
+            if ventana is None:
+                ventana = self.ventanas[m["id_paciente"]] = collections.deque(maxlen=VENTANA)
+            ventana.append((m["timestamp"], m["bpm"], m["spo2"]))
+
+    def evaluar(self):
+        nuevas = []
+        for paciente, ventana in self.ventanas.items():
+            ultimas = list(ventana)[::-1]
+            disparadas = {}
+            k = REGLAS["taquicardia_sostenida"]["muestras"]
+            disparadas["taquicardia_sostenida"] = len(ultimas) >= k and all(
+                b > REGLAS["taquicardia_sostenida"]["umbral_bpm"] for _, b, _ in ultimas[:k])
+            k = REGLAS["bradicardia_sostenida"]["muestras"]
+            disparadas["bradicardia_sostenida"] = len(ultimas) >= k and all(
+                b < REGLAS["bradicardia_sostenida"]["umbral_bpm"] for _, b, _ in ultimas[:k])
+            k = REGLAS["hipoxemia"]["muestras"]
+            disparadas["hipoxemia"] = len(ultimas) >= k and all(
+                s < REGLAS["hipoxemia"]["umbral_spo2"] for _, _, s in ultimas[:k])
+            k = REGLAS["desaturacion"]["muestras"]
+            puntos = ultimas[:k]
+            if len(puntos) >= k:
+                mx = sum(t for t, _, _ in puntos) / len(puntos)
+                my = sum(s for _, _, s in puntos) / len(puntos)
+                var = sum((t - mx) ** 2 for t, _, _ in puntos)
+                pendiente = sum((t - mx) * (s - my) for t, _, s in puntos) / var * 60 if var else 0
+                disparadas["desaturacion"] = pendiente < REGLAS["desaturacion"]["pendiente_por_minuto"]
+            k = REGLAS["cambio_brusco"]["muestras"]
+            anteriores = ultimas[1:k + 1]
+            if len(anteriores) >= k // 2:
+                promedio = sum(b for _, b, _ in anteriores) / len(anteriores)
+                disparadas["cambio_brusco"] = abs(ultimas[0][1] - promedio) > REGLAS["cambio_brusco"]["delta_bpm"]
+            activas = self.activas.setdefault(paciente, set())
+            for regla, valor in disparadas.items():
+                if valor and regla not in activas:
+                    nuevas.append((paciente, regla))
+                    activas.add(regla)
+                elif not valor:
+                    activas.discard(regla)
+        return nuevas
+
+
+def generar_tick(ids, tick, azar):
+    """Una muestra por paciente: casi todos normales, algunos con eventos."""
+    n = len(ids)
+    bpm = azar.normal(80, 8, n)
+    spo2 = azar.normal(97, 1, n)
+    # 1% de los pacientes en taquicardia y 1% desaturando de a poco
+    bpm[: n // 100] = 150
+    spo2[n // 100: n // 50] = 97 - tick * 0.1
+    hora = np.full(n, 1_700_000_000.0 + tick)
+    return bpm, spo2, hora
+
+
+def medir(pacientes, ticks, ingenuo):
+    azar = np.random.default_rng(1)
+    ids = [f"{i:06d}" for i in range(pacientes)]
+    motor = MotorAlertas(pacientes=pacientes)
+    motor_arreglos = MotorAlertas(pacientes=pacientes)
+    motor_ingenuo = MotorIngenuo() if ingenuo else None
+    tiempos = collections.defaultdict(float)
+    alertas = 0
+    for tick in range(ticks):
+        bpm, spo2, hora = generar_tick(ids, tick, azar)
+        muestras = [{"id_paciente": i, "timestamp": t, "bpm": b, "spo2": s}
+                    for i, t, b, s in zip(ids, hora.tolist(), bpm.tolist(), spo2.tolist())]
+
+        t0 = time.perf_counter()
+        motor.agregar(muestras)
+        t1 = time.perf_counter()
+        alertas += len(motor.evaluar())
+        t2 = time.perf_counter()
+        tiempos["ingesta (dicts)"] += t1 - t0
+        tiempos["evaluación"] += t2 - t1
+
+        t0 = time.perf_counter()
+        motor_arreglos.agregar_arreglos(ids, bpm, spo2, hora)
+        tiempos["ingesta (arreglos)"] += time.perf_counter() - t0
+
+        if motor_ingenuo:
+            t0 = time.perf_counter()
+            motor_ingenuo.agregar(muestras)
+            motor_ingenuo.evaluar()
+            tiempos["ingenuo (total)"] += time.perf_counter() - t0
+    return {clave: valor / ticks * 1000 for clave, valor in tiempos.items()}, alertas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de alertas vectorizado")
+    parser.add_argument('--pacientes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--ticks', type=int, default=90)
+    parser.add_argument('--sin-ingenuo', action='store_true', help="No medir el bucle por paciente")
+    args = parser.parse_args()
+
+    print(f"--- BENCHMARK MOTOR DE ALERTAS: {args.ticks} ticks a 1 Hz, ventana {VENTANA} ---")
+    for pacientes in args.pacientes:
+        tiempos, alertas = medir(pacientes, args.ticks, not args.sin_ingenuo)
+        print(f"{pacientes:,} pacientes ({alertas} alertas activadas):")
+        for clave, ms in tiempos.items():
+            print(f"   {clave:<20} {ms:9.2f} ms/tick")
+        total = tiempos["ingesta (dicts)"] + tiempos["evaluación"]
+        print(f"   → {total:.1f} ms de cada 1000 ms ({total / 10:.1f}% de un núcleo)")
+
+
+if __name__ == "__main__":
+    main()
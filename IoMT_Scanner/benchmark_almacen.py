@@ -0,0 +1,89 @@
+"""
+BENCHMARK DEL ALMACÉN DE VITALES (almacen_vitales.py)
+─────────────────────────────────────────────────────
+1. Ingesta: N pacientes a 1 Hz durante S segundos simulados, cargados
+   tan rápido como se pueda → muestras/segundo (tiene que superar lo que
+   manda simulador_pulseras.py: 10.000 pulseras a 1 Hz = 10.000/s).
+2. Consulta: P pacientes con 24 h de historia (86.400 muestras c/u),
+   compactados. "Últimas 24 h" por hora (auto) vs leyendo el crudo.
+
+Uso:
+    python benchmark_almacen.py
+    python benchmark_almacen.py --pacientes 10000 --segundos 60 --historia 20
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from almacen_vitales import RESUMEN, AlmacenVitales
+
+INICIO = 1_700_000_000.0
+
+
+def ingesta(raiz, pacientes, segundos):
+    almacen = AlmacenVitales(raiz)
+    ids = [f"{i:06d}" for i in range(pacientes)]
+    azar = np.random.default_rng(1)
+    t0 = time.perf_counter()
+    for segundo in range(segundos):
+        bpm = azar.integers(55, 110, pacientes).tolist()
+        spo2 = azar.integers(90, 100, pacientes).tolist()
+        almacen.agregar([{"id_paciente": i, "timestamp": INICIO + segundo, "bpm": b, "spo2": s}
+                         for i, b, s in zip(ids, bpm, spo2)])
+    duracion = time.perf_counter() - t0
+    almacen.cerrar()
+    return pacientes * segundos / duracion
+
+
+def consultas(raiz, pacientes, repeticiones=20):
+    almacen = AlmacenVitales(raiz)
+    azar = np.random.default_rng(2)
+    segundos = 86400
+    t0 = time.perf_counter()
+    for i in range(pacientes):
+        bpm = azar.integers(55, 110, segundos).tolist()
+        spo2 = azar.integers(90, 100, segundos).tolist()
+        almacen.agregar([{"id_paciente": f"h{i:03d}", "timestamp": INICIO + s, "bpm": b, "spo2": o}
+                         for s, b, o in zip(range(segundos), bpm, spo2)])
+    carga = time.perf_counter() - t0
+    fin = INICIO + segundos
+    compactados = almacen.compactar(ahora=fin + 2 * 3600)
+
+    resultados = {}
+    for resolucion in ('auto', 'crudo'):
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            for i in range(pacientes):
+                _, datos = almacen.consultar(f"h{i:03d}", fin - 86400, fin, resolucion)
+        ms = (time.perf_counter() - t0) * 1000 / (repeticiones * pacientes)
+        filas = len(datos[0]) if resolucion == 'crudo' else len(datos)
+        tamanio = filas * (16 if resolucion == 'crudo' else RESUMEN.itemsize)
+        resultados[resolucion] = (ms, filas, tamanio)
+    almacen.cerrar()
+    return carga, compactados, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del almacén de series de vitales")
+    parser.add_argument('--pacientes', type=int, default=10000, help="Pacientes para la ingesta")
+    parser.add_argument('--segundos', type=int, default=30, help="Segundos simulados de ingesta")
+    parser.add_argument('--historia', type=int, default=5, help="Pacientes con 24 h para las consultas")
+    args = parser.parse_args()
+
+    print("--- BENCHMARK ALMACÉN DE VITALES ---")
+    with tempfile.TemporaryDirectory() as raiz:
+        velocidad = ingesta(raiz, args.pacientes, args.segundos)
+        print(f"Ingesta: {args.pacientes:,} pacientes x {args.segundos} s → {velocidad:,.0f} muestras/s")
+    with tempfile.TemporaryDirectory() as raiz:
+        carga, compactados, resultados = consultas(raiz, args.historia)
+        print(f"Historia: {args.historia} pacientes x 24 h cargados en {carga:.1f} s "
+              f"({args.historia * 86400 / carga:,.0f} muestras/s), {compactados} bloques compactados")
+        for resolucion, (ms, filas, tamanio) in resultados.items():
+            print(f"   últimas 24 h ({resolucion:>5}): {ms:8.2f} ms | {filas:6d} filas | {tamanio / 1024:8.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+BENCHMARK DE LA COSECHA POR API REST (ladron_api.py)
+────────────────────────────────────────────────────
+Levanta un Orthanc de prueba (orthanc_local.py) con N pacientes y una
+latencia por respuesta, y compara:
+
+    serie    → lo de antes: requests.get por paciente, conexión nueva cada vez
+               (se mide sobre --muestra pacientes y se extrapola)
+    detalle  → sesión con keep-alive + concurrencia, GET /patients/<id>
+    expand   → GET /patients?expand&since&limit (una petición por página)
+    find     → POST /tools/find con Expand, Since y Limit
+
+Y la auditoría incremental (--incremental): la primera pasada completa
+contra una pasada por /changes después de que llegan --nuevos pacientes.
+
+Uso:
+    python benchmark_api.py
+    python benchmark_api.py --pacientes 100000 --latencia 0.005 --concurrencia 16
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import requests
+
+from exposicion_orthanc import BaseExposicion
+from ladron_api import FUENTES, PAGINA, AuditoriaIncremental, Cosecha, crear_sesion
+from orthanc_local import CLAVE, USUARIO, OrthancLocal
+
+
+def medir_serie(orthanc, muestra):
+    """Segundos por paciente con el patrón original (sin sesión)."""
+    auth = (USUARIO, CLAVE)
+    ids = requests.get(f"{orthanc.url}/patients", auth=auth).json()[:muestra]
+    inicio = time.perf_counter()
+    for id_paciente in ids:
+        requests.get(f"{orthanc.url}/patients/{id_paciente}", auth=auth).json()
+    return (time.perf_counter() - inicio) / len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la cosecha de la API de Orthanc")
+    parser.add_argument('--pacientes', type=int, default=20000)
+    parser.add_argument('--latencia', type=float, default=0.002, help="Segundos por respuesta del servidor")
+    parser.add_argument('--concurrencia', type=int, default=8)
+    parser.add_argument('--pagina', type=int, default=PAGINA)
+    parser.add_argument('--muestra', type=int, default=300, help="Pacientes medidos en modo serie")
+    parser.add_argument('--nuevos', type=int, default=100, help="Pacientes que llegan entre pasadas incrementales")
+    args = parser.parse_args()
+
+    orthanc = OrthancLocal(args.pacientes, latencia=args.latencia, puerto=0).iniciar()
+    print(f"--- BENCHMARK COSECHA API: {args.pacientes:,} pacientes, latencia {args.latencia * 1000:.1f} ms, "
+          f"concurrencia {args.concurrencia} ---")
+    print(f"{'modo':>8} | {'peticiones':>10} | {'conexiones':>10} | {'segundos':>9} | {'pacientes/s':>11} | "
+          f"{'100k pacientes':>14}")
+    try:
+        por_paciente = medir_serie(orthanc, args.muestra)
+        total = por_paciente * args.pacientes
+        print(f"{'serie':>8} | {args.pacientes + 1:>10,} | {args.pacientes + 1:>10,} | {total:9.1f}* | "
+              f"{1 / por_paciente:11,.0f} | {por_paciente * 100000:12,.0f} s")
+
+        with tempfile.TemporaryDirectory() as temporal:
+            for fuente in FUENTES:
+                peticiones, conexiones = orthanc.peticiones, orthanc.conexiones
+                sesion = crear_sesion(USUARIO, CLAVE, args.concurrencia)
+                cosecha = Cosecha(orthanc.url, sesion, fuente=fuente, concurrencia=args.concurrencia,
+                                  pagina=args.pagina)
+                inicio = time.perf_counter()
+                registros = cosecha.guardar(os.path.join(temporal, f"{fuente}.jsonl"))
+                segundos = time.perf_counter() - inicio
+                sesion.close()
+                assert registros == args.pacientes, (fuente, registros)
+                print(f"{fuente:>8} | {orthanc.peticiones - peticiones:>10,} | "
+                      f"{orthanc.conexiones - conexiones:>10,} | {segundos:9.2f}  | "
+                      f"{registros / segundos:11,.0f} | {segundos * 100000 / args.pacientes:12,.1f} s")
+            print(f"* serie: extrapolado de {args.muestra} pacientes")
+
+            sesion = crear_sesion(USUARIO, CLAVE, args.concurrencia)
+            with BaseExposicion(orthanc.url, os.path.join(temporal, "exposicion.sqlite")) as base:
+                auditoria = AuditoriaIncremental(orthanc.url, sesion, base, args.concurrencia, args.pagina)
+                print(f"\n{'incremental':>11} | {'cambios':>8} | {'recursos':>8} | {'peticiones':>10} | {'segundos':>8}")
+                for etiqueta in ("completa", "sin cambios", f"+{args.nuevos} pac."):
+                    if etiqueta.startswith("+"):
+                        orthanc.agregar_pacientes(args.nuevos)
+                    inicio = time.perf_counter()
+                    r = auditoria.correr()
+                    print(f"{etiqueta:>11} | {r['cambios']:>8,} | {r['recursos']:>8,} | {r['peticiones']:>10,} | "
+                          f"{time.perf_counter() - inicio:8.3f}")
+            sesion.close()
+    finally:
+        orthanc.detener()
+
+
+if __name__ == "__main__":
+    main()
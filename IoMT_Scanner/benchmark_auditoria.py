@@ -0,0 +1,68 @@
+"""
+BENCHMARK DE LA AUDITORÍA PHI (auditor.py)
+──────────────────────────────────────────
+Genera N archivos CT: la mitad limpios (pasan todas las reglas: el peor
+caso, hay que evaluarlas todas) y la mitad "sucios" (con tags prohibidos
+y un nombre en ImageComments). Mide archivos/segundo para:
+
+    - 1 proceso vs N procesos
+    - corte en la primera violación vs --completo
+
+Uso:
+    python benchmark_auditoria.py
+    python benchmark_auditoria.py --archivos 20000 --procesos 1 2 4 8
+"""
+
+import argparse
+import os
+import tempfile
+
+import pydicom
+from pydicom.data import get_testdata_file
+from pydicom.uid import generate_uid
+
+import auditor
+
+
+def generar(directorio, cantidad):
+    base = pydicom.dcmread(get_testdata_file("CT_small.dcm"))
+    limpio = pydicom.dcmread(get_testdata_file("CT_small.dcm"))
+    for palabra in auditor.REGLAS_BASICAS['tags_prohibidos']:
+        if palabra in limpio:
+            delattr(limpio, palabra)
+    limpio.remove_private_tags()
+    limpio.PatientName = "ANONIMO"
+    limpio.ImageComments = "Sin observaciones"
+    base.ImageComments = "Paciente Emanuel, control de rutina"
+
+    for i in range(cantidad):
+        ds = limpio if i % 2 else base
+        uid = generate_uid()
+        ds.SOPInstanceUID = uid
+        ds.file_meta.MediaStorageSOPInstanceUID = uid
+        subcarpeta = os.path.join(directorio, f"serie_{i // 500:03d}")
+        os.makedirs(subcarpeta, exist_ok=True)
+        ds.save_as(os.path.join(subcarpeta, f"img_{i:06d}.dcm"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la auditoría PHI")
+    parser.add_argument('--archivos', type=int, default=4000)
+    parser.add_argument('--procesos', type=int, nargs='+', default=[1, os.cpu_count()])
+    args = parser.parse_args()
+
+    reglas = auditor.cargar_reglas()
+    with tempfile.TemporaryDirectory() as directorio:
+        generar(directorio, args.archivos)
+        print(f"--- BENCHMARK AUDITORÍA: {args.archivos} archivos (50% con violaciones) ---")
+        print(f"{'procesos':>8} | {'modo':>9} | {'segundos':>8} | {'archivos/s':>10} | {'hallazgos':>9}")
+        for procesos in args.procesos:
+            for completo in (False, True):
+                resumen = auditor.auditar(directorio, reglas, procesos, completo)
+                print(f"{procesos:8d} | {'completo' if completo else 'corte':>9} | "
+                      f"{resumen.segundos:8.2f} | {resumen.archivos / resumen.segundos:10.0f} | "
+                      f"{sum(resumen.por_regla.values()):9d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+BENCHMARK DEL DESCUBRIMIENTO EN PARALELO (descubrimiento_red.py)
+────────────────────────────────────────────────────────────────
+Con el backend falso (una demora fija por dirección, como un nmap que
+espera respuestas) compara un solo escaneo de toda la red contra la red
+partida en fragmentos con 1, 4, 16... escaneos a la vez.
+
+Uso:
+    python benchmark_descubrimiento.py
+    python benchmark_descubrimiento.py --red 10.0.0.0/16 --demora 0.0001 --trabajadores 1 8 32 64
+"""
+
+import argparse
+import time
+
+from descubrimiento_red import BackendFalso, descubrir, fragmentar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del descubrimiento de red por fragmentos")
+    parser.add_argument('--red', default="10.20.0.0/18")
+    parser.add_argument('--demora', type=float, default=0.0002, help="Segundos por dirección (backend falso)")
+    parser.add_argument('--prefijo', type=int, default=24)
+    parser.add_argument('--trabajadores', type=int, nargs='+', default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    backend = BackendFalso(demora=args.demora)
+    direcciones = sum(f.num_addresses for f in fragmentar(args.red, 0))
+    print(f"--- BENCHMARK DESCUBRIMIENTO: {args.red} ({direcciones:,} direcciones), "
+          f"{args.demora * 1e6:.0f} µs por dirección ---")
+    print(f"{'modo':>24} | {'segundos':>8} | {'hosts':>6} | {'aceleración':>11}")
+
+    inicio = time.perf_counter()
+    referencia, _ = descubrir(args.red, backend, trabajadores=1, prefijo=0)
+    base = time.perf_counter() - inicio
+    print(f"{'un escaneo (antes)':>24} | {base:8.2f} | {len(referencia):6,} | {1:10.1f}x")
+
+    for trabajadores in args.trabajadores:
+        inicio = time.perf_counter()
+        hosts, _ = descubrir(args.red, backend, trabajadores, args.prefijo)
+        segundos = time.perf_counter() - inicio
+        assert hosts == referencia
+        etiqueta = f"/{args.prefijo} x {trabajadores} en paralelo"
+        print(f"{etiqueta:>24} | {segundos:8.2f} | {len(hosts):6,} | {base / segundos:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
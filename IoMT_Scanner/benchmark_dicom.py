@@ -0,0 +1,96 @@
+"""
+BENCHMARK DE ENVÍO DICOM (ambulancia.py)
+────────────────────────────────────────
+Genera N imágenes CT sintéticas (copias de CT_small.dcm de pydicom con
+SOP Instance UID nuevo), levanta un PACS local en este mismo proceso
+(pacs_local.py) y compara:
+
+    serie    → una asociación por imagen (procesar_archivo_dicom)
+    lote xK  → K asociaciones en paralelo, muchas imágenes por asociación
+
+Reporta imágenes/s y MB/s de cada variante.
+
+Uso:
+    python benchmark_dicom.py
+    python benchmark_dicom.py --imagenes 500 --asociaciones 1 4 8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import pydicom
+from pydicom.data import get_testdata_file
+from pydicom.uid import generate_uid
+
+from ambulancia import crear_ae, enviar_lote, procesar_archivo_dicom
+from pacs_local import PacsLocal
+
+
+def generar_imagenes(directorio, cantidad):
+    """Escribe `cantidad` CT sintéticas con UIDs únicos. Retorna sus rutas."""
+    base = pydicom.dcmread(get_testdata_file("CT_small.dcm"))
+    rutas = []
+    for i in range(cantidad):
+        uid = generate_uid()
+        base.SOPInstanceUID = uid
+        base.file_meta.MediaStorageSOPInstanceUID = uid
+        base.InstanceNumber = i + 1
+        ruta = os.path.join(directorio, f"ct_{i:05d}.dcm")
+        base.save_as(ruta)
+        rutas.append(ruta)
+    return rutas
+
+
+def ronda_serie(archivos, puerto, aet):
+    ae = crear_ae()
+    exitosos = 0
+    t0 = time.perf_counter()
+    # procesar_archivo_dicom imprime 3-4 líneas por imagen: no las mostramos
+    with contextlib.redirect_stdout(io.StringIO()):
+        for archivo in archivos:
+            exitosos += procesar_archivo_dicom(archivo, ae, '127.0.0.1', puerto, aet)
+    return exitosos, time.perf_counter() - t0
+
+
+def ronda_lote(archivos, puerto, aet, asociaciones):
+    with contextlib.redirect_stdout(io.StringIO()):
+        resumen, segundos = enviar_lote(archivos, '127.0.0.1', puerto, aet, asociaciones)
+    return resumen.exitosos, segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de envío DICOM: serie vs lote")
+    parser.add_argument('--imagenes', type=int, default=200)
+    parser.add_argument('--asociaciones', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--puerto', type=int, default=11113)
+    args = parser.parse_args()
+
+    pacs = PacsLocal(puerto=args.puerto).iniciar()
+    try:
+        with tempfile.TemporaryDirectory() as directorio:
+            archivos = generar_imagenes(directorio, args.imagenes)
+            megabytes = sum(os.path.getsize(a) for a in archivos) / 1e6
+            print(f"--- BENCHMARK DICOM: {args.imagenes} imágenes CT ({megabytes:.1f} MB) ---")
+            print(f"{'variante':>10} | {'ok':>5} | {'segundos':>8} | {'img/s':>8} | {'MB/s':>7}")
+
+            variantes = [('serie', lambda: ronda_serie(archivos, args.puerto, pacs.aet))]
+            for k in args.asociaciones:
+                variantes.append((f'lote x{k}',
+                                  lambda k=k: ronda_lote(archivos, args.puerto, pacs.aet, k)))
+
+            for nombre, ronda in variantes:
+                exitosos, segundos = ronda()
+                print(f"{nombre:>10} | {exitosos:5d} | {segundos:8.2f} | "
+                      f"{exitosos / segundos:8.1f} | {megabytes * exitosos / args.imagenes / segundos:7.2f}")
+    finally:
+        pacs.detener()
+    print(f"PACS recibió {pacs.recibidos} instancias "
+          f"({len(pacs.sop_instance_uids)} SOP Instance UIDs distintos).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+BENCHMARK DEL ENRUTADOR DE TEMAS (enrutador_temas.py)
+─────────────────────────────────────────────────────
+Costo por mensaje para llegar al estado del paciente (o descartarlo), con
+cada vez más pacientes monitoreados. La mitad de los mensajes son de
+pacientes que NO se monitorean.
+
+    decodificar → lo de antes: decodificar el payload y buscar "id_paciente"
+    lineal      → un filtro por paciente ('hospital/pacientes/<id>/vitales'),
+                  probados uno por uno con coincide() de broker_local.py
+    enrutador   → EnrutadorPacientes: trie compilado + dict
+
+Uso:
+    python benchmark_enrutador.py
+    python benchmark_enrutador.py --pacientes 10 1000 100000 --mensajes 200000
+"""
+
+import argparse
+import random
+import time
+
+from broker_local import coincide
+from enrutador_temas import EnrutadorPacientes
+from formato_vitales import codificar, decodificar
+from simulador_pulseras import TEMA, generar_vitales
+
+# lineal es O(pacientes) por mensaje: más mensajes no cambian la conclusión
+MENSAJES_LINEAL = 2000
+
+
+def mensajes(cantidad, pacientes, azar):
+    salida = []
+    for _ in range(cantidad):
+        # La mitad de otros pacientes (ids fuera del rango monitoreado)
+        numero = azar.randrange(pacientes * 2)
+        id_paciente = f"{numero:06d}"
+        salida.append((TEMA.format(id_paciente), codificar(generar_vitales(id_paciente, azar), 'binario')))
+    return salida
+
+
+def por_decodificar(monitoreados, lote):
+    aceptados = 0
+    for _, payload in lote:
+        for muestra in decodificar(payload):
+            if muestra["id_paciente"] in monitoreados:
+                aceptados += 1
+    return aceptados
+
+
+def por_lineal(filtros, lote):
+    aceptados = 0
+    for tema, _ in lote:
+        for filtro in filtros:
+            if coincide(filtro, tema):
+                aceptados += 1
+                break
+    return aceptados
+
+
+def por_enrutador(enrutador, lote):
+    aceptados = 0
+    for tema, _ in lote:
+        if enrutador.enrutar(tema) is not None:
+            aceptados += 1
+    return aceptados
+
+
+def medir(funcion, *argumentos):
+    """(ns por mensaje, aceptados)."""
+    t0 = time.perf_counter_ns()
+    aceptados = funcion(*argumentos)
+    return (time.perf_counter_ns() - t0) / len(argumentos[-1]), aceptados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del enrutador de temas por paciente")
+    parser.add_argument('--pacientes', type=int, nargs='+', default=[10, 1000, 10000, 100000])
+    parser.add_argument('--mensajes', type=int, default=100000)
+    args = parser.parse_args()
+
+    azar = random.Random(7)
+    print(f"--- BENCHMARK ENRUTADOR: {args.mensajes:,} mensajes (mitad de pacientes no monitoreados) ---")
+    print(f"{'pacientes':>9} | {'decodificar ns/msj':>18} | {'lineal ns/msj':>13} | {'enrutador ns/msj':>16}")
+    for cantidad in args.pacientes:
+        ids = [f"{numero:06d}" for numero in range(cantidad)]
+        lote = mensajes(args.mensajes, cantidad, azar)
+        enrutador = EnrutadorPacientes(pacientes=ids)
+        filtros = [TEMA.format(i) for i in ids]
+
+        ns_decodificar, esperados = medir(por_decodificar, set(ids), lote)
+        ns_lineal, aceptados_lineal = medir(por_lineal, filtros, lote[:MENSAJES_LINEAL])
+        ns_enrutador, aceptados = medir(por_enrutador, enrutador, lote)
+        assert aceptados == esperados, (aceptados, esperados)
+        assert aceptados_lineal == por_enrutador(EnrutadorPacientes(pacientes=ids), lote[:MENSAJES_LINEAL])
+        print(f"{cantidad:9,} | {ns_decodificar:18,.0f} | {ns_lineal:13,.0f} | {ns_enrutador:16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
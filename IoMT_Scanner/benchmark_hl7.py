@@ -0,0 +1,121 @@
+"""
+BENCHMARK DEL LISTENER HL7 (hospital_server.py --modo async)
+─────────────────────────────────────────────────────────────
+Levanta el servidor en un proceso aparte y lanza 1, 10 y 100 emisores
+concurrentes. Cada emisor mantiene su conexión abierta y envía mensajes
+ADT^A01 uno tras otro, esperando el ACK de cada uno.
+
+Con --workers se repite la prueba para varios tamaños de --workers N del
+servidor (SO_REUSEPORT), para ver cómo escala con los núcleos. Los emisores
+se reparten entre varios procesos cliente para que el cliente no sea el
+cuello de botella.
+
+Reporta: mensajes/segundo y latencia p99 del ACK.
+
+Uso:
+    python benchmark_hl7.py
+    python benchmark_hl7.py --mensajes 500 --concurrencia 1 10 100
+    python benchmark_hl7.py --workers 1 2 4 --concurrencia 100
+"""
+
+import argparse
+import asyncio
+import datetime
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from emisor_lote import percentil
+from mllp import FIN_TRAMA, empaquetar
+
+def armar_mensaje(n):
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    msh = f"MSH|^~\\&|SISTEMA_PY|FEDORA|HIS_CENTRAL|BERLIN|{timestamp}||ADT^A01|MSG-{n}|P|2.3"
+    pid = f"PID|||{100000 + n}||LEDESMA^EMANUEL||19991108|M"
+    pv1 = "PV1||I|URGENCIAS^304^1||||001^DR. HOUSE"
+    return empaquetar(f"{msh}\r{pid}\r{pv1}")
+
+async def emisor(host, puerto, id_emisor, cantidad, latencias):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    for i in range(cantidad):
+        mensaje = armar_mensaje(id_emisor * cantidad + i)
+        t0 = time.perf_counter()
+        writer.write(mensaje)
+        await writer.drain()
+        await reader.readuntil(FIN_TRAMA)
+        latencias.append(time.perf_counter() - t0)
+    writer.close()
+    await writer.wait_closed()
+
+async def emisores(host, puerto, ids, mensajes_por_emisor):
+    latencias = []
+    await asyncio.gather(*(emisor(host, puerto, i, mensajes_por_emisor, latencias)
+                           for i in ids))
+    return latencias
+
+def _proceso_cliente(parametros):
+    host, puerto, ids, mensajes_por_emisor = parametros
+    return asyncio.run(emisores(host, puerto, ids, mensajes_por_emisor))
+
+def ronda(host, puerto, concurrencia, mensajes_por_emisor, procesos_cliente):
+    # Repartimos los emisores en forma circular entre los procesos cliente
+    procesos = max(1, min(procesos_cliente, concurrencia))
+    tareas = [(host, puerto, list(range(p, concurrencia, procesos)), mensajes_por_emisor)
+              for p in range(procesos)]
+    with multiprocessing.Pool(procesos) as pool:
+        t0 = time.perf_counter()
+        resultados = pool.map(_proceso_cliente, tareas)
+        duracion = time.perf_counter() - t0
+    latencias = [l for parcial in resultados for l in parcial]
+    return len(latencias) / duracion, percentil(latencias, 99) * 1000
+
+def esperar_puerto(host, puerto, timeout=10):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            with socket.create_connection((host, puerto), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del listener HL7 asyncio")
+    parser.add_argument('--puerto', type=int, default=16661)
+    parser.add_argument('--mensajes', type=int, default=200, help="Mensajes por emisor")
+    parser.add_argument('--concurrencia', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1],
+                        help="Cantidades de trabajadores del servidor a comparar")
+    parser.add_argument('--procesos-cliente', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    host = '127.0.0.1'
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hospital_server.py')
+
+    print("--- BENCHMARK LISTENER HL7 (ASYNCIO) ---")
+    print(f"{'WORKERS':>8} | {'EMISORES':>9} | {'MENSAJES':>9} | {'MSG/SEG':>10} | {'P99 ACK (ms)':>12}")
+    print("-" * 61)
+    for workers in args.workers:
+        servidor = subprocess.Popen([sys.executable, script, '--modo', 'async', '--silencioso',
+                                     '--puerto', str(args.puerto), '--workers', str(workers)],
+                                    stdout=subprocess.DEVNULL)
+        try:
+            if not esperar_puerto(host, args.puerto):
+                print("❌ El servidor no arrancó a tiempo.")
+                return
+
+            for concurrencia in args.concurrencia:
+                tasa, p99 = ronda(host, args.puerto, concurrencia, args.mensajes,
+                                  args.procesos_cliente)
+                total = concurrencia * args.mensajes
+                print(f"{workers:>8} | {concurrencia:>9} | {total:>9} | {tasa:>10.0f} | {p99:>12.2f}")
+        finally:
+            servidor.terminate()
+            servidor.wait()
+    print("-" * 61)
+
+if __name__ == "__main__":
+    main()
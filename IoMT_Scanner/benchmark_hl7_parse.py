@@ -0,0 +1,78 @@
+"""
+MICROBENCHMARK: hl7.parse() vs VistaHL7 (hl7_rapido.py)
+───────────────────────────────────────────────────────
+Mide cuánto cuesta obtener MSH-9, MSH-10 y PID-5 (lo que necesita el
+listener para enrutar y responder el ACK) con cada método, sobre mensajes
+realistas: un ADT^A01 de admisión y un ORU^R01 con muchos resultados OBX.
+
+Uso:
+    python benchmark_hl7_parse.py
+    python benchmark_hl7_parse.py --repeticiones 20000 --obx 200
+"""
+
+import argparse
+import timeit
+
+import hl7
+
+from hl7_rapido import VistaHL7
+
+def mensaje_adt():
+    segmentos = [
+        "MSH|^~\\&|SISTEMA_PY|FEDORA|HIS_CENTRAL|BERLIN|20260129103000||ADT^A01|MSG-00001|P|2.3",
+        "EVN|A01|20260129103000",
+        "PID|1||123456^^^HOSP^MR||LEDESMA^EMANUEL^J||19991108|M|||AV SIEMPRE VIVA 742^^CDMX^^01000^MX||5555555555|||S||987654321",
+        "NK1|1|LEDESMA^MARIA|MTH|AV SIEMPRE VIVA 742^^CDMX^^01000^MX|5555555556",
+        "PV1|1|I|URGENCIAS^304^1||||001^HOUSE^GREGORY|||MED||||ADM|||001^HOUSE^GREGORY|INP|V0001|||||||||||||||||||||||||20260129103000",
+        "AL1|1|DA|PENICILINA|SV|URTICARIA",
+        "DG1|1|I10|R07.9^DOLOR TORACICO^I10|DOLOR TORACICO|20260129103000|A",
+        "IN1|1|SEGURO01|IMSS|INSTITUTO MEXICANO DEL SEGURO SOCIAL",
+    ]
+    return "\r".join(segmentos).encode('utf-8')
+
+def mensaje_oru(cantidad_obx):
+    segmentos = [
+        "MSH|^~\\&|LAB|HOSPITAL|HIS_CENTRAL|BERLIN|20260129110000||ORU^R01|LAB-00042|P|2.3",
+        "PID|1||123456^^^HOSP^MR||LEDESMA^EMANUEL^J||19991108|M",
+        "PV1|1|I|URGENCIAS^304^1",
+        "ORC|RE|ORD-778|FIL-778",
+        "OBR|1|ORD-778|FIL-778|80053^PANEL METABOLICO^CPT|||20260129100000",
+    ]
+    for i in range(1, cantidad_obx + 1):
+        segmentos.append(f"OBX|{i}|NM|{2000 + i}^ANALITO_{i}^LN||{90 + i % 40}.{i % 10}|mg/dL|70-110|N|||F|||20260129105900")
+        if i % 25 == 0:
+            segmentos.append(f"NTE|{i}||Resultado revisado por QUIMICO^TURNO NOCHE")
+    return "\r".join(segmentos).encode('utf-8')
+
+def con_hl7_parse(datos):
+    h = hl7.parse(datos.decode('utf-8'))
+    return str(h[0][9]), str(h[0][10]), str(h.segment('PID')[5])
+
+def con_vista(datos):
+    v = VistaHL7(datos)
+    return v.tipo_mensaje, v.id_control, v.nombre_paciente
+
+def medir(funcion, datos, repeticiones):
+    segundos = min(timeit.repeat(lambda: funcion(datos), number=repeticiones, repeat=3))
+    return segundos / repeticiones * 1e6  # microsegundos por mensaje
+
+def main():
+    parser = argparse.ArgumentParser(description="hl7.parse vs VistaHL7")
+    parser.add_argument('--repeticiones', type=int, default=5000)
+    parser.add_argument('--obx', type=int, default=100, help="Cantidad de OBX en el ORU")
+    args = parser.parse_args()
+
+    casos = [("ADT^A01", mensaje_adt()), (f"ORU^R01 ({args.obx} OBX)", mensaje_oru(args.obx))]
+
+    print("--- MICROBENCHMARK PARSER HL7 ---")
+    print(f"{'MENSAJE':<20} | {'BYTES':>6} | {'hl7.parse (µs)':>14} | {'VistaHL7 (µs)':>13} | {'ACELERACIÓN':>11}")
+    print("-" * 78)
+    for nombre, datos in casos:
+        assert con_hl7_parse(datos) == con_vista(datos), "Los dos métodos deben coincidir"
+        lento = medir(con_hl7_parse, datos, args.repeticiones)
+        rapido = medir(con_vista, datos, args.repeticiones)
+        print(f"{nombre:<20} | {len(datos):>6} | {lento:>14.1f} | {rapido:>13.1f} | {lento / rapido:>10.1f}x")
+    print("-" * 78)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+BENCHMARK DEL DETECTOR PHI (detector_phi.py)
+────────────────────────────────────────────
+Mide el costo por campo de texto libre a medida que crece el diccionario
+de nombres (0 → 1.000 → 10.000 → 100.000), comparando:
+
+    combinado → DetectorPHI: una regex con todos los detectores + set de nombres
+    ingenuo   → una regex por detector + buscar cada nombre del diccionario
+
+Lo esperado: el combinado queda plano; el ingenuo crece con el diccionario.
+Los campos son una mezcla de descripciones limpias (el peor caso: hay que
+mirar todo) y notas con datos personales.
+
+Uso:
+    python benchmark_phi.py
+    python benchmark_phi.py --campos 50000 --nombres 0 1000 10000 100000
+"""
+
+import argparse
+import random
+import re
+import time
+
+from detector_phi import DETECTORES, NOMBRES_BASICOS, DetectorPHI
+
+SILABAS = ["ra", "mi", "to", "le", "sa", "go", "ne", "vi", "lu", "ca", "ber", "mon",
+           "tes", "dal", "gar", "rin", "zo", "qui", "fer", "nan"]
+
+CAMPOS_LIMPIOS = [
+    "CT TORAX SIN CONTRASTE", "RM de cerebro con gadolinio, cortes axiales 3mm",
+    "Sin observaciones", "Control post operatorio, evolución favorable",
+    "ECG de 12 derivaciones, ritmo sinusal", "Serie localizadora",
+]
+CAMPOS_SUCIOS = [
+    "Paciente Emanuel, control de rutina", "LEDESMA^EMANUEL", "HC: 00123456",
+    "Llamar a la familia al +54 11 4567-8901", "Nacido el 19/01/2004",
+    "Visto junto con su madre Sofia en guardia",
+]
+
+
+def generar_nombres(cantidad, semilla=1):
+    azar = random.Random(semilla)
+    nombres = set(NOMBRES_BASICOS)
+    while len(nombres) < cantidad:
+        nombres.add(''.join(azar.choice(SILABAS) for _ in range(azar.randint(2, 4))).upper())
+    return list(nombres)[:cantidad] if cantidad else []
+
+
+def generar_campos(cantidad, semilla=2):
+    azar = random.Random(semilla)
+    return [azar.choice(CAMPOS_SUCIOS if i % 4 == 0 else CAMPOS_LIMPIOS) for i in range(cantidad)]
+
+
+class DetectorIngenuo:
+    """Lo que hace el combinado, de la forma obvia: un detector y un nombre a la vez."""
+
+    def __init__(self, nombres):
+        self.regex = [re.compile(p) for p in DETECTORES.values()]
+        self.nombres = [re.compile(rf"\b{re.escape(n)}\b", re.IGNORECASE) for n in nombres]
+
+    def primero(self, texto):
+        for regex in self.regex + self.nombres:
+            coincidencia = regex.search(texto)
+            if coincidencia:
+                return coincidencia.group()
+        return None
+
+
+def medir(detector, campos):
+    """Retorna (µs por campo, campos con hallazgo)."""
+    t0 = time.perf_counter()
+    hallazgos = sum(1 for campo in campos if detector.primero(campo))
+    return (time.perf_counter() - t0) / len(campos) * 1e6, hallazgos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del detector PHI combinado")
+    parser.add_argument('--campos', type=int, default=20000)
+    parser.add_argument('--nombres', type=int, nargs='+', default=[0, 1000, 10000, 100000])
+    parser.add_argument('--campos-ingenuo', type=int, default=500,
+                        help="El ingenuo con 100k nombres es MUY lento: se mide con menos campos")
+    args = parser.parse_args()
+
+    campos = generar_campos(args.campos)
+    print(f"--- BENCHMARK DETECTOR PHI: {args.campos} campos (25% con PHI) ---")
+    print(f"{'nombres':>8} | {'modo':>9} | {'armado s':>8} | {'µs/campo':>9} | {'hallazgos':>9}")
+    for cantidad in args.nombres:
+        nombres = generar_nombres(cantidad)
+        for modo, clase, muestra in (('combinado', DetectorPHI, campos),
+                                     ('ingenuo', DetectorIngenuo, campos[:args.campos_ingenuo])):
+            t0 = time.perf_counter()
+            detector = clase(nombres)
+            armado = time.perf_counter() - t0
+            microsegundos, hallazgos = medir(detector, muestra)
+            print(f"{cantidad:8d} | {modo:>9} | {armado:8.2f} | {microsegundos:9.2f} | "
+                  f"{hallazgos / len(muestra):8.0%}")
+
+
+if __name__ == "__main__":
+    main()
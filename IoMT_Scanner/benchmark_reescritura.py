@@ -0,0 +1,202 @@
+"""
+BENCHMARK DE REESCRITURA DICOM (anonimizador.py vs reescritor_dicom.py)
+───────────────────────────────────────────────────────────────────────
+Genera archivos multi-frame grandes (512x512, 16 bits, N frames) y los
+anonimiza con:
+
+    dcmread   → pydicom.dcmread + save_as (camino normal del anonimizador)
+    streaming → reescritor_dicom.py (cabeceras + copia en el kernel)
+
+Cada corrida va en un proceso aparte para medir su memoria máxima (RSS).
+Lo esperado: con dcmread la memoria crece con el tamaño de la imagen; con
+streaming queda igual.
+
+Con --comparar no mide nada: anonimiza por los dos caminos los archivos de
+prueba de pydicom y unos casos armados a propósito (secuencias privadas y
+del perfil con largo indefinido, UIDs anidados) y verifica que la salida
+sea la MISMA. Sale con 1 si algún archivo difiere.
+
+Uso:
+    python benchmark_reescritura.py
+    python benchmark_reescritura.py --megas 64 256 1024 --directorio /datos/tmp
+    python benchmark_reescritura.py --comparar
+"""
+
+import argparse
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import pydicom
+from pydicom.data import get_testdata_file, get_testdata_files
+from pydicom.dataset import Dataset
+from pydicom.sequence import Sequence
+
+FILAS = COLUMNAS = 512
+BYTES_POR_FRAME = FILAS * COLUMNAS * 2
+
+
+def generar_multiframe(ruta, megas):
+    """
+    Escribe un CT multi-frame de ~`megas` MB sin tenerlo nunca en memoria:
+    primero la cabecera con pydicom y después el pixel data de a un frame.
+    """
+    frames = max(1, megas * 1024 * 1024 // BYTES_POR_FRAME)
+    ds = pydicom.dcmread(get_testdata_file("CT_small.dcm"))
+    del ds.PixelData
+    ds.Rows, ds.Columns = FILAS, COLUMNAS
+    ds.BitsAllocated = ds.BitsStored = 16
+    ds.HighBit = 15
+    ds.NumberOfFrames = frames
+    ds.save_as(ruta, enforce_file_format=True)
+
+    frame = os.urandom(BYTES_POR_FRAME)
+    with open(ruta, 'ab') as f:
+        # (7FE0,0010) OW, largo de 4 bytes (explícita little endian)
+        f.write(struct.pack('<HH2s2xI', 0x7FE0, 0x0010, b'OW', frames * BYTES_POR_FRAME))
+        for _ in range(frames):
+            f.write(frame)
+    return frames
+
+
+def _interno(modo, origen, destino):
+    """Lo que corre dentro del proceso medido."""
+    import anonimizador
+    perfil = anonimizador.cargar_perfil()
+    if modo == 'streaming':
+        anonimizador.anonimizar_archivo_streaming(origen, destino, perfil)
+    else:
+        anonimizador.anonimizar_archivo(origen, destino, perfil)
+
+
+def medir(modo, origen, destino):
+    """Retorna (segundos, RSS máximo en MB) de anonimizar un archivo en un proceso nuevo."""
+    t0 = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, os.path.abspath(__file__),
+                                '--interno', modo, origen, destino])
+    _, estado, uso = os.wait4(proceso.pid, 0)
+    segundos = time.perf_counter() - t0
+    proceso.returncode = os.waitstatus_to_exitcode(estado)
+    if proceso.returncode:
+        raise RuntimeError(f"{modo} falló con código {proceso.returncode}")
+    return segundos, uso.ru_maxrss / 1024
+
+
+def generar_casos(directorio):
+    """
+    Casos que el streaming tiene que tratar igual que dcmread: PHI dentro de
+    una secuencia privada y de una secuencia del perfil, las dos con largo
+    indefinido (el delimitador se copia o se salta entero), y UIDs anidados.
+    Retorna (rutas, perfil) con ReferencedPatientSequence en "eliminar".
+    """
+    import anonimizador
+    ds = pydicom.dcmread(get_testdata_file("CT_small.dcm"))
+    privado = Dataset()
+    privado.PatientComments = "JOHN SMITH secreto"
+    ds.add_new(0x00090010, 'LO', 'ACME')
+    ds.add_new(0x00091001, 'SQ', Sequence([privado]))
+    referencia = Dataset()
+    referencia.PatientComments = "JOHN SMITH"
+    ds.ReferencedPatientSequence = Sequence([referencia])
+    rutas = []
+    for indefinido in (False, True):
+        for palabra in ('ReferencedPatientSequence', 0x00091001):
+            ds[palabra].is_undefined_length = indefinido
+            for item in ds[palabra].value:
+                item.is_undefined_length_sequence_item = indefinido
+        ruta = os.path.join(directorio, f"secuencias_{'indefinidas' if indefinido else 'definidas'}.dcm")
+        ds.save_as(ruta, enforce_file_format=True)
+        rutas.append(ruta)
+    perfil = anonimizador.cargar_perfil()
+    perfil['eliminar'] = perfil['eliminar'] + ['ReferencedPatientSequence']
+    return rutas, perfil
+
+
+def huella(ruta):
+    """Todo el contenido del archivo (meta incluida, secuencias recorridas) en una lista comparable."""
+    ds = pydicom.dcmread(ruta)
+    elementos = [(e.tag, e.value) for e in ds.file_meta if e.tag.element]
+
+    def agregar(dataset, elemento):
+        if elemento.tag.element and elemento.VR != 'SQ':
+            elementos.append((elemento.tag, elemento.value))
+        elif elemento.VR == 'SQ':
+            elementos.append((elemento.tag, len(elemento.value)))
+
+    ds.walk(agregar)
+    return elementos
+
+
+def comparar(directorio):
+    import anonimizador
+    rutas, perfil = generar_casos(directorio)
+    casos = [(ruta, perfil) for ruta in rutas]
+    casos += [(ruta, anonimizador.cargar_perfil()) for ruta in get_testdata_files("*.dcm")]
+    print("--- COMPARACIÓN: dcmread vs streaming (misma salida) ---")
+    iguales, distintos, ilegibles = 0, [], 0
+    for origen, perfil in casos:
+        normal = os.path.join(directorio, "normal.dcm")
+        streaming = os.path.join(directorio, "streaming.dcm")
+        try:
+            anonimizador.anonimizar_archivo(origen, normal, perfil)
+            esperado = huella(normal)
+        except Exception:
+            # Si dcmread no puede, no hay contra qué comparar
+            ilegibles += 1
+            continue
+        try:
+            anonimizador.anonimizar_archivo_streaming(origen, streaming, perfil)
+            obtenido = huella(streaming)
+        except Exception as e:
+            obtenido = f"{type(e).__name__}: {e}"
+        if obtenido == esperado:
+            iguales += 1
+        else:
+            distintos.append(os.path.basename(origen))
+    print(f"Iguales: {iguales} | Distintos: {len(distintos)} | Sin referencia (dcmread falla): {ilegibles}")
+    for nombre in distintos:
+        print(f"   ✗ {nombre}")
+    return 1 if distintos else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: dcmread+save_as vs reescritura en streaming")
+    parser.add_argument('--megas', type=int, nargs='+', default=[32, 128, 512],
+                        help="Tamaños aproximados de los archivos a generar (MB)")
+    parser.add_argument('--directorio', default=None, help="Dónde generar los archivos")
+    parser.add_argument('--comparar', action='store_true',
+                        help="Verificar que streaming y dcmread den la misma salida (no mide)")
+    parser.add_argument('--interno', nargs=3, metavar=('MODO', 'ORIGEN', 'DESTINO'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        _interno(*args.interno)
+        return
+    if args.comparar:
+        warnings.simplefilter('ignore')
+        with tempfile.TemporaryDirectory(dir=args.directorio) as directorio:
+            return comparar(directorio)
+
+    with tempfile.TemporaryDirectory(dir=args.directorio) as directorio:
+        print("--- BENCHMARK DE REESCRITURA DICOM ---")
+        print(f"{'tamaño':>8} | {'frames':>6} | {'modo':>9} | {'segundos':>8} | {'MB/s':>7} | {'RSS máx':>8}")
+        for megas in args.megas:
+            origen = os.path.join(directorio, f"multiframe_{megas}.dcm")
+            frames = generar_multiframe(origen, megas)
+            tamanio = os.path.getsize(origen) / 1e6
+            for modo in ('dcmread', 'streaming'):
+                destino = os.path.join(directorio, f"salida_{modo}.dcm")
+                segundos, rss = medir(modo, origen, destino)
+                print(f"{tamanio:6.0f}MB | {frames:6d} | {modo:>9} | {segundos:8.2f} | "
+                      f"{tamanio / segundos:7.0f} | {rss:6.0f}MB")
+                os.remove(destino)
+            os.remove(origen)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+BENCHMARK DEL MOTOR NATIVO vs NMAP (sondeo_nativo.py)
+─────────────────────────────────────────────────────
+Arma el laboratorio de laboratorio_red.py (hosts en un namespace, del
+otro lado de un par veth), lo barre con cada motor de descubrimiento y
+lo borra al final. Por motor mide:
+
+    primer host   cuándo se conoce el primer vivo (nmap: recién al final)
+    total         cuánto tarda el barrido completo
+    hosts         cuántos de los esperados encontró
+
+nmap sólo se mide si está instalado. Necesita root.
+
+Uso:
+    sudo python benchmark_sondeo.py
+    sudo python benchmark_sondeo.py --locales 100 --remotos 100 --repeticiones 5
+"""
+
+import argparse
+import shutil
+import statistics
+import time
+
+import laboratorio_red
+from descubrimiento_red import BackendNativo, BackendNmap, descubrir
+
+
+def medir(backend_con_aviso, redes, trabajadores):
+    """(primer host, total, hosts) de un barrido, en segundos."""
+    primero = []
+    inicio = time.perf_counter()
+
+    def al_encontrar(ip, datos):
+        if not primero:
+            primero.append(time.perf_counter() - inicio)
+
+    hosts, fallidos = descubrir(redes, backend_con_aviso(al_encontrar), trabajadores)
+    total = time.perf_counter() - inicio
+    if fallidos:
+        raise fallidos[0][1]
+    return (primero[0] if primero else total), total, set(hosts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del descubrimiento nativo contra nmap")
+    parser.add_argument('--locales', type=int, default=50)
+    parser.add_argument('--remotos', type=int, default=50)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--trabajadores', type=int, default=2, help="Fragmentos en paralelo (uno por red)")
+    parser.add_argument('--espera', type=float, default=0.5, help="Espera por ronda del motor nativo")
+    args = parser.parse_args()
+
+    laboratorio_red.crear(args.locales, args.remotos)
+    try:
+        redes = f"{laboratorio_red.RED_LOCAL} {laboratorio_red.RED_REMOTA}"
+        esperados = set(laboratorio_red.hosts_locales(args.locales) + laboratorio_red.hosts_remotos(args.remotos))
+        motores = {
+            "nativo": lambda aviso: BackendNativo(espera=args.espera, al_encontrar=aviso),
+        }
+        if shutil.which('nmap'):
+            # nmap no avisa nada hasta terminar: primer host = total
+            motores["nmap -sn -T4"] = lambda aviso: BackendNmap(timing=4)
+        else:
+            print("[!] nmap no está instalado: se mide sólo el motor nativo.")
+
+        print(f"--- BENCHMARK SONDEO: {redes} ({len(esperados)} hosts de prueba, "
+              f"{args.repeticiones} repeticiones, mediana) ---")
+        print(f"{'motor':>14} | {'primer host':>11} | {'total':>7} | {'hosts':>9}")
+        for nombre, crear_backend in motores.items():
+            medidas = [medir(crear_backend, redes, args.trabajadores) for _ in range(args.repeticiones)]
+            primero = statistics.median(m[0] for m in medidas)
+            total = statistics.median(m[1] for m in medidas)
+            # Además de los de prueba aparecen la propia máquina y el extremo veth del namespace
+            encontrados = min(len(m[2] & esperados) for m in medidas)
+            print(f"{nombre:>14} | {primero * 1000:8.1f} ms | {total:5.2f} s | "
+                  f"{encontrados:>4}/{len(esperados):<4}")
+    finally:
+        laboratorio_red.borrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+BENCHMARK DEL FORMATO DE VITALES (formato_vitales.py)
+─────────────────────────────────────────────────────
+Compara JSON vs binario v1, con 1 muestra por mensaje y en lotes:
+
+    bytes por mensaje (y por muestra)
+    ns para codificar y decodificar cada mensaje (y cada muestra)
+
+Uso:
+    python benchmark_vitales.py
+    python benchmark_vitales.py --mensajes 200000 --lotes 1 10 60
+"""
+
+import argparse
+import random
+import time
+
+from formato_vitales import FORMATOS, codificar, decodificar
+from simulador_pulseras import generar_vitales
+
+
+def medir(funcion, entradas):
+    """ns promedio por llamada."""
+    t0 = time.perf_counter_ns()
+    for entrada in entradas:
+        funcion(entrada)
+    return (time.perf_counter_ns() - t0) / len(entradas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON vs binario para signos vitales")
+    parser.add_argument('--mensajes', type=int, default=50000)
+    parser.add_argument('--lotes', type=int, nargs='+', default=[1, 10, 60],
+                        help="Muestras por mensaje")
+    args = parser.parse_args()
+
+    azar = random.Random(1)
+    print(f"--- BENCHMARK FORMATO DE VITALES: {args.mensajes} mensajes ---")
+    print(f"{'muestras':>8} | {'formato':>7} | {'bytes/msj':>9} | {'bytes/muestra':>13} | "
+          f"{'cod. ns/msj':>11} | {'dec. ns/msj':>11} | {'dec. ns/muestra':>15}")
+    for lote in args.lotes:
+        cantidad = max(1, args.mensajes // lote)
+        mensajes = [[generar_vitales("123456", azar) for _ in range(lote)] for _ in range(cantidad)]
+        for formato in FORMATOS:
+            payloads = [codificar(muestras, formato) for muestras in mensajes]
+            payloads = [p.encode('utf-8') if isinstance(p, str) else p for p in payloads]
+            tamanio = sum(len(p) for p in payloads) / len(payloads)
+            ns_codificar = medir(lambda m: codificar(m, formato), mensajes)
+            ns_decodificar = medir(decodificar, payloads)
+            print(f"{lote:8d} | {formato:>7} | {tamanio:9.1f} | {tamanio / lote:13.1f} | "
+                  f"{ns_codificar:11.0f} | {ns_decodificar:11.0f} | {ns_decodificar / lote:15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+BROKER MQTT EMBEBIDO (broker_local.py)
+──────────────────────────────────────
+Un broker MQTT 3.1.1 mínimo en asyncio, para probar la pulsera, la central
+de enfermería y el simulador de carga sin instalar mosquitto.
+
+Soporta lo que usan nuestros scripts:
+    CONNECT / CONNACK, PUBLISH (QoS 0, 1 y 2), SUBSCRIBE / UNSUBSCRIBE con
+    comodines + y #, PINGREQ y DISCONNECT.
+
+Simplificaciones (a propósito, no es para producción):
+  - Sin usuarios, sin TLS, sin sesiones persistentes, sin retained ni will.
+  - A los suscriptores se les entrega siempre en QoS 0.
+  - Contrapresión: si un suscriptor no lee y su búfer de salida pasa
+    LIMITE_BUFER, los mensajes nuevos para él se DESCARTAN (y se cuentan),
+    igual que hace mosquitto con max_queued_messages.
+
+Uso:
+    python broker_local.py                   # puerto 1883
+    python broker_local.py --puerto 1884 --estadisticas 5
+"""
+
+import argparse
+import asyncio
+import struct
+import time
+
+HOST = '0.0.0.0'
+PUERTO = 1883
+
+# Bytes pendientes de escribir a un suscriptor antes de empezar a descartar
+LIMITE_BUFER = 4 * 1024 * 1024
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+
+def coincide(filtro, tema):
+    """¿El tema 'hospital/pacientes/7/vitales' coincide con el filtro 'hospital/pacientes/+/vitales'?"""
+    partes_filtro, partes_tema = filtro.split('/'), tema.split('/')
+    for i, parte in enumerate(partes_filtro):
+        if parte == '#':
+            return True
+        if i >= len(partes_tema) or (parte != '+' and parte != partes_tema[i]):
+            return False
+    return len(partes_filtro) == len(partes_tema)
+
+
+def _largo_restante(largo):
+    """Codifica el 'remaining length' de MQTT (1 a 4 bytes, 7 bits por byte)."""
+    salida = bytearray()
+    while True:
+        byte, largo = largo % 128, largo // 128
+        salida.append(byte | (0x80 if largo else 0))
+        if not largo:
+            return bytes(salida)
+
+
+def paquete(tipo, flags, cuerpo=b''):
+    return bytes([(tipo << 4) | flags]) + _largo_restante(len(cuerpo)) + cuerpo
+
+
+def _texto(datos, pos):
+    largo = struct.unpack_from('!H', datos, pos)[0]
+    return datos[pos + 2:pos + 2 + largo].decode('utf-8'), pos + 2 + largo
+
+
+class Estadisticas:
+    def __init__(self):
+        self.conexiones = 0
+        self.recibidos = 0
+        self.entregados = 0
+        self.descartados = 0
+        self.bytes_recibidos = 0
+
+
+class BrokerLocal:
+    def __init__(self):
+        # filtro → set de writers suscriptos
+        self.suscripciones = {}
+        # tema → writers que lo reciben (se vacía cuando cambian las suscripciones)
+        self._cache = {}
+        self.estadisticas = Estadisticas()
+
+    def _destinatarios(self, tema):
+        destinatarios = self._cache.get(tema)
+        if destinatarios is None:
+            destinatarios = set()
+            for filtro, writers in self.suscripciones.items():
+                if coincide(filtro, tema):
+                    destinatarios |= writers
+            self._cache[tema] = destinatarios = list(destinatarios)
+        return destinatarios
+
+    def _publicar(self, tema, crudo):
+        estadisticas = self.estadisticas
+        for writer in self._destinatarios(tema):
+            if writer.transport.is_closing():
+                continue
+            if writer.transport.get_write_buffer_size() > LIMITE_BUFER:
+                estadisticas.descartados += 1
+            else:
+                writer.write(crudo)
+                estadisticas.entregados += 1
+
+    def _suscribir(self, writer, filtro):
+        self.suscripciones.setdefault(filtro, set()).add(writer)
+        self._cache.clear()
+
+    def _desuscribir(self, writer, filtros=None):
+        for filtro in list(filtros if filtros is not None else self.suscripciones):
+            writers = self.suscripciones.get(filtro)
+            if writers:
+                writers.discard(writer)
+                if not writers:
+                    del self.suscripciones[filtro]
+        self._cache.clear()
+
+    async def _leer_paquete(self, reader):
+        cabecera = (await reader.readexactly(1))[0]
+        largo, multiplicador = 0, 1
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            largo += (byte & 0x7F) * multiplicador
+            if not byte & 0x80:
+                break
+            multiplicador *= 128
+            if multiplicador > 128 ** 3:
+                raise ValueError("Remaining length inválido")
+        cuerpo = await reader.readexactly(largo) if largo else b''
+        return cabecera >> 4, cabecera & 0x0F, cuerpo
+
+    async def atender(self, reader, writer):
+        self.estadisticas.conexiones += 1
+        try:
+            tipo, _, _ = await self._leer_paquete(reader)
+            if tipo != CONNECT:
+                return
+            writer.write(paquete(CONNACK, 0, b'\x00\x00'))
+            while True:
+                tipo, flags, cuerpo = await self._leer_paquete(reader)
+                if tipo == PUBLISH:
+                    qos = (flags >> 1) & 0x03
+                    tema, pos = _texto(cuerpo, 0)
+                    if qos:
+                        id_paquete = cuerpo[pos:pos + 2]
+                        pos += 2
+                        writer.write(paquete(PUBACK if qos == 1 else PUBREC, 0, id_paquete))
+                    self.estadisticas.recibidos += 1
+                    self.estadisticas.bytes_recibidos += len(cuerpo)
+                    # Reenvío en QoS 0: sin packet id, flags en 0
+                    crudo_tema = cuerpo[:2 + len(tema.encode('utf-8'))]
+                    self._publicar(tema, paquete(PUBLISH, 0, crudo_tema + cuerpo[pos:]))
+                elif tipo == PUBREL:
+                    writer.write(paquete(PUBCOMP, 0, cuerpo[:2]))
+                elif tipo == SUBSCRIBE:
+                    id_paquete, pos, otorgados = cuerpo[:2], 2, bytearray()
+                    while pos < len(cuerpo):
+                        filtro, pos = _texto(cuerpo, pos)
+                        pos += 1  # QoS pedido: se otorga 0
+                        self._suscribir(writer, filtro)
+                        otorgados.append(0)
+                    writer.write(paquete(SUBACK, 0, id_paquete + bytes(otorgados)))
+                elif tipo == UNSUBSCRIBE:
+                    id_paquete, pos, filtros = cuerpo[:2], 2, []
+                    while pos < len(cuerpo):
+                        filtro, pos = _texto(cuerpo, pos)
+                        filtros.append(filtro)
+                    self._desuscribir(writer, filtros)
+                    writer.write(paquete(UNSUBACK, 0, id_paquete))
+                elif tipo == PINGREQ:
+                    writer.write(paquete(PINGRESP, 0))
+                elif tipo == DISCONNECT:
+                    return
+                # PUBACK/PUBREC/PUBCOMP de los suscriptores: no hay nada que hacer (QoS 0)
+                if writer.transport.get_write_buffer_size() > LIMITE_BUFER:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._desuscribir(writer)
+            self.estadisticas.conexiones -= 1
+            writer.close()
+
+    async def informar(self, cada):
+        anterior, t_anterior = 0, time.perf_counter()
+        while True:
+            await asyncio.sleep(cada)
+            e, ahora = self.estadisticas, time.perf_counter()
+            print(f"[broker] {e.conexiones} conexiones | "
+                  f"{(e.recibidos - anterior) / (ahora - t_anterior):,.0f} msg/s | "
+                  f"recibidos {e.recibidos:,} | entregados {e.entregados:,} | "
+                  f"descartados {e.descartados:,}")
+            anterior, t_anterior = e.recibidos, ahora
+
+
+async def servir(host=HOST, puerto=PUERTO, estadisticas=0):
+    broker = BrokerLocal()
+    servidor = await asyncio.start_server(broker.atender, host, puerto, backlog=1024)
+    print(f"[.] Broker MQTT local escuchando en {host}:{puerto}")
+    if estadisticas:
+        asyncio.ensure_future(broker.informar(estadisticas))
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def iniciar(host=HOST, puerto=PUERTO, estadisticas=0):
+    try:
+        asyncio.run(servir(host, puerto, estadisticas))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Broker MQTT 3.1.1 mínimo (asyncio) para pruebas")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--puerto', type=int, default=PUERTO)
+    parser.add_argument('--estadisticas', type=float, default=0, metavar='SEG',
+                        help="Imprimir msg/s cada SEG segundos")
+    args = parser.parse_args()
+    print("--- BROKER MQTT LOCAL ---")
+    iniciar(args.host, args.puerto, args.estadisticas)
@@ -0,0 +1,84 @@
+"""
+NEGOCIACIÓN DE CONTEXTOS DE PRESENTACIÓN (contextos_dicom.py)
+─────────────────────────────────────────────────────────────
+Al asociarse, el emisor propone "contextos": pares (clase SOP, transfer
+syntax). Si sólo proponemos CTImageStorage sin compresión, una RM, una CR
+o una TC en JPEG 2000 se rechaza o alguien tiene que transcodificarla.
+
+Aquí hacemos un pre-escaneo rápido del lote leyendo SÓLO la cabecera de
+cada archivo (stop_before_pixels: no se toca el pixel data) y juntamos los
+pares distintos:
+
+    (CT Image Storage,  Explicit VR Little Endian)
+    (MR Image Storage,  JPEG 2000 Lossless)
+    ...
+
+Después se pide exactamente un contexto por par, así cada archivo viaja en
+su codificación nativa y nadie descomprime nada.
+
+Las cabeceras salen del índice de metadatos (indice_dicom.py): se leen en
+paralelo y en la segunda corrida sólo se abren los archivos nuevos o
+modificados.
+"""
+
+import pydicom
+from pynetdicom import DEFAULT_TRANSFER_SYNTAXES
+from pynetdicom.sop_class import CTImageStorage
+
+import indice_dicom
+
+# Límite del estándar: los IDs de contexto son impares de 1 a 255
+MAXIMO_CONTEXTOS = 128
+
+# Comportamiento anterior (--solo-ct): CT con las sintaxis sin comprimir.
+# Igual que arriba, una sintaxis por contexto: con varias en el mismo, el
+# PACS elige una sola y el resto de los archivos no tendría contexto exacto.
+CONTEXTOS_SOLO_CT = [(CTImageStorage, ts) for ts in DEFAULT_TRANSFER_SYNTAXES]
+
+
+def pares_de(filas):
+    """{ruta: (sop_class, transfer_syntax) o None} a partir de filas del índice."""
+    return {ruta: (fila['sop_class_uid'], fila['transfer_syntax']) if fila['valido'] else None
+            for ruta, fila in filas.items()}
+
+
+def escanear(archivos, procesos=None, ruta_indice=indice_dicom.ARCHIVO_INDICE):
+    """
+    Retorna {ruta absoluta: (sop_class, transfer_syntax) o None}.
+    Con ruta_indice=None el índice vive sólo en memoria.
+    """
+    with indice_dicom.IndiceDICOM(ruta_indice) as indice:
+        return pares_de(indice.actualizar(archivos, procesos))
+
+
+def contextos_necesarios(pares):
+    """
+    Lista ordenada de pares distintos (sin los None). Si hay más de 128
+    se devuelven los primeros 128 por cantidad de archivos: el resto fallará
+    al enviarse y aparecerá en el resumen.
+    """
+    conteo = {}
+    for par in pares:
+        if par is not None:
+            conteo[par] = conteo.get(par, 0) + 1
+    ordenados = sorted(conteo, key=lambda par: -conteo[par])
+    if len(ordenados) > MAXIMO_CONTEXTOS:
+        print(f"[!] {len(ordenados)} combinaciones clase/sintaxis: sólo se proponen "
+              f"las {MAXIMO_CONTEXTOS} más frecuentes")
+    return ordenados[:MAXIMO_CONTEXTOS]
+
+
+def agregar_contextos(ae, contextos):
+    """Un contexto por par: el PACS acepta o rechaza cada sintaxis por separado."""
+    for sop_class, transfer_syntax in contextos:
+        ae.add_requested_context(sop_class, transfer_syntax)
+
+
+def describir(contextos):
+    """Líneas legibles '  - CT Image Storage [Explicit VR Little Endian]'."""
+    lineas = []
+    for sop_class, transfer_syntax in contextos:
+        nombre_sop = pydicom.uid.UID(sop_class).name
+        nombre_ts = pydicom.uid.UID(transfer_syntax).name
+        lineas.append(f"    - {nombre_sop} [{nombre_ts}]")
+    return lineas
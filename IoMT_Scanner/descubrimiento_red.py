@@ -0,0 +1,220 @@
+"""
+DESCUBRIMIENTO DE RED EN PARALELO (descubrimiento_red.py)
+─────────────────────────────────────────────────────────
+radar.py y vigilante.py corrían UN `nmap -sn` sobre toda la red y
+esperaban a que terminara. En una /24 son segundos; en las VLAN del
+hospital (/16 o más) son horas, con un solo nmap haciendo todo.
+
+Acá la red se parte en fragmentos (por defecto /24) y un pool de
+trabajadores corre un nmap por fragmento, varios a la vez:
+
+    10.20.0.0/16 ──▶ 10.20.0.0/24, 10.20.1.0/24, ... (256 fragmentos)
+                         │ │ │ │   N nmap en paralelo
+                         ▼ ▼ ▼ ▼
+                     resultados que se juntan apenas termina cada fragmento
+
+Cada nmap es un proceso aparte, así que los trabajadores son hilos que
+sólo esperan. El tiempo total pasa a depender de cuántos nmap corren a la
+vez (--trabajadores) y no de cuántas direcciones hay.
+
+Backends (cualquier función fragmento → {ip: {"mac", "fabricante"}}):
+    BackendNmap   python-nmap, con -T, --min-parallelism, etc. configurables
+    BackendNativo sondeo_nativo.py: ARP/ICMP/TCP con sockets crudos, sin
+                  lanzar nmap ni parsear XML; avisa cada host apenas contesta
+    BackendFalso  hosts sintéticos con una demora por dirección, para probar
+                  y medir sin nmap ni red (ver benchmark_descubrimiento.py)
+
+Se elige con --motor {nmap,nativo,falso} (--falso sigue andando).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import ipaddress
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import nmap
+
+import sondeo_nativo
+
+PREFIJO_FRAGMENTO = 24
+TRABAJADORES = os.cpu_count() or 4
+FABRICANTES_FALSOS = ["Philips Medical Systems", "GE Healthcare", "Medtronic", "Draeger",
+                      "Mindray", "Cisco Systems", "Hewlett Packard", "Dell"]
+
+
+def fragmentar(redes, prefijo=PREFIJO_FRAGMENTO):
+    """
+    Parte una o varias redes ('10.0.0.0/16', '192.168.1.0/24 192.168.2.0/24')
+    en subredes /prefijo. Las redes más chicas que el fragmento quedan enteras.
+    """
+    if isinstance(redes, str):
+        redes = redes.replace(',', ' ').split()
+    fragmentos = []
+    for red in redes:
+        red = ipaddress.ip_network(red, strict=False)
+        if red.prefixlen >= prefijo:
+            fragmentos.append(red)
+        else:
+            fragmentos.extend(red.subnets(new_prefix=prefijo))
+    return fragmentos
+
+
+class BackendNmap:
+    """Un `nmap -sn` por fragmento (cada llamada crea su propio PortScanner)."""
+
+    def __init__(self, timing=4, dns=False, min_paralelismo=None, reintentos=None, timeout_host=None,
+                 extra=''):
+        opciones = ['-sn', f'-T{timing}']
+        if not dns:
+            # Resolver nombres de 65.000 direcciones es más lento que el ping
+            opciones.append('-n')
+        if min_paralelismo:
+            opciones.append(f'--min-parallelism {min_paralelismo}')
+        if reintentos is not None:
+            opciones.append(f'--max-retries {reintentos}')
+        if timeout_host:
+            opciones.append(f'--host-timeout {timeout_host}')
+        if extra:
+            opciones.append(extra)
+        self.argumentos = ' '.join(opciones)
+
+    def __call__(self, fragmento):
+        nm = nmap.PortScanner()
+        nm.scan(hosts=str(fragmento), arguments=self.argumentos)
+        hosts = {}
+        for host in nm.all_hosts():
+            # La MAC sólo aparece corriendo con SUDO y en el mismo segmento
+            mac = nm[host]['addresses'].get('mac')
+            hosts[host] = {"mac": mac, "fabricante": nm[host]['vendor'].get(mac) if mac else None}
+        return hosts
+
+
+class BackendNativo:
+    """
+    sondeo_nativo.barrer por fragmento (un lazo de asyncio por trabajador).
+    al_encontrar(ip, datos) se llama apenas contesta cada host, desde el hilo
+    del trabajador: no hace falta esperar a que termine el fragmento.
+    """
+
+    def __init__(self, metodos=sondeo_nativo.METODOS, espera=sondeo_nativo.ESPERA,
+                 reintentos=sondeo_nativo.REINTENTOS, tasa=sondeo_nativo.TASA, al_encontrar=None):
+        self.metodos = metodos
+        self.espera = espera
+        self.reintentos = reintentos
+        self.tasa = tasa
+        self.al_encontrar = al_encontrar
+
+    async def _barrer(self, fragmento):
+        hosts = {}
+        async for respuesta in sondeo_nativo.barrer(fragmento, self.metodos, espera=self.espera,
+                                                    reintentos=self.reintentos, tasa=self.tasa):
+            # Sin base de OUI: el fabricante queda para quien tenga la MAC
+            hosts[respuesta.ip] = {"mac": respuesta.mac, "fabricante": None}
+            if self.al_encontrar:
+                self.al_encontrar(respuesta.ip, hosts[respuesta.ip])
+        return hosts
+
+    def __call__(self, fragmento):
+        return asyncio.run(self._barrer(fragmento))
+
+
+class BackendFalso:
+    """
+    Hosts sintéticos: cada dirección está viva con probabilidad `vivos`
+    (fijo por dirección, así dos corridas dan lo mismo) y el fragmento tarda
+    `demora` segundos por dirección, como un nmap que espera respuestas.
+    """
+
+    def __init__(self, vivos=0.05, demora=0.0002, semilla='hospital'):
+        self.vivos = vivos
+        self.demora = demora
+        self.semilla = semilla
+
+    def __call__(self, fragmento):
+        hosts = {}
+        for ip in fragmento:
+            digesto = hashlib.sha1(f"{self.semilla}:{ip}".encode()).digest()
+            if int.from_bytes(digesto[:4], 'big') / 2 ** 32 < self.vivos:
+                mac = ':'.join(f'{b:02X}' for b in digesto[4:10])
+                fabricante = FABRICANTES_FALSOS[digesto[10] % len(FABRICANTES_FALSOS)]
+                hosts[str(ip)] = {"mac": mac, "fabricante": fabricante}
+        time.sleep(self.demora * fragmento.num_addresses)
+        return hosts
+
+
+def descubrir(redes, backend, trabajadores=TRABAJADORES, prefijo=PREFIJO_FRAGMENTO, al_terminar=None):
+    """
+    Escanea los fragmentos en paralelo y junta los resultados a medida que
+    terminan. al_terminar(fragmento, hosts, segundos, hechos, total, error)
+    se llama por cada fragmento (en el hilo que llamó a descubrir).
+    Retorna ({ip: datos}, [(fragmento, error)]).
+    """
+    fragmentos = fragmentar(redes, prefijo)
+    encontrados, fallidos = {}, []
+
+    def escanear(fragmento):
+        inicio = time.perf_counter()
+        return backend(fragmento), time.perf_counter() - inicio
+
+    with ThreadPoolExecutor(max_workers=max(1, trabajadores)) as pool:
+        futuros = {pool.submit(escanear, fragmento): fragmento for fragmento in fragmentos}
+        for hechos, futuro in enumerate(as_completed(futuros), 1):
+            fragmento = futuros[futuro]
+            try:
+                hosts, segundos = futuro.result()
+                error = None
+            except Exception as e:
+                # Un fragmento que falla no tira abajo el resto del barrido
+                hosts, segundos, error = {}, 0.0, e
+                fallidos.append((fragmento, e))
+            encontrados.update(hosts)
+            if al_terminar:
+                al_terminar(fragmento, hosts, segundos, hechos, len(fragmentos), error)
+    return encontrados, fallidos
+
+
+def ordenar_ips(ips):
+    return sorted(ips, key=ipaddress.ip_address)
+
+
+def agregar_argumentos(parser, red_por_defecto):
+    """Las opciones de descubrimiento que comparten radar.py y vigilante.py."""
+    parser.add_argument('--red', default=red_por_defecto, help="Una o varias redes en CIDR")
+    parser.add_argument('--motor', choices=('nmap', 'nativo', 'falso'), default='nmap',
+                        help="nmap (python-nmap), nativo (sockets crudos, root) o falso (sintético)")
+    parser.add_argument('--trabajadores', type=int, default=TRABAJADORES, help="Fragmentos en paralelo")
+    parser.add_argument('--prefijo', type=int, default=PREFIJO_FRAGMENTO,
+                        help="Tamaño de cada fragmento (24 = de a 256 direcciones)")
+    parser.add_argument('--timing', type=int, choices=range(6), default=4, help="Plantilla -T de nmap")
+    parser.add_argument('--min-paralelismo', type=int, help="--min-parallelism de nmap")
+    parser.add_argument('--reintentos', type=int, help="--max-retries de nmap / rondas extra del nativo")
+    parser.add_argument('--timeout-host', help="--host-timeout de nmap (p. ej. 5s)")
+    parser.add_argument('--dns', action='store_true', help="Resolver nombres (más lento)")
+    parser.add_argument('--espera', type=float, default=sondeo_nativo.ESPERA,
+                        help="Nativo: segundos de espera por ronda")
+    parser.add_argument('--tasa', type=int, default=sondeo_nativo.TASA, help="Nativo: sondas por segundo")
+    parser.add_argument('--falso', action='store_true', help="Igual que --motor falso")
+
+
+def backend_desde_argumentos(args, al_encontrar=None):
+    if args.falso or args.motor == 'falso':
+        return BackendFalso()
+    if args.motor == 'nativo':
+        reintentos = sondeo_nativo.REINTENTOS if args.reintentos is None else args.reintentos
+        return BackendNativo(espera=args.espera, reintentos=reintentos, tasa=args.tasa,
+                             al_encontrar=al_encontrar)
+    return BackendNmap(args.timing, args.dns, args.min_paralelismo, args.reintentos, args.timeout_host)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Descubrimiento de hosts en paralelo por fragmentos")
+    agregar_argumentos(parser, "192.168.1.0/24")
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    hosts, fallidos = descubrir(args.red, backend_desde_argumentos(args), args.trabajadores, args.prefijo)
+    for ip in ordenar_ips(hosts):
+        print(f"{ip:<20} {hosts[ip]['mac'] or '-':<20} {hosts[ip]['fabricante'] or '-'}")
+    print(f"{len(hosts)} hosts en {time.perf_counter() - inicio:.1f} s ({len(fallidos)} fragmentos con error)")
@@ -0,0 +1,132 @@
+"""
+DETECTOR DE PHI EN TEXTO LIBRE (detector_phi.py)
+────────────────────────────────────────────────
+Los datos personales se escapan en el texto libre: ImageComments,
+StudyDescription, tags privados, NTE y OBX de HL7... Un detector por
+tipo (nombres, historias clínicas, fechas, teléfonos) significa recorrer
+el campo una vez por detector. Y buscar 100.000 nombres de un diccionario
+uno por uno es recorrerlo 100.000 veces.
+
+Acá todo va en UNA sola regex con grupos con nombre:
+
+    (?P<nombre_hl7>APELLIDO^NOMBRE) | (?P<titulo>Dr. House) | (?P<mrn>...)
+    | (?P<fecha>...) | (?P<telefono>...) | (?P<palabra>cualquier palabra)
+
+Una pasada por campo. Cada palabra suelta se busca en un conjunto (set) del
+diccionario: O(1) por palabra, así que el costo NO crece con el tamaño del
+diccionario (ver benchmark_phi.py).
+
+Lo usan auditor.py (campos DICOM) y hospital_server.py / hospital_tls.py
+(NTE-3 y OBX-5 de texto).
+"""
+
+import re
+import unicodedata
+
+# Cada detector es una regex SIN grupos con nombre. El orden importa: en
+# cada posición gana el primero que coincide, y 'palabra' va al final.
+DETECTORES = {
+    # LEDESMA^EMANUEL (formato PN de DICOM / XPN de HL7)
+    'nombre_hl7': r"\b[A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑa-záéíóúñ'-]+\^[A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑa-záéíóúñ'-]+",
+    # Dr. House, Sra Pérez, Paciente Emanuel
+    'titulo': r"\b(?:Dr|Dra|Sr|Sra|Srta|Lic|Paciente|Pte)\.?\s+[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+",
+    # MRN 123456, HC: 00123456, NHC-987654
+    'mrn': r"\b(?:MRN|HC|NHC|HCL|DNI|Historia)[\s:#.-]*\d{5,10}\b",
+    # 19/01/2004, 19-1-04, 2004-01-19, 20040119
+    'fecha': r"\b(?:\d{1,2}[/-]\d{1,2}[/-](?:\d{4}|\d{2})|(?:19|20)\d{2}-\d{2}-\d{2}|(?:19|20)\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01]))\b",
+    # +54 11 4567-8901, (011) 4567 8901, 4567-8901
+    'telefono': r"(?:\+\d{1,3}[\s-]?)?(?:\(\d{2,4}\)[\s-]?|\b\d{2,4}[\s-])?\b\d{3,4}[\s-]\d{4}\b",
+}
+
+# Diccionario mínimo para que funcione sin archivo; en serio se carga uno
+# grande con --nombres (un nombre o apellido por línea).
+NOMBRES_BASICOS = [
+    "EMANUEL", "LEDESMA", "GREGORY", "HOUSE", "JUAN", "CARLOS", "PEDRO", "PABLO",
+    "JAVIER", "DIEGO", "ALEJANDRO", "FERNANDO", "SOFIA", "VALENTINA", "CAMILA",
+    "LUCIA", "MARTINA", "CATALINA", "GABRIELA", "FLORENCIA", "GONZALEZ", "RODRIGUEZ",
+    "GOMEZ", "FERNANDEZ", "LOPEZ", "DIAZ", "MARTINEZ", "PEREZ", "GARCIA", "SANCHEZ",
+    "ROMERO", "SOSA", "ALVAREZ", "TORRES", "RUIZ", "RAMIREZ", "FLORES", "BENITEZ",
+    "ACOSTA", "MEDINA", "HERRERA", "SUAREZ", "AGUIRRE", "GIMENEZ", "GUTIERREZ",
+]
+
+_PALABRA = r"[^\W\d_]{2,}"
+
+
+def _sin_acentos(texto):
+    return ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+
+
+def cargar_nombres(ruta):
+    """Un nombre por línea (se ignoran vacías y las que empiezan con #)."""
+    with open(ruta, encoding='utf-8') as f:
+        return [linea.strip() for linea in f if linea.strip() and not linea.startswith('#')]
+
+
+class DetectorPHI:
+    def __init__(self, nombres=NOMBRES_BASICOS, detectores=None, extra=None):
+        """
+        nombres:    diccionario de nombres/apellidos (cualquier iterable)
+        detectores: cuáles de DETECTORES usar (None = todos)
+        extra:      {nombre: regex} adicionales (van antes que los de fábrica)
+        """
+        elegidos = dict(extra or {})
+        for clave in (DETECTORES if detectores is None else detectores):
+            elegidos[clave] = DETECTORES[clave]
+
+        # Se guarda cada nombre en mayúsculas, con y sin acentos: así la
+        # búsqueda es un token.upper() in set (y "González" encuentra GONZALEZ)
+        self.nombres = set()
+        for nombre in nombres:
+            nombre = nombre.strip().upper()
+            if nombre:
+                self.nombres.add(nombre)
+                self.nombres.add(_sin_acentos(nombre))
+
+        partes = [f"(?P<{clave}>{patron})" for clave, patron in elegidos.items()]
+        if self.nombres:
+            partes.append(f"(?P<palabra>{_PALABRA})")
+        self.regex = re.compile('|'.join(partes)) if partes else None
+
+    def _coincidencias(self, texto):
+        if self.regex is None or not texto:
+            return
+        nombres = self.nombres
+        for m in self.regex.finditer(texto):
+            tipo = m.lastgroup
+            if tipo == 'palabra':
+                palabra = m.group().upper()
+                # Sólo las palabras con acentos pagan la normalización
+                if palabra not in nombres and (palabra.isascii() or _sin_acentos(palabra) not in nombres):
+                    continue
+                tipo = 'nombre'
+            yield tipo, m.group()
+
+    def buscar(self, texto):
+        """Todas las coincidencias: [(tipo, fragmento)]."""
+        return list(self._coincidencias(texto))
+
+    def primero(self, texto):
+        """La primera coincidencia (tipo, fragmento), o None. Corta apenas encuentra."""
+        return next(self._coincidencias(texto), None)
+
+
+# Campos de texto libre de HL7: (segmento, campo)
+CAMPOS_HL7 = (('NTE', 3), ('OBX', 5))
+# OBX-5 sólo se mira si OBX-2 dice que es texto
+TIPOS_TEXTO_OBX = {'TX', 'ST', 'FT', 'CE', 'CWE', ''}
+
+
+def revisar_hl7(vista, detector):
+    """
+    Revisa NTE-3 y OBX-5 (de texto) de un mensaje (VistaHL7).
+    Retorna [(campo, tipo, fragmento)], p. ej. [('NTE-3', 'nombre', 'EMANUEL')].
+    """
+    hallazgos = []
+    for nombre_segmento, campo in CAMPOS_HL7:
+        for segmento in vista.segmentos(nombre_segmento):
+            if nombre_segmento == 'OBX' and segmento[2] not in TIPOS_TEXTO_OBX:
+                continue
+            coincidencia = detector.primero(segmento[campo])
+            if coincidencia:
+                hallazgos.append((f"{nombre_segmento}-{campo}",) + coincidencia)
+    return hallazgos
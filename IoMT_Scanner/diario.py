@@ -0,0 +1,439 @@
+"""
+DIARIO DURABLE DE MENSAJES HL7 (diario.py)
+──────────────────────────────────────────
+Mandar `MSA|AA` es prometerle al emisor: "ya lo tengo, no lo reenvíes".
+Si el listener se cae justo después, ese mensaje se pierde para siempre.
+
+Este diario (write-ahead log) guarda cada mensaje crudo en disco ANTES
+del ACK:
+
+  - Append-only, en segmentos que rotan al llegar a un tamaño máximo:
+        diario/000000000001.wal, 000000000002.wal, ...
+  - Cada registro: [largo (4 bytes)][crc32 (4 bytes)][mensaje]
+    Si se corta la luz a mitad de un registro, el CRC lo delata.
+  - GROUP COMMIT: un hilo escritor junta todos los mensajes que llegaron
+    mientras se hacía el fsync anterior y los baja a disco con UN solo
+    fsync. Con 100 emisores eso son ~100 mensajes por fsync en vez de 1.
+  - Un consumidor aparte (python diario.py consumir DIR) lo lee a su
+    ritmo y guarda su posición; el listener nunca espera al procesamiento.
+  - Si una escritura o un fsync falla (disco lleno, error de E/S), los
+    mensajes de ese lote reciben el error (→ NAK), el segmento se trunca al
+    último registro confirmado y se sigue en uno nuevo: después de un fsync
+    fallido no se puede confiar en lo que quedó en ese archivo.
+
+Estrategias de fsync (para comparar con `python diario.py benchmark`):
+    cada    → un fsync por mensaje (seguro, lento)
+    grupo   → un fsync por lote (seguro, rápido)   ← por defecto
+    ninguno → sin fsync (rápido, NO garantiza nada ante un corte de luz)
+
+Uso:
+    python diario.py consumir diario/ [--nombre auditor]
+    python diario.py replay diario/ [--destino localhost:6661]
+    python diario.py benchmark [--emisores 50 --mensajes 200]
+"""
+
+import argparse
+import os
+import queue
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+
+from hl7_rapido import VistaHL7
+
+CABECERA = struct.Struct('<II')   # largo, crc32
+EXTENSION = '.wal'
+TAMANIO_SEGMENTO = 64 * 1024 * 1024
+ESTRATEGIAS = ('cada', 'grupo', 'ninguno')
+
+
+class ErrorDiario(Exception):
+    """Registro corrupto en medio del diario, o diario que ya no acepta mensajes."""
+
+
+def _nombre_segmento(numero):
+    return f"{numero:012d}{EXTENSION}"
+
+
+def listar_segmentos(directorio):
+    """Números de segmento presentes, en orden."""
+    if not os.path.isdir(directorio):
+        return []
+    return sorted(int(n[:-len(EXTENSION)]) for n in os.listdir(directorio) if n.endswith(EXTENSION))
+
+
+def directorios_diario(ruta):
+    """
+    Con --workers cada proceso escribe en su propio subdirectorio
+    (ruta/trabajador_N). Retorna la lista de diarios que hay bajo `ruta`.
+    """
+    if listar_segmentos(ruta):
+        return [ruta]
+    if not os.path.isdir(ruta):
+        return []
+    return [os.path.join(ruta, n) for n in sorted(os.listdir(ruta))
+            if listar_segmentos(os.path.join(ruta, n))]
+
+
+def _escribir_todo(fd, datos):
+    """os.write puede escribir menos de lo pedido: insistir hasta el final."""
+    vista = memoryview(datos)
+    while vista:
+        escritos = os.write(fd, vista)
+        vista = vista[escritos:]
+
+
+def _fsync_directorio(directorio):
+    fd = os.open(directorio, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DiarioHL7:
+    def __init__(self, directorio, estrategia='grupo', tamanio_segmento=TAMANIO_SEGMENTO):
+        if estrategia not in ESTRATEGIAS:
+            raise ValueError(f"Estrategia desconocida: {estrategia}")
+        self.directorio = directorio
+        self.estrategia = estrategia
+        self.tamanio_segmento = tamanio_segmento
+        os.makedirs(directorio, exist_ok=True)
+
+        segmentos = listar_segmentos(directorio)
+        # Nunca agregamos a un segmento viejo: su cola podría estar cortada
+        self._numero = (segmentos[-1] + 1) if segmentos else 1
+        self._fd = None
+        self._tamanio = 0   # bytes ya confirmados en el segmento actual
+        self._abrir_segmento()
+
+        self.fsyncs = 0
+        self._cola = queue.SimpleQueue()
+        self._candado = threading.Lock()
+        self._muerto = None   # excepción que detuvo al hilo escritor
+        self._hilo = threading.Thread(target=self._escritor, name='diario-escritor', daemon=True)
+        self._hilo.start()
+
+    def _abrir_segmento(self):
+        ruta = os.path.join(self.directorio, _nombre_segmento(self._numero))
+        fd = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        if self.estrategia != 'ninguno':
+            try:
+                _fsync_directorio(self.directorio)  # que el archivo nuevo sobreviva a un corte
+            except OSError:
+                os.close(fd)
+                raise
+        self._fd, self._tamanio = fd, 0
+
+    def _rotar(self):
+        fd, self._fd = self._fd, None
+        try:
+            if self.estrategia != 'ninguno':
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._numero += 1
+        self._abrir_segmento()
+
+    def _recuperar(self):
+        """
+        Después de un error: cortar el segmento en el último registro
+        confirmado (lo que sigue recibió NAK y el emisor lo va a reenviar) y
+        seguir en un segmento nuevo. Si no se puede abrir, se reintenta con
+        el próximo lote.
+        """
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                os.ftruncate(fd, self._tamanio)
+            except OSError:
+                pass  # Queda basura al final: el lector la trata como cola cortada
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+            self._numero += 1
+        self._abrir_segmento()
+
+    def agregar(self, mensaje):
+        """
+        Encola un mensaje (bytes) para escribirlo. Retorna un Future que se
+        completa cuando el mensaje ya está en disco según la estrategia:
+            diario.agregar(m).result()                      # código con hilos
+            await asyncio.wrap_future(diario.agregar(m))    # asyncio
+        """
+        futuro = Future()
+        with self._candado:
+            if self._muerto is not None:
+                futuro.set_exception(ErrorDiario(f"El escritor del diario se detuvo: {self._muerto!r}"))
+            else:
+                self._cola.put((mensaje, futuro))
+        return futuro
+
+    def _escritor(self):
+        lote = []
+        try:
+            while True:
+                primero = self._cola.get()
+                if primero is None:
+                    break
+                # Todo lo que llegó mientras hacíamos el fsync anterior va en este lote
+                lote = [primero]
+                try:
+                    while True:
+                        item = self._cola.get_nowait()
+                        if item is None:
+                            self._cola.put(None)
+                            break
+                        lote.append(item)
+                except queue.Empty:
+                    pass
+
+                try:
+                    self._escribir_lote(lote)
+                except OSError as e:
+                    _fallar(lote, e)
+                    try:
+                        self._recuperar()
+                    except OSError:
+                        pass
+                lote = []
+        except BaseException as e:
+            # Un error que no es de E/S (p. ej. un mensaje que no es bytes) no
+            # puede dejar Futures colgados para siempre: se falla lo que esté
+            # en vuelo o en la cola, y agregar() rechaza lo que venga después
+            error = ErrorDiario(f"El escritor del diario se detuvo: {e!r}")
+            with self._candado:
+                self._muerto = e
+                _fallar(lote, error)
+                try:
+                    while True:
+                        item = self._cola.get_nowait()
+                        if item is not None:
+                            _fallar([item], error)
+                except queue.Empty:
+                    pass
+            raise
+
+    def _escribir_lote(self, lote):
+        if self._fd is None:
+            self._abrir_segmento()
+        bloque, esperando = bytearray(), []
+        for mensaje, futuro in lote:
+            bloque += CABECERA.pack(len(mensaje), zlib.crc32(mensaje)) + mensaje
+            esperando.append(futuro)
+            if self.estrategia == 'cada' or self._tamanio + len(bloque) >= self.tamanio_segmento:
+                self._volcar(bloque, esperando)
+                if self._tamanio >= self.tamanio_segmento:
+                    self._rotar()
+        self._volcar(bloque, esperando)
+
+    def _volcar(self, bloque, esperando):
+        """Escribe el bloque, hace fsync según la estrategia y recién ahí confirma sus Futures."""
+        if not bloque:
+            return
+        _escribir_todo(self._fd, bloque)
+        if self.estrategia != 'ninguno':
+            os.fdatasync(self._fd)
+            self.fsyncs += 1
+        self._tamanio += len(bloque)
+        bloque.clear()
+        for futuro in esperando:
+            futuro.set_result(True)
+        esperando.clear()
+
+    def cerrar(self):
+        self._cola.put(None)
+        self._hilo.join()
+        if self._fd is not None:
+            if self.estrategia != 'ninguno':
+                os.fsync(self._fd)
+            os.close(self._fd)
+
+
+def _fallar(lote, error):
+    for _, futuro in lote:
+        if not futuro.done():
+            futuro.set_exception(error)
+
+
+def leer_registros(directorio, segmento=0, desplazamiento=0):
+    """
+    Recorre el diario desde (segmento, desplazamiento) y produce
+    (segmento, desplazamiento_siguiente, mensaje). Un registro incompleto al
+    final de un segmento (escritura en curso, o el proceso se cayó a mitad)
+    se ignora; uno corrupto en el medio de un segmento es un error.
+    """
+    for numero in (n for n in listar_segmentos(directorio) if n >= segmento):
+        ruta = os.path.join(directorio, _nombre_segmento(numero))
+        with open(ruta, 'rb') as f:
+            if numero == segmento:
+                f.seek(desplazamiento)
+            posicion = f.tell()
+            while True:
+                cabecera = f.read(CABECERA.size)
+                if len(cabecera) < CABECERA.size:
+                    break
+                largo, crc = CABECERA.unpack(cabecera)
+                mensaje = f.read(largo)
+                if len(mensaje) < largo:
+                    break  # Cola cortada
+                if zlib.crc32(mensaje) != crc:
+                    if not f.read(1):
+                        break  # Último registro, escrito a medias
+                    raise ErrorDiario(f"Registro corrupto en {ruta} @ {posicion}")
+                posicion += CABECERA.size + largo
+                yield numero, posicion, mensaje
+
+
+class ConsumidorDiario:
+    """
+    Lee el diario a su propio ritmo y recuerda hasta dónde llegó en
+    `<diario>/<nombre>.pos`, así al reiniciarse sigue donde quedó.
+    """
+
+    def __init__(self, directorio, nombre='consumidor'):
+        self.directorio = directorio
+        self._ruta_posicion = os.path.join(directorio, f"{nombre}.pos")
+        self.segmento, self.desplazamiento = 0, 0
+        if os.path.exists(self._ruta_posicion):
+            with open(self._ruta_posicion) as f:
+                segmento, desplazamiento = f.read().split()
+                self.segmento, self.desplazamiento = int(segmento), int(desplazamiento)
+
+    def pendientes(self):
+        for segmento, desplazamiento, mensaje in leer_registros(self.directorio, self.segmento,
+                                                               self.desplazamiento):
+            yield (segmento, desplazamiento), mensaje
+
+    def confirmar(self, posicion):
+        """Guarda la posición de forma atómica (archivo temporal + rename)."""
+        self.segmento, self.desplazamiento = posicion
+        temporal = self._ruta_posicion + '.tmp'
+        with open(temporal, 'w') as f:
+            f.write(f"{self.segmento} {self.desplazamiento}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self._ruta_posicion)
+
+
+def _resumen(mensaje):
+    try:
+        v = VistaHL7(mensaje)
+        return f"{v.tipo_mensaje:<10} {v.id_control:<28} {v.nombre_paciente}"
+    except (ValueError, UnicodeDecodeError):
+        return f"(no HL7, {len(mensaje)} bytes)"
+
+
+# --- COMANDOS ---
+
+def comando_consumir(args):
+    consumidores = [ConsumidorDiario(d, args.nombre) for d in directorios_diario(args.diario)]
+    if not consumidores:
+        print(f"[✗] No hay diario en {args.diario}")
+        return
+    print(f"--- CONSUMIDOR '{args.nombre}' ({len(consumidores)} diario/s) ---")
+    try:
+        while True:
+            procesados = 0
+            for consumidor in consumidores:
+                posicion = None
+                for posicion, mensaje in consumidor.pendientes():
+                    print(f" -> {_resumen(mensaje)}")
+                    procesados += 1
+                    if procesados % 100 == 0:
+                        consumidor.confirmar(posicion)
+                if posicion is not None:
+                    consumidor.confirmar(posicion)
+            if not procesados:
+                if not args.seguir:
+                    break
+                time.sleep(args.intervalo)
+    except KeyboardInterrupt:
+        print("\nConsumidor detenido.")
+
+
+def comando_replay(args):
+    directorios = directorios_diario(args.diario)
+    mensajes = (mensaje for d in directorios for _, _, mensaje in leer_registros(d))
+    if args.destino:
+        from emisor_lote import EmisorLote
+        host, puerto = args.destino.rsplit(':', 1)
+        print(f"--- REPLAY de {args.diario} hacia {args.destino} ---")
+        EmisorLote(host, int(puerto)).enviar(mensajes).imprimir()
+    else:
+        total = 0
+        for mensaje in mensajes:
+            print(_resumen(mensaje))
+            total += 1
+        print(f"[i] {total} mensajes en el diario.")
+
+
+def _emisor_benchmark(diario, cantidad, mensaje, latencias):
+    for _ in range(cantidad):
+        t0 = time.perf_counter()
+        diario.agregar(mensaje).result()
+        latencias.append(time.perf_counter() - t0)
+
+
+def comando_benchmark(args):
+    from emisor_lote import generar_admisiones, percentil
+    mensaje = next(generar_admisiones(1)).encode('utf-8')
+
+    print("--- BENCHMARK DE ESTRATEGIAS DE FSYNC ---")
+    print(f"{args.emisores} emisores concurrentes x {args.mensajes} mensajes ({len(mensaje)} bytes)")
+    print(f"{'ESTRATEGIA':<10} | {'MSG/SEG':>9} | {'FSYNCS':>7} | {'MSG/FSYNC':>9} | {'P99 (ms)':>8}")
+    print("-" * 56)
+    for estrategia in args.estrategias:
+        with tempfile.TemporaryDirectory(dir=args.directorio) as directorio:
+            diario = DiarioHL7(directorio, estrategia)
+            latencias = []
+            hilos = [threading.Thread(target=_emisor_benchmark,
+                                      args=(diario, args.mensajes, mensaje, latencias))
+                     for _ in range(args.emisores)]
+            t0 = time.perf_counter()
+            for h in hilos:
+                h.start()
+            for h in hilos:
+                h.join()
+            duracion = time.perf_counter() - t0
+            diario.cerrar()
+            total = args.emisores * args.mensajes
+            por_fsync = total / diario.fsyncs if diario.fsyncs else float('inf')
+            print(f"{estrategia:<10} | {total / duracion:>9.0f} | {diario.fsyncs:>7} | "
+                  f"{por_fsync:>9.1f} | {percentil(latencias, 99) * 1000:>8.2f}")
+    print("-" * 56)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diario durable de mensajes HL7")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p = sub.add_parser('consumir', help="Procesar los mensajes nuevos del diario")
+    p.add_argument('diario')
+    p.add_argument('--nombre', default='consumidor')
+    p.add_argument('--seguir', action='store_true', help="Quedarse esperando mensajes nuevos")
+    p.add_argument('--intervalo', type=float, default=0.5)
+    p.set_defaults(funcion=comando_consumir)
+
+    p = sub.add_parser('replay', help="Releer todo el diario (o reenviarlo a un listener)")
+    p.add_argument('diario')
+    p.add_argument('--destino', metavar='HOST:PUERTO')
+    p.set_defaults(funcion=comando_replay)
+
+    p = sub.add_parser('benchmark', help="Comparar estrategias de fsync")
+    p.add_argument('--emisores', type=int, default=50)
+    p.add_argument('--mensajes', type=int, default=100)
+    p.add_argument('--estrategias', nargs='+', default=list(ESTRATEGIAS), choices=ESTRATEGIAS)
+    p.add_argument('--directorio', default='.', help="Dónde crear el diario temporal (¡el disco importa!)")
+    p.set_defaults(funcion=comando_benchmark)
+
+    args = parser.parse_args()
+    args.funcion(args)
+
+
+if __name__ == "__main__":
+    main()
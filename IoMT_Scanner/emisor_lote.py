@@ -0,0 +1,239 @@
+"""
+EMISOR HL7 EN LOTE CON VENTANA (emisor_lote.py)
+───────────────────────────────────────────────
+Mandar un día de admisiones "uno por uno" (conectar → enviar → esperar
+ACK → cerrar) paga una conexión y un viaje de ida y vuelta por mensaje.
+
+EmisorLote usa UNA conexión persistente y mantiene hasta `ventana`
+mensajes en vuelo a la vez (pipelining):
+
+    enviar 1, 2, 3, 4 ... ─────────►  servidor
+    ◄──────────────── ACK 1, ACK 2 ...
+
+Cada ACK se empareja con su mensaje por MSA-2 (el control ID original),
+así que no importa el orden en que lleguen. Un NAK (MSA-1 = AE/AR) o un
+ACK que no llega a tiempo se reintenta hasta `reintentos` veces.
+
+Si la conexión se corta (al leer o al escribir), se reconecta y todo lo
+que estaba en vuelo se reintenta. Una respuesta que no es HL7 se cuenta
+y se ignora: el mensaje sigue esperando su ACK (o su timeout).
+"""
+
+import datetime
+import selectors
+import socket
+import time
+from collections import OrderedDict, deque
+
+from hl7_rapido import VistaHL7
+from mllp import DecodificadorMLLP, empaquetar
+
+
+def leer_mensajes(ruta):
+    """
+    Lee mensajes HL7 de un archivo. Acepta tramas MLLP pegadas o texto
+    plano donde cada mensaje empieza con una línea MSH.
+    """
+    with open(ruta, 'rb') as f:
+        contenido = f.read()
+
+    if b'\x0b' in contenido:
+        yield from DecodificadorMLLP().alimentar(contenido)
+        return
+
+    segmentos = []
+    for linea in contenido.splitlines():
+        linea = linea.strip()
+        if not linea:
+            continue
+        if linea.startswith(b'MSH') and segmentos:
+            yield b'\r'.join(segmentos)
+            segmentos = []
+        segmentos.append(linea)
+    if segmentos:
+        yield b'\r'.join(segmentos)
+
+
+def generar_admisiones(cantidad):
+    """Genera `cantidad` ADT^A01 sintéticos con control IDs únicos."""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    for i in range(cantidad):
+        msh = f"MSH|^~\\&|SISTEMA_PY|FEDORA|MIRTH|SERVER|{timestamp}||ADT^A01|MSG-{timestamp}-{i}|P|2.3"
+        pid = f"PID|||{100000 + i}||LEDESMA^EMANUEL||19991108|M"
+        pv1 = "PV1||I|URGENCIAS^304^1||||001^DR. HOUSE"
+        yield f"{msh}\r{pid}\r{pv1}"
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) por el más cercano; 0.0 sin valores. Lo usan también los benchmarks."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class ResumenLote:
+    def __init__(self):
+        self.enviados = 0
+        self.confirmados = 0
+        self.fallidos = []       # control IDs que agotaron sus reintentos
+        self.naks = 0
+        self.respuestas_invalidas = 0   # tramas que no son un mensaje HL7
+        self.timeouts = 0
+        self.reintentos = 0
+        self.latencias = []      # segundos, del último envío al ACK
+        self.duracion = 0.0
+
+    def imprimir(self):
+        tasa = self.confirmados / self.duracion if self.duracion else 0.0
+        print("\n--- RESUMEN DEL LOTE ---")
+        print(f" Confirmados (AA): {self.confirmados}")
+        print(f" Fallidos:         {len(self.fallidos)}")
+        print(f" NAKs recibidos:   {self.naks}")
+        if self.respuestas_invalidas:
+            print(f" Resp. inválidas:  {self.respuestas_invalidas}")
+        print(f" Timeouts:         {self.timeouts}")
+        print(f" Reintentos:       {self.reintentos}")
+        print(f" Duración:         {self.duracion:.2f} s")
+        print(f" Throughput:       {tasa:.0f} mensajes/s")
+        print(f" Latencia p50:     {percentil(self.latencias, 50) * 1000:.2f} ms")
+        print(f" Latencia p99:     {percentil(self.latencias, 99) * 1000:.2f} ms")
+        print(f" Latencia máx:     {max(self.latencias, default=0) * 1000:.2f} ms")
+        for id_control in self.fallidos[:10]:
+            print(f"   ✗ {id_control}")
+
+
+class EmisorLote:
+    def __init__(self, host, puerto, ventana=32, reintentos=3, timeout=5.0):
+        self.host = host
+        self.puerto = puerto
+        self.ventana = ventana
+        self.reintentos = reintentos
+        self.timeout = timeout
+        self._sock = None
+        self._decodificador = None
+
+    def _conectar(self):
+        self._sock = socket.create_connection((self.host, self.puerto))
+        self._decodificador = DecodificadorMLLP()
+
+    def _cerrar(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def enviar(self, mensajes):
+        """
+        Envía todos los mensajes (lista o generador; se consume de a poco)
+        y retorna un ResumenLote.
+        """
+        resumen = ResumenLote()
+        en_vuelo = OrderedDict()   # control ID → [trama, t_envio, intentos]
+        por_reintentar = deque()   # (control ID, trama, intentos)
+        fuente = iter(mensajes)
+        agotada = False
+
+        def reintentar_o_fallar(id_control, trama, intentos):
+            if intentos > self.reintentos:
+                resumen.fallidos.append(id_control)
+            else:
+                resumen.reintentos += 1
+                por_reintentar.append((id_control, trama, intentos))
+
+        def reconectar():
+            # Se cayó la conexión: todo lo que estaba en vuelo se reintenta
+            print("⚠️ Conexión perdida. Reconectando...")
+            for id_control, (trama, _, intentos) in en_vuelo.items():
+                reintentar_o_fallar(id_control, trama, intentos)
+            en_vuelo.clear()
+            selector.unregister(self._sock)
+            self._cerrar()
+            self._conectar()
+            selector.register(self._sock, selectors.EVENT_READ)
+
+        self._conectar()
+        selector = selectors.DefaultSelector()
+        selector.register(self._sock, selectors.EVENT_READ)
+        t_inicio = time.perf_counter()
+        try:
+            while True:
+                # 1. Llenar la ventana (primero los reintentos)
+                while len(en_vuelo) < self.ventana:
+                    if por_reintentar:
+                        id_control, trama, intentos = por_reintentar.popleft()
+                    elif not agotada:
+                        try:
+                            mensaje = next(fuente)
+                        except StopIteration:
+                            agotada = True
+                            continue
+                        id_control = VistaHL7(mensaje).id_control
+                        trama, intentos = empaquetar(mensaje), 0
+                    else:
+                        break
+                    if id_control in en_vuelo:
+                        raise ValueError(f"Control ID duplicado en el lote: {id_control}")
+                    try:
+                        self._sock.sendall(trama)
+                    except OSError:
+                        # BrokenPipe / ConnectionReset: este mensaje cuenta
+                        # como un intento más y se reintenta con los demás
+                        reintentar_o_fallar(id_control, trama, intentos + 1)
+                        reconectar()
+                        continue
+                    en_vuelo[id_control] = [trama, time.perf_counter(), intentos + 1]
+                    resumen.enviados += 1
+
+                if not en_vuelo and not por_reintentar and agotada:
+                    break
+
+                # 2. Esperar ACKs, como mucho hasta el próximo vencimiento
+                if en_vuelo:
+                    primero = next(iter(en_vuelo.values()))
+                    espera = max(0.0, primero[1] + self.timeout - time.perf_counter())
+                else:
+                    espera = 0.0
+                if selector.select(espera):
+                    try:
+                        datos = self._sock.recv(65536)
+                    except OSError:
+                        datos = b''
+                    if not datos:
+                        reconectar()
+                        continue
+
+                    ahora = time.perf_counter()
+                    for ack in self._decodificador.alimentar(datos):
+                        try:
+                            msa = VistaHL7(ack).segmento('MSA')
+                            if msa is None:
+                                raise ValueError("Respuesta sin segmento MSA")
+                            estado, id_control = msa[1], msa[2]
+                        except (ValueError, UnicodeDecodeError):
+                            resumen.respuestas_invalidas += 1
+                            continue
+                        pendiente = en_vuelo.pop(id_control, None)
+                        if pendiente is None:
+                            continue  # ACK tardío de un mensaje ya reintentado
+                        trama, t_envio, intentos = pendiente
+                        if estado in ('AA', 'CA'):
+                            resumen.confirmados += 1
+                            resumen.latencias.append(ahora - t_envio)
+                        else:
+                            resumen.naks += 1
+                            reintentar_o_fallar(id_control, trama, intentos)
+
+                # 3. Vencimientos: el OrderedDict está en orden de envío
+                ahora = time.perf_counter()
+                while en_vuelo:
+                    id_control, (trama, t_envio, intentos) = next(iter(en_vuelo.items()))
+                    if t_envio + self.timeout > ahora:
+                        break
+                    del en_vuelo[id_control]
+                    resumen.timeouts += 1
+                    reintentar_o_fallar(id_control, trama, intentos)
+        finally:
+            resumen.duracion = time.perf_counter() - t_inicio
+            selector.close()
+            self._cerrar()
+        return resumen
@@ -1,34 +1,101 @@
 import paho.mqtt.client as mqtt
-import json
+import argparse
+
+from almacen_vitales import AlmacenVitales
+from enrutador_temas import EnrutadorPacientes
+from ingesta_vitales import CAPACIDAD, POLITICAS, PipelineVitales
+from motor_alertas import MotorAlertas, describir
 
 # CONFIGURACIÓN
 BROKER = "localhost"
 PUERTO = 1883
 TEMA = "hospital/pacientes/+/vitales"
 
+# El callback de paho sólo encola; decodificar y evaluar lo hacen los
+# trabajadores por lotes (ver ingesta_vitales.py)
+parser = argparse.ArgumentParser(description="Central de monitoreo (suscriptor MQTT)",
+                                 fromfile_prefix_chars='@')
+parser.add_argument('--puerto', type=int, default=PUERTO)
+parser.add_argument('--trabajadores', type=int, default=2)
+parser.add_argument('--capacidad', type=int, default=CAPACIDAD, help="Mensajes en cola como máximo")
+parser.add_argument('--politica', choices=POLITICAS, default='descartar',
+                    help="Cola llena: descartar el más viejo o bloquear la lectura del socket")
+parser.add_argument('--metricas', type=float, default=10, metavar='SEG',
+                    help="Imprimir métricas de la cola cada SEG segundos (0 = nunca)")
+parser.add_argument('--solo-alertas', action='store_true', help="No imprimir los pacientes estables")
+parser.add_argument('--alertas', choices=['ventanas', 'umbral'], default='ventanas',
+                    help="ventanas = reglas sobre el historial (motor_alertas.py); umbral = bpm > 120 por mensaje")
+parser.add_argument('--almacen', metavar='DIR',
+                    help="Guardar las muestras en un almacén de series (ver almacen_vitales.py)")
+parser.add_argument('--pacientes', nargs='+', metavar='ID',
+                    help="Monitorear sólo estos pacientes (@archivo: uno por línea); el resto se descarta sin decodificar")
+args = parser.parse_args()
+PUERTO = args.puerto
+
 print("--- CENTRAL DE MONITOREO (SUSCRIPTOR - FIXED) ---")
 
+# Con --alertas ventanas los trabajadores sólo cargan las muestras en el
+# motor y las reglas se evalúan para todos los pacientes una vez por segundo
+motor = MotorAlertas() if args.alertas == 'ventanas' else None
+# Con --almacen las muestras además quedan guardadas (crudo + resúmenes)
+almacen = AlmacenVitales(args.almacen).iniciar_escritura() if args.almacen else None
+
+def al_alertar(alertas):
+    print('\n'.join(f"🚨 ALERTA CRÍTICA: Paciente {paciente} con {describir(regla, valor)}"
+                    for paciente, regla, valor in alertas))
+
+def evaluar_lote(lote):
+    # Corre en un trabajador: [(estado del paciente, muestras)] ya
+    # decodificados (JSON o binario, ver formato_vitales.py)
+    todas = []
+    for estado, muestras in lote:
+        for datos in muestras:
+            # El paciente es el del tema (ver enrutador_temas.py), no el que
+            # diga el payload: así motor, almacén y --pacientes usan el mismo id
+            datos["id_paciente"] = estado.id
+            todas.append(datos)
+    if almacen is not None:
+        almacen.encolar(todas)
+    if motor is not None:
+        motor.agregar(todas)
+        return
+    lineas = []
+    for estado, muestras in lote:
+        for datos in muestras:
+            bpm = datos.get("bpm", 0)
+            # El paciente sale del tema (ver enrutador_temas.py)
+            paciente = estado.id
+
+            # Análisis de Riesgo
+            if bpm > 120:
+                lineas.append(f"🚨 ALERTA CRÍTICA: Paciente {paciente} con TAQUICARDIA ({bpm} BPM)")
+            elif not args.solo_alertas:
+                lineas.append(f"✅ Paciente {paciente}: Estable ({bpm} BPM)")
+    # Un solo print por lote: imprimir línea por línea también frena
+    if lineas:
+        print('\n'.join(lineas))
+
+def al_invalido(estado, error):
+    print(f"⚠️ Error: El mensaje del paciente {estado.id} no se pudo procesar ({error}).")
+
+# Con --pacientes sólo esos; sin él, todos los que publiquen en TEMA
+enrutador = EnrutadorPacientes(TEMA, args.pacientes)
+
+pipeline = PipelineVitales(evaluar_lote, args.trabajadores, args.capacidad, args.politica,
+                           al_invalido=al_invalido).iniciar()
+if args.metricas:
+    pipeline.informar(args.metricas)
+if motor is not None:
+    motor.iniciar(al_alertar)
+if almacen is not None:
+    almacen.iniciar_compactacion()
+
 def al_recibir_mensaje(client, userdata, msg):
-    try:
-        # 1. Decodificar el mensaje (Bytes -> Texto)
-        contenido = msg.payload.decode()
-        
-        # 2. Parsear JSON (Texto -> Diccionario Python)
-        datos = json.loads(contenido)
-            
-        bpm = datos.get("bpm", 0)
-        paciente = datos.get("id_paciente", "?")
-        
-        # 3. Análisis de Riesgo
-        if bpm > 120:
-            print(f"🚨 ALERTA CRÍTICA: Paciente {paciente} con TAQUICARDIA ({bpm} BPM)")
-        else:
-            print(f"✅ Paciente {paciente}: Estable ({bpm} BPM)")
-            
-    except json.JSONDecodeError:
-        print("⚠️ Error: El mensaje recibido no es un JSON válido.")
-    except Exception as e:
-        print(f"❌ Error procesando datos: {e}")
+    # Nada de trabajo en el hilo de red: el paciente sale del tema, los que
+    # no se monitorean se descartan acá, y el resto se encola sin decodificar
+    estado = enrutador.enrutar(msg.topic)
+    if estado is not None:
+        pipeline.encolar(estado, msg.payload)
 
 # Configuración del Cliente
 cliente = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
@@ -41,4 +108,12 @@ cliente.subscribe(TEMA)
 try:
     cliente.loop_forever()
 except KeyboardInterrupt:
-    print("\nDesconectando central...")
\ No newline at end of file
+    print("\nDesconectando central...")
+finally:
+    pipeline.detener()
+    if enrutador.ajenos:
+        print(f"ℹ️ {enrutador.ajenos:,} mensajes de pacientes no monitoreados descartados sin decodificar")
+    if almacen is not None:
+        almacen.cerrar()
+        if almacen.descartados:
+            print(f"⚠️ Almacén: {almacen.descartados:,} lotes sin guardar (escritura saturada)")
\ No newline at end of file
@@ -1,7 +1,12 @@
 import paho.mqtt.client as mqtt
-import json
+import argparse
 import ssl
 
+from almacen_vitales import AlmacenVitales
+from enrutador_temas import EnrutadorPacientes
+from ingesta_vitales import CAPACIDAD, POLITICAS, PipelineVitales
+from motor_alertas import MotorAlertas, describir
+
 # CONFIGURACIÓN SEGURA
 BROKER = "localhost"
 PUERTO = 8883
@@ -10,19 +15,80 @@ USUARIO = "enfermero"
 CLAVE = "5678"
 CA_CERT = "hospital.crt"
 
+# Misma ingesta que enfermeria.py: el callback encola y los trabajadores
+# decodifican y evalúan por lotes (ver ingesta_vitales.py)
+parser = argparse.ArgumentParser(description="Central de monitoreo segura (MQTTS)",
+                                 fromfile_prefix_chars='@')
+parser.add_argument('--trabajadores', type=int, default=2)
+parser.add_argument('--capacidad', type=int, default=CAPACIDAD, help="Mensajes en cola como máximo")
+parser.add_argument('--politica', choices=POLITICAS, default='descartar',
+                    help="Cola llena: descartar el más viejo o bloquear la lectura del socket")
+parser.add_argument('--metricas', type=float, default=10, metavar='SEG',
+                    help="Imprimir métricas de la cola cada SEG segundos (0 = nunca)")
+parser.add_argument('--alertas', choices=['ventanas', 'umbral'], default='ventanas',
+                    help="ventanas = reglas sobre el historial (motor_alertas.py); umbral = bpm > 120 por mensaje")
+parser.add_argument('--almacen', metavar='DIR',
+                    help="Guardar las muestras en un almacén de series (ver almacen_vitales.py)")
+parser.add_argument('--pacientes', nargs='+', metavar='ID',
+                    help="Monitorear sólo estos pacientes (@archivo: uno por línea); el resto se descarta sin decodificar")
+args = parser.parse_args()
+
 print("--- CENTRAL DE MONITOREO SEGURA (MQTTS) ---")
 
+# Reglas sobre el historial de cada paciente, evaluadas una vez por segundo
+motor = MotorAlertas() if args.alertas == 'ventanas' else None
+# Con --almacen las muestras además quedan guardadas (crudo + resúmenes)
+almacen = AlmacenVitales(args.almacen).iniciar_escritura() if args.almacen else None
+
+def al_alertar(alertas):
+    print('\n'.join(f"[TLS_1.2] 🚨 ALERTA Paciente {paciente}: {describir(regla, valor)}"
+                    for paciente, regla, valor in alertas))
+
+def evaluar_lote(lote):
+    todas = []
+    for estado, muestras in lote:
+        for datos in muestras:
+            # El paciente es el del tema (ver enrutador_temas.py), no el que
+            # diga el payload: así motor, almacén y --pacientes usan el mismo id
+            datos["id_paciente"] = estado.id
+            todas.append(datos)
+    if almacen is not None:
+        almacen.encolar(todas)
+    if motor is not None:
+        motor.agregar(todas)
+        return
+    lineas = []
+    for estado, muestras in lote:
+        for datos in muestras:
+            bpm = datos.get("bpm", 0)
+            # El binario (formato_vitales.py) no trae "seguridad": todo lo
+            # que llega acá pasó por este canal TLS
+            protocolo = datos.get("seguridad", "TLS_1.2")
+
+            veredicto = "🚨 ALERTA" if bpm > 120 else "✅ Normal"
+            lineas.append(f"[{protocolo}] Paciente {estado.id}: {bpm} BPM -> {veredicto}")
+    if lineas:
+        print('\n'.join(lineas))
+
+def al_invalido(estado, error):
+    print(f"Error (paciente {estado.id}): {error}")
+
+# Con --pacientes sólo esos; sin él, todos los que publiquen en TEMA
+enrutador = EnrutadorPacientes(TEMA, args.pacientes)
+
+pipeline = PipelineVitales(evaluar_lote, args.trabajadores, args.capacidad, args.politica,
+                           al_invalido=al_invalido).iniciar()
+if args.metricas:
+    pipeline.informar(args.metricas)
+if motor is not None:
+    motor.iniciar(al_alertar)
+if almacen is not None:
+    almacen.iniciar_compactacion()
+
 def al_recibir(client, userdata, msg):
-    try:
-        datos = json.loads(msg.payload.decode())
-        bpm = datos.get("bpm", 0)
-        protocolo = datos.get("seguridad", "INSEGURO")
-        
-        estado = "🚨 ALERTA" if bpm > 120 else "✅ Normal"
-        print(f"[{protocolo}] Paciente: {bpm} BPM -> {estado}")
-            
-    except Exception as e:
-        print(f"Error: {e}")
+    estado = enrutador.enrutar(msg.topic)
+    if estado is not None:
+        pipeline.encolar(estado, msg.payload)
 
 cliente = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
 cliente.on_message = al_recibir
@@ -40,4 +106,12 @@ try:
 except KeyboardInterrupt:
     print("\nDesconectando...")
 except Exception as e:
-    print(f"❌ Acceso Denegado: {e}")
\ No newline at end of file
+    print(f"❌ Acceso Denegado: {e}")
+finally:
+    pipeline.detener()
+    if enrutador.ajenos:
+        print(f"ℹ️ {enrutador.ajenos:,} mensajes de pacientes no monitoreados descartados sin decodificar")
+    if almacen is not None:
+        almacen.cerrar()
+        if almacen.descartados:
+            print(f"⚠️ Almacén: {almacen.descartados:,} lotes sin guardar (escritura saturada)")
\ No newline at end of file
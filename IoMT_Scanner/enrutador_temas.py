@@ -0,0 +1,119 @@
+"""
+ENRUTADOR DE TEMAS POR PACIENTE (enrutador_temas.py)
+────────────────────────────────────────────────────
+La central se suscribe a 'hospital/pacientes/+/vitales' y todo caía en un
+solo callback: para saber de quién era un mensaje había que decodificar el
+payload y leer "id_paciente". Aunque el paciente no nos interesara.
+
+El paciente YA viene en el tema. El enrutador:
+
+  1. compila los filtros una vez en UNA expresión regular: el '+' del
+     paciente se captura, los demás '+' son [^/]+
+  2. por mensaje: un fullmatch sobre el tema (no importa cuántos pacientes
+     haya) y buscar el estado de ese paciente en un dict
+  3. si el paciente no está monitoreado → None, y el payload ni se mira
+
+El costo por mensaje es el mismo con 10 pacientes que con 100.000
+(ver benchmark_enrutador.py).
+
+Uso:
+    enrutador = EnrutadorPacientes(pacientes=['000123', '000124'])
+    estado = enrutador.enrutar('hospital/pacientes/000123/vitales')   # EstadoPaciente
+    enrutador.enrutar('hospital/pacientes/999999/vitales')            # None
+"""
+
+import re
+import time
+
+TEMA_VITALES = "hospital/pacientes/+/vitales"
+
+
+class EstadoPaciente:
+    """Lo que la central sabe de un paciente, sin haber abierto un payload."""
+
+    __slots__ = ('id', 'mensajes', 'ultimo')
+
+    def __init__(self, id_paciente):
+        self.id = id_paciente
+        self.mensajes = 0
+        self.ultimo = None
+
+    def __repr__(self):
+        return f"EstadoPaciente({self.id!r}, mensajes={self.mensajes})"
+
+
+class EnrutadorPacientes:
+    """
+    pacientes: ids a monitorear. None = todos (el estado se crea con el
+    primer mensaje de cada paciente).
+    crear(id) arma el estado de un paciente nuevo (EstadoPaciente por defecto).
+    """
+
+    def __init__(self, filtros=(TEMA_VITALES,), pacientes=None, crear=EstadoPaciente):
+        self._alternativas = []
+        self._patron = None
+        self.crear = crear
+        self.todos = pacientes is None
+        self.estados = {}
+        self.enrutados = 0
+        self.ajenos = 0
+        for filtro in ([filtros] if isinstance(filtros, str) else filtros):
+            self.agregar_filtro(filtro)
+        for id_paciente in pacientes or ():
+            self.monitorear(id_paciente)
+
+    def agregar_filtro(self, filtro, nivel_paciente=0):
+        """
+        Compila un filtro MQTT. El paciente es el '+' número `nivel_paciente`
+        (por defecto el primero). '#' no se admite: el paciente tiene que
+        estar en una posición fija.
+        """
+        niveles = filtro.split('/')
+        if '#' in niveles:
+            raise ValueError(f"Filtro con '#': no se puede ubicar al paciente ({filtro})")
+        comodines = [i for i, nivel in enumerate(niveles) if nivel == '+']
+        if not comodines:
+            raise ValueError(f"El filtro no tiene un '+' para el paciente ({filtro})")
+        posicion = comodines[nivel_paciente]
+        self._alternativas.append('/'.join(
+            '([^/]+)' if i == posicion else '[^/]+' if nivel == '+' else re.escape(nivel)
+            for i, nivel in enumerate(niveles)))
+        # Un solo grupo por alternativa: lastindex dice cuál coincidió
+        self._patron = re.compile('|'.join(f'(?:{alternativa})' for alternativa in self._alternativas))
+
+    def monitorear(self, id_paciente):
+        estado = self.estados.get(id_paciente)
+        if estado is None:
+            estado = self.estados[id_paciente] = self.crear(id_paciente)
+        return estado
+
+    def dejar(self, id_paciente):
+        """Deja de monitorear (sus mensajes pasan a descartarse)."""
+        return self.estados.pop(id_paciente, None)
+
+    def enrutar(self, tema):
+        """
+        Estado del paciente del tema, o None si el tema no es de vitales o el
+        paciente no está monitoreado. Corre en el hilo de red de paho.
+        """
+        coincidencia = self._patron.fullmatch(tema)
+        if coincidencia is None:
+            self.ajenos += 1
+            return None
+        id_paciente = coincidencia.group(coincidencia.lastindex)
+        estado = self.estados.get(id_paciente)
+        if estado is None:
+            if not self.todos:
+                self.ajenos += 1
+                return None
+            estado = self.monitorear(id_paciente)
+        estado.mensajes += 1
+        estado.ultimo = time.monotonic()
+        self.enrutados += 1
+        return estado
+
+    def silenciosos(self, segundos, ahora=None):
+        """Pacientes monitoreados sin mensajes en los últimos `segundos`."""
+        ahora = time.monotonic() if ahora is None else ahora
+        return [estado.id for estado in list(self.estados.values())
+                if estado.ultimo is None or ahora - estado.ultimo > segundos]
@@ -0,0 +1,117 @@
+"""
+BASE DE EXPOSICIÓN DE ORTHANC (exposicion_orthanc.py)
+─────────────────────────────────────────────────────
+Lo que la auditoría de ladron_api.py logró leer de cada servidor, en una
+tabla SQLite, más el cursor de /changes hasta donde ya se revisó:
+
+    cursores   servidor → último Seq de /changes procesado
+    recursos   servidor, nivel (Patient/Study/Instance), id de Orthanc,
+               los datos identificatorios visibles (nombre, PatientID,
+               nacimiento, sexo) y los MainDicomTags completos en JSON;
+               'borrado' marca lo que desapareció del servidor
+
+Con el cursor guardado, la próxima corrida pide sólo los cambios nuevos
+(ver ladron_api.py --incremental) en vez de volver a bajar todo.
+
+Modo WAL, como el manifiesto de envíos: se puede consultar mientras la
+auditoría escribe.
+"""
+
+import json
+import sqlite3
+import time
+
+ARCHIVO_EXPOSICION = '.exposicion_orthanc.sqlite'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS cursores (
+    servidor TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    momento REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recursos (
+    servidor TEXT NOT NULL,
+    nivel TEXT NOT NULL,
+    id TEXT NOT NULL,
+    padre TEXT,
+    paciente_id TEXT,
+    nombre TEXT,
+    nacimiento TEXT,
+    sexo TEXT,
+    tags TEXT NOT NULL,
+    visto REAL NOT NULL,
+    actualizado REAL NOT NULL,
+    borrado REAL,
+    PRIMARY KEY (servidor, nivel, id)
+);
+"""
+
+PADRES = {"Study": "ParentPatient", "Series": "ParentStudy", "Instance": "ParentSeries"}
+
+
+def _fila(recurso):
+    """(nivel, id, padre, paciente_id, nombre, nacimiento, sexo, tags JSON) de un recurso expandido."""
+    nivel = recurso["Type"]
+    # Los estudios traen los tags del paciente aparte: cuentan igual como expuestos
+    tags = dict(recurso.get("PatientMainDicomTags", {}), **recurso.get("MainDicomTags", {}))
+    return (nivel, recurso["ID"], recurso.get(PADRES.get(nivel, ""), None),
+            tags.get("PatientID"), tags.get("PatientName"), tags.get("PatientBirthDate"),
+            tags.get("PatientSex"), json.dumps(tags, ensure_ascii=False, sort_keys=True))
+
+
+class BaseExposicion:
+    def __init__(self, servidor, ruta=ARCHIVO_EXPOSICION):
+        self.servidor = servidor
+        self.ruta = ruta
+        self._conexion = sqlite3.connect(ruta, timeout=30)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.executescript(ESQUEMA)
+
+    def cerrar(self):
+        self._conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cursor(self):
+        """Último Seq procesado de este servidor, o None si nunca se auditó."""
+        fila = self._conexion.execute("SELECT seq FROM cursores WHERE servidor = ?",
+                                      (self.servidor,)).fetchone()
+        return fila[0] if fila else None
+
+    def registrar(self, recursos, borrados=(), seq=None):
+        """
+        Guarda los recursos (expandidos, como los devuelve Orthanc), marca
+        los borrados [(nivel, id)] y mueve el cursor a `seq`: todo en una
+        transacción, así un corte nunca deja el cursor adelante de los datos.
+        """
+        ahora = time.time()
+        with self._conexion:
+            self._conexion.executemany(
+                """INSERT INTO recursos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)
+                   ON CONFLICT (servidor, nivel, id) DO UPDATE SET
+                       padre = excluded.padre, paciente_id = excluded.paciente_id,
+                       nombre = excluded.nombre, nacimiento = excluded.nacimiento,
+                       sexo = excluded.sexo, tags = excluded.tags,
+                       actualizado = excluded.actualizado, borrado = NULL""",
+                ((self.servidor, *_fila(recurso), ahora, ahora) for recurso in recursos))
+            self._conexion.executemany(
+                "UPDATE recursos SET borrado = ? WHERE servidor = ? AND nivel = ? AND id = ?",
+                ((ahora, self.servidor, nivel, id_) for nivel, id_ in borrados))
+            if seq is not None:
+                self._conexion.execute("INSERT OR REPLACE INTO cursores VALUES (?, ?, ?)",
+                                       (self.servidor, seq, ahora))
+
+    def resumen(self):
+        """{nivel: (vigentes, con nombre del paciente visible, borrados)}."""
+        filas = self._conexion.execute(
+            """SELECT nivel,
+                      SUM(borrado IS NULL),
+                      SUM(borrado IS NULL AND COALESCE(nombre, '') != ''),
+                      SUM(borrado IS NOT NULL)
+               FROM recursos WHERE servidor = ? GROUP BY nivel""", (self.servidor,))
+        return {nivel: (vigentes, con_nombre, borrados) for nivel, vigentes, con_nombre, borrados in filas}
@@ -0,0 +1,121 @@
+"""
+FORMATO BINARIO DE SIGNOS VITALES (formato_vitales.py)
+──────────────────────────────────────────────────────
+Cada mensaje JSON de la pulsera repite las claves ("id_paciente",
+"timestamp", "bateria"...) y ocupa ~90 bytes para transportar 4 números.
+Y la central hace json.loads de cada uno.
+
+Formato binario v1 (little endian, tamaño fijo con struct):
+
+    cabecera  (18 bytes): versión (B) | muestras (B) | id_paciente (8s) | t0 (d)
+    c/muestra  (7 bytes): ms desde t0 (I) | bpm (B) | spo2 (B) | batería (B)
+
+Una muestra sola = 25 bytes. Con --lote, varias muestras del mismo paciente
+viajan en un mensaje (cabecera una vez, 7 bytes por muestra más).
+
+Negociación por el PRIMER BYTE del payload, sin tocar los temas:
+    0x01      → binario v1
+    '{' o '[' → JSON (el formato de siempre, o una lista para lotes)
+Así la central entiende los dos y cada pulsera elige (--formato).
+"""
+
+import json
+import struct
+
+VERSION_BINARIA = 1
+FORMATOS = ('json', 'binario')
+
+_CABECERA = struct.Struct('<BB8sd')
+_MUESTRA = struct.Struct('<IBBB')
+MAXIMO_MUESTRAS = 255
+
+
+class FormatoInvalido(ValueError):
+    pass
+
+
+def _byte(valor):
+    return max(0, min(255, int(valor)))
+
+
+def codificar_binario(muestras):
+    """Lista de dicts (del mismo paciente) → bytes en formato v1."""
+    if not 0 < len(muestras) <= MAXIMO_MUESTRAS:
+        raise FormatoInvalido(f"Un mensaje lleva entre 1 y {MAXIMO_MUESTRAS} muestras")
+    primera = muestras[0]
+    id_paciente = str(primera.get("id_paciente", primera.get("id", ""))).encode('ascii')
+    if len(id_paciente) > 8:
+        raise FormatoInvalido(f"id_paciente de más de 8 caracteres: {id_paciente!r}")
+    t0 = primera["timestamp"]
+    partes = [_CABECERA.pack(VERSION_BINARIA, len(muestras), id_paciente, t0)]
+    for muestra in muestras:
+        partes.append(_MUESTRA.pack(int(round((muestra["timestamp"] - t0) * 1000)),
+                                    _byte(muestra["bpm"]), _byte(muestra["spo2"]),
+                                    _byte(muestra.get("bateria", 0))))
+    return b''.join(partes)
+
+
+def decodificar_binario(payload):
+    try:
+        version, cantidad, id_paciente, t0 = _CABECERA.unpack_from(payload)
+    except struct.error as e:
+        raise FormatoInvalido(f"Cabecera binaria incompleta: {e}") from None
+    if version != VERSION_BINARIA:
+        raise FormatoInvalido(f"Versión binaria desconocida: {version}")
+    if len(payload) != _CABECERA.size + cantidad * _MUESTRA.size:
+        raise FormatoInvalido("El largo no coincide con la cantidad de muestras")
+    id_paciente = id_paciente.rstrip(b'\0').decode('ascii')
+    return [{"id_paciente": id_paciente, "timestamp": t0 + ms / 1000,
+             "bpm": bpm, "spo2": spo2, "bateria": bateria}
+            for ms, bpm, spo2, bateria in _MUESTRA.iter_unpack(memoryview(payload)[_CABECERA.size:])]
+
+
+def codificar(muestras, formato='json'):
+    """
+    Una muestra (dict) o varias (lista) → payload. En JSON una muestra sola
+    queda igual que siempre (compatible con las centrales viejas).
+    """
+    if isinstance(muestras, dict):
+        muestras = [muestras]
+    if formato == 'binario':
+        return codificar_binario(muestras)
+    return json.dumps(muestras[0] if len(muestras) == 1 else muestras)
+
+
+def _numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+
+def _validar(muestras):
+    """
+    JSON válido no es lo mismo que una muestra válida: `[1]` o un bpm en
+    texto romperían a quien las procese. Se exige un dict por muestra con
+    timestamp, y números en los campos que se usan para alertar y guardar.
+    """
+    if not muestras:
+        raise FormatoInvalido("Lista de muestras vacía")
+    for muestra in muestras:
+        if not isinstance(muestra, dict):
+            raise FormatoInvalido(f"Muestra que no es un objeto: {str(muestra)[:40]!r}")
+        if not _numero(muestra.get("timestamp")):
+            raise FormatoInvalido("Muestra sin timestamp numérico")
+        for campo in ("bpm", "spo2", "bateria"):
+            if campo in muestra and not _numero(muestra[campo]):
+                raise FormatoInvalido(f"{campo} no numérico: {str(muestra[campo])[:20]!r}")
+    return muestras
+
+
+def decodificar(payload):
+    """Payload (bytes) en cualquier formato → lista de muestras (dicts)."""
+    if not payload:
+        raise FormatoInvalido("Payload vacío")
+    primero = payload[0]
+    if primero == VERSION_BINARIA:
+        return decodificar_binario(payload)
+    if primero in b'{[':
+        try:
+            datos = json.loads(payload)
+        except ValueError as e:
+            raise FormatoInvalido(f"JSON inválido: {e}") from None
+        return _validar(datos if isinstance(datos, list) else [datos])
+    raise FormatoInvalido(f"Formato desconocido (primer byte 0x{primero:02X})")
@@ -0,0 +1,142 @@
+"""
+LECTOR HL7 RÁPIDO (hl7_rapido.py)
+─────────────────────────────────
+Para enrutar y responder el ACK sólo necesitamos MSH-9, MSH-10 y PID-5,
+pero hl7.parse() arma el árbol completo (segmentos → campos → repeticiones
+→ componentes) de TODO el mensaje. Con un ORU de 200 OBX eso es casi todo
+el CPU del listener.
+
+VistaHL7 trabaja directo sobre los bytes recibidos:
+  1. Al crearla, una sola pasada (en C, con una regex) marca dónde empieza
+     y termina cada segmento.
+  2. Las posiciones de los campos de un segmento se calculan recién la
+     primera vez que alguien lo consulta, y quedan guardadas.
+  3. Sólo se decodifica a texto el campo que se pide.
+  4. Si un handler necesita la estructura profunda, vista.completo()
+     recurre a hl7.parse() (una única vez, queda en caché).
+
+La numeración de campos es la misma que en la librería hl7:
+    vista[0][9]  → MSH-9  (tipo de mensaje)
+    vista[0][10] → MSH-10 (control ID)
+    vista[1][5]  → PID-5  (nombre del paciente)
+"""
+
+import re
+
+import hl7
+
+_FIN_SEGMENTO = re.compile(rb'[^\r\n]+')
+
+
+class SegmentoRapido:
+    __slots__ = ('_datos', '_inicio', '_fin', '_separador', '_es_msh', '_campos', '_codificacion')
+
+    def __init__(self, datos, inicio, fin, separador, codificacion):
+        self._datos = datos
+        self._inicio = inicio
+        self._fin = fin
+        self._separador = separador
+        self._codificacion = codificacion
+        self._es_msh = datos.startswith(b'MSH', inicio)
+        self._campos = None
+
+    def _indexar(self):
+        # Posiciones de inicio de cada campo, calculadas una sola vez
+        datos, sep, fin = self._datos, self._separador, self._fin
+        inicios = [self._inicio]
+        pos = datos.find(sep, self._inicio, fin)
+        while pos >= 0:
+            inicios.append(pos + 1)
+            pos = datos.find(sep, pos + 1, fin)
+        self._campos = inicios
+
+    def __len__(self):
+        if self._campos is None:
+            self._indexar()
+        # En MSH el separador cuenta como campo (MSH-1), igual que en hl7
+        return len(self._campos) + (1 if self._es_msh else 0)
+
+    def __getitem__(self, n):
+        """Texto del campo n (con sus componentes sin separar). '' si no existe."""
+        if self._es_msh:
+            if n == 1:
+                return chr(self._separador[0])
+            if n > 1:
+                n -= 1
+        if self._campos is None:
+            self._indexar()
+        if n >= len(self._campos) or n < 0:
+            return ''
+        inicio = self._campos[n]
+        fin = self._campos[n + 1] - 1 if n + 1 < len(self._campos) else self._fin
+        return self._datos[inicio:fin].decode(self._codificacion)
+
+    @property
+    def nombre(self):
+        return self._datos[self._inicio:self._inicio + 3].decode('ascii')
+
+    def __str__(self):
+        return self._datos[self._inicio:self._fin].decode(self._codificacion)
+
+
+class VistaHL7:
+    def __init__(self, datos, codificacion='utf-8'):
+        if isinstance(datos, str):
+            datos = datos.encode(codificacion)
+        if not datos.startswith(b'MSH'):
+            raise ValueError("El mensaje HL7 no empieza con un segmento MSH")
+        self._datos = datos
+        self._codificacion = codificacion
+        self._separador = datos[3:4]
+        self._limites = [(m.start(), m.end()) for m in _FIN_SEGMENTO.finditer(datos)]
+        self._segmentos = [None] * len(self._limites)
+        self._arbol = None
+
+    def __len__(self):
+        return len(self._limites)
+
+    def __getitem__(self, i):
+        segmento = self._segmentos[i]
+        if segmento is None:
+            inicio, fin = self._limites[i]
+            segmento = SegmentoRapido(self._datos, inicio, fin, self._separador, self._codificacion)
+            self._segmentos[i] = segmento
+        return segmento
+
+    def segmento(self, nombre):
+        """Primer segmento con ese nombre ('PID', 'PV1'...), o None."""
+        clave = nombre.encode('ascii')
+        for i, (inicio, _) in enumerate(self._limites):
+            if self._datos.startswith(clave, inicio):
+                return self[i]
+        return None
+
+    def segmentos(self, nombre):
+        """Todos los segmentos con ese nombre (p. ej. todos los OBX)."""
+        clave = nombre.encode('ascii')
+        return [self[i] for i, (inicio, _) in enumerate(self._limites)
+                if self._datos.startswith(clave, inicio)]
+
+    # Atajos para lo que usan los listeners
+    @property
+    def tipo_mensaje(self):
+        return self[0][9]
+
+    @property
+    def id_control(self):
+        return self[0][10]
+
+    @property
+    def nombre_paciente(self):
+        pid = self.segmento('PID')
+        return pid[5] if pid is not None else ''
+
+    def completo(self):
+        """Árbol completo de hl7.parse(), para handlers que lo necesiten."""
+        if self._arbol is None:
+            texto = self._datos.decode(self._codificacion).replace('\n', '\r')
+            self._arbol = hl7.parse(texto)
+        return self._arbol
+
+    def __str__(self):
+        return self._datos.decode(self._codificacion)
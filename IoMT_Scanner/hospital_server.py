@@ -1,69 +1,236 @@
-import socket
-import hl7
-import datetime
+from hl7_rapido import VistaHL7
+import asyncio
+import argparse
+import os
+from detector_phi import DetectorPHI, cargar_nombres, revisar_hl7
+from diario import DiarioHL7, ErrorDiario, ESTRATEGIAS
+from mllp import DecodificadorMLLP, ErrorTramaMLLP, armar_ack
+from trabajadores import GeneradorIdControl, crear_socket_escucha, lanzar_trabajadores
 
 # --- CONFIGURACIÓN DEL SERVIDOR ---
 HOST = '0.0.0.0'
 PORT = 6661
-SB = b'\x0b'
-EB = b'\x1c'
-CR = b'\x0d'
 
-def iniciar_servidor():
+# Con decenas de emisores a la vez, imprimir cada mensaje frena el servidor.
+# El modo --silencioso (lo usa el benchmark) apaga el detalle por mensaje.
+VERBOSO = True
+
+# Control IDs únicos para los ACK, compartidos entre trabajadores (--workers)
+GENERADOR_ID = GeneradorIdControl()
+
+# Diario durable (--diario): el mensaje se guarda en disco ANTES del ACK y un
+# consumidor aparte lo procesa a su ritmo (ver diario.py).
+DIARIO = None
+
+# PHI en texto libre (NTE-3, OBX-5): nombres, historias clínicas, fechas y
+# teléfonos que no deberían viajar en una nota (ver detector_phi.py).
+# Una sola regex por campo. Los hallazgos sólo se imprimen: con --sin-phi o
+# --silencioso nadie los mira, así que el detector queda en None y no se
+# revisa ningún mensaje.
+DETECTOR = DetectorPHI()
+
+def procesar_mensaje(mensaje):
+    """
+    Lee un mensaje HL7 ya desempaquetado (bytes) y arma el ACK en MLLP.
+    Retorna los bytes del ACK, o None si el mensaje no tiene segmentos.
+    """
+    # 2. PARSEAR HL7
+    # Para el ACK sólo hacen falta 3 campos: VistaHL7 los lee directo de los
+    # bytes sin armar el árbol completo de hl7.parse() (ver hl7_rapido.py).
+    h = VistaHL7(mensaje)
+
+    # SAFETY CHECK: Verificamos que el mensaje tenga al menos 2 segmentos
+    if len(h) > 1:
+        tipo_mensaje = h.tipo_mensaje
+        id_control = h.id_control
+        nombre_paciente = h.nombre_paciente
+
+        if VERBOSO:
+            print("-" * 40)
+            print(f" EVENTO:      {tipo_mensaje}")
+            print(f" PACIENTE:    {nombre_paciente}")
+            print(f" CONTROL ID:  {id_control}")
+            print("-" * 40)
+
+        if DETECTOR is not None:
+            for campo, tipo, _ in revisar_hl7(h, DETECTOR):
+                # Se informa el tipo y el campo, nunca el dato en sí
+                print(f"⚠️ PHI en texto libre: {tipo} en {campo} (control {id_control})")
+
+        # 3. RESPONDER (ACK)
+        return armar_ack('PYTHON_SRV', id_control, GENERADOR_ID.siguiente())
+    else:
+        print("⚠️ ALERTA: El mensaje llegó, pero no se detectaron segmentos separados.")
+        print(f"Contenido crudo: {h}")
+        return None
+
+def armar_nak(mensaje, error, codigo='AE'):
+    """
+    NAK en MLLP para un mensaje que NO se pudo guardar (p. ej. el diario
+    falló con el disco lleno): AE = error de aplicación, el emisor reintenta.
+    """
+    return armar_ack('PYTHON_SRV', VistaHL7(mensaje).id_control, GENERADOR_ID.siguiente(),
+                     codigo, detalle=error)
+
+def iniciar_servidor(reuse_port=False):
     print(f"--- MOTOR DE INTEGRACIÓN PYTHON (HL7 LISTENER - V2 FINAL) ---")
     print(f"[.] Escuchando en el puerto {PORT}...")
-    
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        s.bind((HOST, PORT))
-        s.listen()
-        
+
+    with crear_socket_escucha(HOST, PORT, reuse_port) as s:
         while True:
             conn, addr = s.accept()
             with conn:
                 print(f"\n[+] Conexión recibida desde: {addr[0]}")
-                datos_crudos = conn.recv(4096)
-                if not datos_crudos:
-                    break
-                
-                # 1. DESEMPAQUETAR MLLP (CORREGIDO)
-                # Usamos Slicing [1:-2] para quitar SB y EB+CR sin tocar el contenido interno.
-                try:
-                    mensaje_limpio = datos_crudos[1:-2]
-                    mensaje_texto = mensaje_limpio.decode('utf-8')
-                    
-                    print(f"[Incoming] Mensaje recibido. Tamaño: {len(datos_crudos)} bytes")
-                    
-                    # 2. PARSEAR HL7
-                    h = hl7.parse(mensaje_texto)
-                    
-                    # SAFETY CHECK: Verificamos que el mensaje tenga al menos 2 segmentos
-                    if len(h) > 1:
-                        tipo_mensaje = h[0][9]
-                        id_control = h[0][10]
-                        nombre_paciente = h[1][5] 
-                        
-                        print("-" * 40)
-                        print(f" EVENTO:      {tipo_mensaje}")
-                        print(f" PACIENTE:    {nombre_paciente}")
-                        print(f" CONTROL ID:  {id_control}")
-                        print("-" * 40)
-                        
-                        # 3. RESPONDER (ACK)
-                        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-                        ack_hl7 = f"MSH|^~\\&|PYTHON_SRV|LINUX|RECEPCION|HOSPITAL|{timestamp}||ACK|ACK{timestamp}|P|2.3\rMSA|AA|{id_control}"
-                        ack_mllp = SB + ack_hl7.encode('utf-8') + EB + CR
-                        conn.sendall(ack_mllp)
-                        print("[Out] ACK enviado.")
-                    else:
-                        print("⚠️ ALERTA: El mensaje llegó, pero no se detectaron segmentos separados.")
-                        print(f"Contenido crudo: {mensaje_texto}")
+                # 1. DESEMPAQUETAR MLLP
+                # TCP puede partir o juntar tramas: el decodificador arma los
+                # mensajes completos sin importar cómo lleguen los bytes.
+                decodificador = DecodificadorMLLP()
+                while True:
+                    try:
+                        datos_crudos = conn.recv(4096)
+                    except ConnectionResetError:
+                        break
+                    if not datos_crudos:
+                        break  # El emisor cerró: atendemos al siguiente
+
+                    try:
+                        mensajes = decodificador.alimentar(datos_crudos)
+                    except ErrorTramaMLLP as e:
+                        print(f"❌ {e}. Cerrando conexión.")
+                        break
+
+                    for mensaje_limpio in mensajes:
+                        try:
+                            print(f"[Incoming] Mensaje recibido. Tamaño: {len(mensaje_limpio)} bytes")
 
+                            ack_mllp = procesar_mensaje(mensaje_limpio)
+                            if ack_mllp:
+                                if DIARIO:
+                                    try:
+                                        DIARIO.agregar(mensaje_limpio).result()
+                                    except (OSError, ErrorDiario) as e:
+                                        # Sin diario no hay ACK: el emisor tiene que reintentar
+                                        print(f"❌ Diario: {e}. Se responde NAK.")
+                                        ack_mllp = armar_nak(mensaje_limpio, e)
+                                conn.sendall(ack_mllp)
+                                print("[Out] ACK enviado.")
+
+                        except Exception as e:
+                            print(f"❌ Error procesando mensaje: {e}")
+
+# --- MODO CONCURRENTE (ASYNCIO) ---
+# Cada feed ADT es una corrutina: la conexión queda abierta y se atienden
+# muchos mensajes seguidos. Un emisor lento ya no bloquea a los demás.
+
+async def atender_conexion(reader, writer):
+    addr = writer.get_extra_info('peername')
+    if VERBOSO:
+        print(f"\n[+] Conexión persistente desde: {addr[0]}")
+    try:
+        decodificador = DecodificadorMLLP()
+        while True:
+            datos = await reader.read(65536)
+            if not datos:
+                break  # El emisor cerró la conexión
+
+            pendientes = []
+            for mensaje_limpio in decodificador.alimentar(datos):
+                try:
+                    ack_mllp = procesar_mensaje(mensaje_limpio)
+                    if ack_mllp:
+                        escritura = asyncio.wrap_future(DIARIO.agregar(mensaje_limpio)) if DIARIO else None
+                        pendientes.append((mensaje_limpio, ack_mllp, escritura))
                 except Exception as e:
-                    print(f"❌ Error procesando mensaje: {e}")
+                    print(f"❌ Error procesando mensaje de {addr[0]}: {e}")
+            # Mientras esperamos el fsync, el loop atiende a otras conexiones:
+            # sus mensajes entran en el mismo group commit.
+            escrituras = [escritura for _, _, escritura in pendientes if escritura is not None]
+            if escrituras:
+                await asyncio.gather(*escrituras, return_exceptions=True)
+            for mensaje_limpio, ack_mllp, escritura in pendientes:
+                error = escritura.exception() if escritura is not None else None
+                if isinstance(error, (OSError, ErrorDiario)):
+                    # El diario falló (disco lleno, fdatasync): NAK, nunca un ACK
+                    # por un mensaje que no quedó en disco
+                    print(f"❌ Diario: {error}. NAK a {addr[0]}.")
+                    ack_mllp = armar_nak(mensaje_limpio, error)
+                elif error is not None:
+                    raise error
+                writer.write(ack_mllp)
+            await writer.drain()
+    except (ConnectionResetError, ErrorTramaMLLP) as e:
+        print(f"❌ Conexión con {addr[0]} interrumpida: {e}")
+    finally:
+        writer.close()
+        if VERBOSO:
+            print(f"[-] {addr[0]} desconectado.")
+
+async def servidor_async(reuse_port=False):
+    servidor = await asyncio.start_server(atender_conexion, HOST, PORT, reuse_address=True,
+                                          reuse_port=reuse_port)
+    async with servidor:
+        await servidor.serve_forever()
+
+def iniciar_servidor_async(reuse_port=False):
+    print(f"--- MOTOR DE INTEGRACIÓN PYTHON (HL7 LISTENER - ASYNCIO) ---")
+    print(f"[.] Escuchando conexiones concurrentes en el puerto {PORT}...")
+    asyncio.run(servidor_async(reuse_port))
+
+# --- MODO MULTIPROCESO (--workers N) ---
+# Cada trabajador es un proceso con su propio socket en el mismo puerto;
+# el kernel reparte las conexiones (ver trabajadores.py).
+
+def _trabajador(numero, modo, puerto, verboso, generador, diario, fsync, detector):
+    global PORT, VERBOSO, GENERADOR_ID, DIARIO, DETECTOR
+    PORT, VERBOSO, GENERADOR_ID, DETECTOR = puerto, verboso, generador, detector
+    if diario:
+        # Cada trabajador escribe su propio diario: nadie compite por el archivo
+        DIARIO = DiarioHL7(os.path.join(diario, f"trabajador_{numero}"), fsync)
+    try:
+        if modo == 'async':
+            iniciar_servidor_async(reuse_port=True)
+        else:
+            iniciar_servidor(reuse_port=True)
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Listener HL7 sobre MLLP")
+    parser.add_argument('--modo', choices=['simple', 'async'], default='simple',
+                        help="simple = una conexión a la vez; async = muchas conexiones persistentes")
+    parser.add_argument('--puerto', type=int, default=PORT)
+    parser.add_argument('--silencioso', action='store_true', help="No imprimir cada mensaje")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Procesos escuchando en el mismo puerto con SO_REUSEPORT")
+    parser.add_argument('--diario', metavar='DIR',
+                        help="Guardar cada mensaje en un diario durable antes del ACK")
+    parser.add_argument('--fsync', choices=ESTRATEGIAS, default='grupo',
+                        help="Estrategia de fsync del diario")
+    parser.add_argument('--nombres', metavar='ARCHIVO',
+                        help="Diccionario de nombres para el detector PHI (uno por línea)")
+    parser.add_argument('--sin-phi', action='store_true',
+                        help="No buscar PHI en NTE/OBX (implícito con --silencioso)")
+    args = parser.parse_args()
+    PORT = args.puerto
+    VERBOSO = not args.silencioso
+    if args.sin_phi or args.silencioso:
+        DETECTOR = None
+    elif args.nombres:
+        DETECTOR = DetectorPHI(cargar_nombres(args.nombres))
+
     try:
-        iniciar_servidor()
+        if args.workers > 1:
+            lanzar_trabajadores(args.workers, _trabajador, args.modo, PORT, VERBOSO, GENERADOR_ID,
+                                args.diario, args.fsync, DETECTOR)
+        else:
+            if args.diario:
+                DIARIO = DiarioHL7(args.diario, args.fsync)
+            if args.modo == 'async':
+                iniciar_servidor_async()
+            else:
+                iniciar_servidor()
     except KeyboardInterrupt:
-        print("\nApagando servidor...")
\ No newline at end of file
+        print("\nApagando servidor...")
+    finally:
+        if DIARIO:
+            DIARIO.cerrar()
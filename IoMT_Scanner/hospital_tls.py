@@ -1,85 +1,216 @@
-import socket
-import hl7
-import datetime
+from hl7_rapido import VistaHL7
 import ssl  # <--- La librería mágica
+import argparse
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from detector_phi import DetectorPHI, cargar_nombres, revisar_hl7
+from diario import DiarioHL7, ErrorDiario, ESTRATEGIAS
+from mllp import DecodificadorMLLP, ErrorTramaMLLP, armar_ack
+from trabajadores import GeneradorIdControl, crear_socket_escucha, lanzar_trabajadores
 
 # --- CONFIGURACIÓN SEGURA ---
 HOST = '0.0.0.0'
 PORT = 6662  # Nuevo puerto seguro
-SB = b'\x0b'
-EB = b'\x1c'
-CR = b'\x0d'
 
 # Rutas a las llaves que acabas de crear
 CERT_FILE = 'hospital.crt'
 KEY_FILE = 'hospital.key'
 
-def iniciar_servidor_seguro():
-    print("--- SERVIDOR HL7 SEGURO (TLS ENCRIPTADO) ---")
-    
+# Control IDs únicos para los ACK, compartidos entre trabajadores (--workers)
+GENERADOR_ID = GeneradorIdControl()
+
+# Diario durable (--diario): mensaje en disco ANTES del ACK (ver diario.py).
+# Los hilos que esperan su fsync a la vez comparten un mismo group commit.
+DIARIO = None
+
+# El handshake se hace en un hilo del pool, NO en el bucle de accept().
+# Un cliente lento (o malicioso) que no termina el handshake sólo ocupa su
+# hilo durante TIMEOUT_HANDSHAKE segundos; los demás siguen entrando.
+# La conexión ya establecida NO se queda en el pool: pasa a un hilo propio,
+# así los clientes persistentes (recepcionista_tls.py --mensajes) no
+# ocupan los hilos de handshake de los que llegan después.
+HILOS = 32
+TIMEOUT_HANDSHAKE = 10
+# Conexión establecida sin mandar nada en este tiempo → se cierra
+TIMEOUT_INACTIVO = 300
+
+# PHI en texto libre (NTE-3, OBX-5), ver detector_phi.py. None con --sin-phi.
+DETECTOR = DetectorPHI()
+
+def crear_contexto_servidor():
     # 1. CREAR CONTEXTO SSL
     # Le decimos: "Este contexto es para un SERVIDOR"
     context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
     # Cargamos nuestra identidad
     context.load_cert_chain(certfile=CERT_FILE, keyfile=KEY_FILE)
-    
-    print("[.] Cargando certificados... OK")
-    print(f"[.] Escuchando de forma segura en el puerto {PORT}...")
-    
-    # 2. CREAR SOCKET TCP NORMAL
-    bindsocket = socket.socket()
-    bindsocket.bind((HOST, PORT))
-    bindsocket.listen(5)
-    
-    while True:
-        try:
-            newsocket, fromaddr = bindsocket.accept()
-            
-            # 3. EL "WRAP" (ENVOLTORIO) MÁGICO
-            # Aquí ocurre el Handshake. Si el cliente no habla TLS, se corta.
-            conn = context.wrap_socket(newsocket, server_side=True)
-            
-            print(f"\n[+] Conexión ENCRIPTADA establecida con: {fromaddr[0]}")
-            # Imprimir info del cifrado (Para que veas que es real)
-            print(f"    Cifrado: {conn.cipher()}")
-            
-            with conn:
+    # Session tickets: el cliente que vuelve presenta su ticket y se salta el
+    # intercambio de certificados y claves (handshake "reanudado", mucho más barato).
+    context.num_tickets = 2
+    return context
+
+def negociar(context, newsocket, fromaddr):
+    # 3. EL "WRAP" (ENVOLTORIO) MÁGICO
+    # Aquí ocurre el Handshake (en el pool). Si el cliente no habla TLS, se corta.
+    try:
+        newsocket.settimeout(TIMEOUT_HANDSHAKE)
+        conn = context.wrap_socket(newsocket, server_side=True, do_handshake_on_connect=False)
+        t0 = time.perf_counter()
+        conn.do_handshake()
+        ms_handshake = (time.perf_counter() - t0) * 1000
+        conn.settimeout(TIMEOUT_INACTIVO)
+    except (ssl.SSLError, OSError) as e:
+        print(f"⛔ Error de Seguridad (Handshake fallido con {fromaddr[0]}): {e}")
+        newsocket.close()
+        return
+    # El hilo del pool queda libre para el próximo handshake
+    threading.Thread(target=atender_cliente, args=(conn, fromaddr, ms_handshake),
+                     name=f"tls-{fromaddr[0]}", daemon=True).start()
+
+def atender_cliente(conn, fromaddr, ms_handshake):
+    tipo = "REANUDADA" if conn.session_reused else "COMPLETA"
+    print(f"\n[+] Conexión ENCRIPTADA establecida con: {fromaddr[0]}")
+    # Imprimir info del cifrado (Para que veas que es real)
+    print(f"    Cifrado: {conn.cipher()}")
+    print(f"    Handshake {tipo}: {ms_handshake:.2f} ms")
+
+    mensajes_atendidos = 0
+    ms_mensajes = 0.0
+    with conn:
+        decodificador = DecodificadorMLLP()
+        while True:
+            try:
                 datos_crudos = conn.recv(4096)
-                if not datos_crudos:
-                    break
-                
-                # A partir de aquí, la lógica es IDÉNTICA al módulo anterior.
-                # Python ya desencriptó los datos automáticamente en 'conn'.
+            except socket.timeout:
+                print(f"[-] {fromaddr[0]}: {TIMEOUT_INACTIVO} s sin mensajes, cerrando conexión.")
+                break
+            except (ssl.SSLError, OSError) as e:
+                print(f"Error general: {e}")
+                break
+            if not datos_crudos:
+                break  # El cliente cerró el túnel
+
+            # A partir de aquí, la lógica es IDÉNTICA al módulo anterior.
+            # Python ya desencriptó los datos automáticamente en 'conn'.
+            try:
+                mensajes = decodificador.alimentar(datos_crudos)
+            except ErrorTramaMLLP as e:
+                print(f"❌ {e}. Cerrando conexión.")
+                break
+
+            for mensaje_limpio in mensajes:
+                t0 = time.perf_counter()
                 try:
-                    mensaje_limpio = datos_crudos[1:-2]
-                    mensaje_texto = mensaje_limpio.decode('utf-8')
-                    
-                    # Parsear
-                    h = hl7.parse(mensaje_texto)
+                    # Parsear (sólo los campos que usamos, ver hl7_rapido.py)
+                    h = VistaHL7(mensaje_limpio)
                     if len(h) > 1:
                         print("-" * 40)
                         print(" MENSAJE SEGURO RECIBIDO")
-                        print(f" PACIENTE:    {h[1][5]}") # PID-5
+                        print(f" PACIENTE:    {h.nombre_paciente}") # PID-5
                         print("-" * 40)
-                        
+                        if DETECTOR is not None:
+                            for campo, tipo, _ in revisar_hl7(h, DETECTOR):
+                                print(f"⚠️ PHI en texto libre: {tipo} en {campo}")
+
                         # Responder ACK
-                        id_control = h[0][10]
-                        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-                        ack_hl7 = f"MSH|^~\\&|PYTHON_TLS|LINUX|RECEPCION|HOSPITAL|{timestamp}||ACK|ACK{timestamp}|P|2.3\rMSA|AA|{id_control}"
-                        ack_mllp = SB + ack_hl7.encode('utf-8') + EB + CR
+                        ack_mllp = armar_ack('PYTHON_TLS', h.id_control, GENERADOR_ID.siguiente())
+                        if DIARIO:
+                            try:
+                                DIARIO.agregar(mensaje_limpio).result()
+                            except (OSError, ErrorDiario) as e:
+                                # Sin diario no hay ACK: NAK y el emisor reintenta
+                                print(f"❌ Diario: {e}. Se responde NAK.")
+                                ack_mllp = armar_ack('PYTHON_TLS', h.id_control, GENERADOR_ID.siguiente(),
+                                                     'AE', detalle=e)
                         conn.sendall(ack_mllp)
                         print("[Out] ACK Encriptado enviado.")
-                        
+
                 except (ValueError, UnicodeDecodeError, IndexError) as e:
                     print(f"❌ Error lógico: {e}")
-                    
-        except ssl.SSLError as e:
-            print(f"⛔ Error de Seguridad (Handshake fallido): {e}")
-        except OSError as e:
-            print(f"Error general: {e}")
+                except OSError as e:
+                    print(f"Error general: {e}")
+                    break
+                mensajes_atendidos += 1
+                ms_mensajes += (time.perf_counter() - t0) * 1000
+
+    if mensajes_atendidos:
+        print(f"[-] {fromaddr[0]}: handshake {ms_handshake:.2f} ms | "
+              f"{mensajes_atendidos} mensajes, {ms_mensajes / mensajes_atendidos:.3f} ms promedio c/u")
+
+def iniciar_servidor_seguro(reuse_port=False, context=None):
+    print("--- SERVIDOR HL7 SEGURO (TLS ENCRIPTADO) ---")
+
+    if context is None:
+        context = crear_contexto_servidor()
+
+    print("[.] Cargando certificados... OK")
+    print(f"[.] Escuchando de forma segura en el puerto {PORT}...")
+
+    # 2. CREAR SOCKET TCP NORMAL
+    bindsocket = crear_socket_escucha(HOST, PORT, reuse_port)
+
+    with ThreadPoolExecutor(max_workers=HILOS) as pool:
+        while True:
+            try:
+                newsocket, fromaddr = bindsocket.accept()
+                # El accept vuelve enseguida a esperar al siguiente cliente
+                pool.submit(negociar, context, newsocket, fromaddr)
+            except OSError as e:
+                print(f"Error general: {e}")
+
+# --- MODO MULTIPROCESO (--workers N) ---
+# Igual que en hospital_server.py: N procesos en el mismo puerto y el kernel
+# reparte las conexiones. El contexto TLS se crea ANTES de lanzar los
+# trabajadores: al heredarlo, todos comparten la misma llave de tickets y un
+# cliente puede reanudar su sesión aunque el kernel lo mande a otro proceso.
+
+def _trabajador(numero, puerto, generador, context, diario, fsync, detector):
+    global PORT, GENERADOR_ID, DIARIO, DETECTOR
+    PORT, GENERADOR_ID, DETECTOR = puerto, generador, detector
+    if diario:
+        DIARIO = DiarioHL7(os.path.join(diario, f"trabajador_{numero}"), fsync)
+    try:
+        iniciar_servidor_seguro(reuse_port=True, context=context)
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Listener HL7 sobre MLLP + TLS")
+    parser.add_argument('--puerto', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Procesos escuchando en el mismo puerto con SO_REUSEPORT")
+    parser.add_argument('--hilos', type=int, default=HILOS,
+                        help="Handshakes simultáneos por proceso (cada conexión después tiene su hilo)")
+    parser.add_argument('--inactivo', type=float, default=TIMEOUT_INACTIVO, metavar='SEG',
+                        help="Cerrar conexiones que pasan SEG segundos sin mandar nada")
+    parser.add_argument('--diario', metavar='DIR',
+                        help="Guardar cada mensaje en un diario durable antes del ACK")
+    parser.add_argument('--fsync', choices=ESTRATEGIAS, default='grupo',
+                        help="Estrategia de fsync del diario")
+    parser.add_argument('--nombres', metavar='ARCHIVO',
+                        help="Diccionario de nombres para el detector PHI (uno por línea)")
+    parser.add_argument('--sin-phi', action='store_true', help="No buscar PHI en NTE/OBX")
+    args = parser.parse_args()
+    PORT = args.puerto
+    HILOS = args.hilos
+    TIMEOUT_INACTIVO = args.inactivo
+    if args.sin_phi:
+        DETECTOR = None
+    elif args.nombres:
+        DETECTOR = DetectorPHI(cargar_nombres(args.nombres))
+
     try:
-        iniciar_servidor_seguro()
+        if args.workers > 1:
+            lanzar_trabajadores(args.workers, _trabajador, PORT, GENERADOR_ID,
+                                crear_contexto_servidor(), args.diario, args.fsync, DETECTOR)
+        else:
+            if args.diario:
+                DIARIO = DiarioHL7(args.diario, args.fsync)
+            iniciar_servidor_seguro()
     except KeyboardInterrupt:
-        print("\nApagando servidor...")
\ No newline at end of file
+        print("\nApagando servidor...")
+    finally:
+        if DIARIO:
+            DIARIO.cerrar()
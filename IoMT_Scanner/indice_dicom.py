@@ -0,0 +1,236 @@
+"""
+ÍNDICE DE METADATOS DICOM (indice_dicom.py)
+───────────────────────────────────────────
+Leer un .dcm completo (pixel data incluido) sólo para mostrar PatientID y
+Modality es tirar disco y CPU: en una TC el pixel data es >95% del archivo.
+
+Este índice SQLite guarda, por archivo, los tags principales leídos SÓLO
+de la cabecera (stop_before_pixels). La clave es ruta + tamaño + mtime:
+
+    corrida 1:  500 archivos → 500 lecturas de cabecera (en paralelo)
+    corrida 2:  500 archivos →   0 lecturas (nada cambió)
+    corrida 3:  3 modificados →  3 lecturas
+
+ambulancia.py, medico.py y anonimizador.py consultan el índice en vez de volver
+a abrir los archivos.
+
+Uso:
+    python indice_dicom.py Anonymized_20260129        # indexar y resumir
+    python indice_dicom.py Anonymized_20260129 --listar
+"""
+
+import argparse
+import glob
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pydicom
+
+ARCHIVO_INDICE = '.indice_dicom.sqlite'
+
+# Por debajo de esto no vale la pena levantar procesos
+MINIMO_PARALELO = 64
+
+# Tags que guardamos (palabra clave DICOM → columna)
+TAGS = {
+    'SOPInstanceUID': 'sop_instance_uid',
+    'SOPClassUID': 'sop_class_uid',
+    'PatientName': 'patient_name',
+    'PatientID': 'patient_id',
+    'PatientBirthDate': 'patient_birth_date',
+    'Modality': 'modality',
+    'StudyInstanceUID': 'study_instance_uid',
+    'SeriesInstanceUID': 'series_instance_uid',
+    'Manufacturer': 'manufacturer',
+    'InstitutionName': 'institution_name',
+    'ImageComments': 'image_comments',
+}
+COLUMNAS = ['ruta', 'tamanio', 'mtime_ns', 'valido', 'transfer_syntax'] + list(TAGS.values())
+
+ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS archivos (
+    ruta TEXT PRIMARY KEY,
+    tamanio INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    valido INTEGER NOT NULL,
+    transfer_syntax TEXT,
+    {', '.join(f'{columna} TEXT' for columna in TAGS.values())}
+);
+CREATE INDEX IF NOT EXISTS idx_sop_instance ON archivos (sop_instance_uid);
+"""
+
+
+def _fila_vacia(ruta, st):
+    fila = dict.fromkeys(COLUMNAS)
+    if st is None:
+        fila.update(ruta=ruta, tamanio=-1, mtime_ns=-1, valido=0)
+    else:
+        fila.update(ruta=ruta, tamanio=st.st_size, mtime_ns=st.st_mtime_ns, valido=0)
+    return fila
+
+
+def fila_desde_dataset(ds, ruta, st=None):
+    """
+    Fila del índice a partir de un Dataset ya leído (p. ej. uno que
+    acabamos de escribir), sin volver a abrir el archivo.
+    """
+    fila = _fila_vacia(ruta, st or os.stat(ruta))
+    fila['transfer_syntax'] = str(ds.file_meta.TransferSyntaxUID)
+    for palabra, columna in TAGS.items():
+        valor = ds.get(palabra)
+        fila[columna] = None if valor is None else str(valor)
+    fila['valido'] = 1 if fila['sop_class_uid'] else 0
+    return fila
+
+
+def leer_cabecera(ruta):
+    """
+    Lee sólo la cabecera de un archivo y retorna un dict con las COLUMNAS.
+    Si no es un DICOM válido, valido=0 y los tags quedan en None. Si el
+    archivo ya no existe (se borró después del listado), además
+    tamanio=-1: esa fila no se guarda en el índice.
+    """
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return _fila_vacia(ruta, None)
+    try:
+        ds = pydicom.dcmread(ruta, stop_before_pixels=True, specific_tags=list(TAGS))
+        return fila_desde_dataset(ds, ruta, st)
+    except Exception:
+        return _fila_vacia(ruta, st)
+
+
+class IndiceDICOM:
+    def __init__(self, ruta=ARCHIVO_INDICE):
+        """ruta=None → índice en memoria (no persiste entre corridas)."""
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta or ':memory:')
+        self.conexion.row_factory = sqlite3.Row
+        self.conexion.executescript(ESQUEMA)
+        self.leidos = 0        # lecturas de cabecera en la última actualización
+        self.sin_cambios = 0   # archivos que se saltearon por no haber cambiado
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def actualizar(self, archivos, procesos=None):
+        """
+        Lee la cabecera de los archivos nuevos o modificados (por tamaño y
+        mtime) y los guarda. Retorna {ruta absoluta: fila} de todos los archivos.
+        """
+        rutas = [os.path.abspath(archivo) for archivo in archivos]
+        filas = self.consultar(rutas)
+        faltantes = []
+        for ruta in rutas:
+            fila = filas.get(ruta)
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                filas.pop(ruta, None)
+                continue
+            if fila is None or fila['tamanio'] != st.st_size or fila['mtime_ns'] != st.st_mtime_ns:
+                faltantes.append(ruta)
+
+        if len(faltantes) >= MINIMO_PARALELO and procesos != 1:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                nuevas = list(pool.map(leer_cabecera, faltantes, chunksize=32))
+        else:
+            nuevas = [leer_cabecera(ruta) for ruta in faltantes]
+
+        # Los que desaparecieron entre el stat y la lectura quedan sin fila
+        nuevas = [fila for fila in nuevas if fila['tamanio'] >= 0]
+        self.guardar(nuevas)
+        for fila in nuevas:
+            filas[fila['ruta']] = fila
+        self.leidos = len(faltantes)
+        self.sin_cambios = len(rutas) - len(faltantes)
+        return filas
+
+    def guardar(self, filas):
+        marcadores = ', '.join('?' * len(COLUMNAS))
+        with self.conexion:
+            self.conexion.executemany(
+                f"INSERT OR REPLACE INTO archivos ({', '.join(COLUMNAS)}) VALUES ({marcadores})",
+                [[fila[columna] for columna in COLUMNAS] for fila in filas])
+
+    def registrar(self, ruta):
+        """Indexa (o re-indexa) un archivo recién escrito y retorna su fila."""
+        fila = leer_cabecera(os.path.abspath(ruta))
+        if fila['tamanio'] >= 0:
+            self.guardar([fila])
+        return fila
+
+    def consultar(self, rutas):
+        """{ruta absoluta: fila} para las rutas que estén en el índice."""
+        filas = {}
+        rutas = [os.path.abspath(ruta) for ruta in rutas]
+        # SQLite limita la cantidad de parámetros por consulta
+        for i in range(0, len(rutas), 500):
+            porcion = rutas[i:i + 500]
+            cursor = self.conexion.execute(
+                f"SELECT * FROM archivos WHERE ruta IN ({', '.join('?' * len(porcion))})", porcion)
+            for fila in cursor:
+                filas[fila['ruta']] = dict(fila)
+        return filas
+
+    def buscar(self, ruta):
+        """Fila de un archivo (actualizándola si cambió) o None si no existe."""
+        return self.actualizar([ruta]).get(os.path.abspath(ruta))
+
+    def por_sop_instance(self, sop_instance_uid):
+        cursor = self.conexion.execute(
+            "SELECT * FROM archivos WHERE sop_instance_uid = ?", (sop_instance_uid,))
+        return [dict(fila) for fila in cursor]
+
+
+def recorrer_dcm(raiz):
+    """Genera las rutas .dcm de un árbol sin armar la lista completa (memoria plana)."""
+    pendientes = [raiz]
+    while pendientes:
+        with os.scandir(pendientes.pop()) as entradas:
+            for entrada in entradas:
+                if entrada.is_dir(follow_symlinks=False):
+                    pendientes.append(entrada.path)
+                elif entrada.name.lower().endswith('.dcm'):
+                    yield entrada.path
+
+
+def listar_dcm(ruta):
+    """Archivo .dcm suelto o todos los .dcm de una carpeta (recursivo)."""
+    if os.path.isdir(ruta):
+        return sorted(glob.glob(os.path.join(ruta, '**', '*.dcm'), recursive=True))
+    return [ruta]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Índice de metadatos DICOM (sólo cabeceras)")
+    parser.add_argument('ruta', help="Archivo .dcm o carpeta")
+    parser.add_argument('--indice', default=ARCHIVO_INDICE, help="Archivo SQLite del índice")
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--listar', action='store_true', help="Mostrar una línea por archivo")
+    args = parser.parse_args()
+
+    archivos = listar_dcm(args.ruta)
+    t0 = time.perf_counter()
+    with IndiceDICOM(args.indice) as indice:
+        filas = indice.actualizar(archivos, args.procesos)
+        segundos = time.perf_counter() - t0
+        print(f"--- ÍNDICE DICOM ({args.indice}) ---")
+        print(f"Archivos:       {len(filas)}")
+        print(f"Leídos:         {indice.leidos} (cabecera)")
+        print(f"Sin cambios:    {indice.sin_cambios}")
+        print(f"Inválidos:      {sum(1 for fila in filas.values() if not fila['valido'])}")
+        print(f"Tiempo:         {segundos * 1000:.0f} ms")
+        if args.listar:
+            for ruta, fila in sorted(filas.items()):
+                print(f"  {fila['modality'] or '??':3} {fila['patient_id'] or '-':>12}  "
+                      f"{fila['sop_instance_uid'] or '-'}  {ruta}")
@@ -0,0 +1,188 @@
+"""
+INGESTA DE VITALES POR LOTES (ingesta_vitales.py)
+─────────────────────────────────────────────────
+En enfermeria.py el callback de paho decodificaba, evaluaba e imprimía
+cada mensaje DENTRO del hilo de red. Mientras tanto nadie lee el socket:
+el broker acumula, y cuando llega a su límite empieza a descartar.
+
+Ahora el callback sólo hace esto:
+
+    callback de paho ──(tema, payload)──▶ [ anillo acotado ] ──lotes──▶ trabajadores
+       (microsegundos)                     (capacidad fija)              decodifican + alertas
+
+Cuando el anillo se llena, la política de contrapresión decide:
+    descartar → se pierde el mensaje MÁS VIEJO (lo último es lo que importa
+                en un monitor) y se cuenta
+    bloquear  → el callback espera: deja de leer el socket y la contrapresión
+                llega por TCP hasta el broker (nada se pierde acá)
+
+Métricas: profundidad de la cola, demora (desde que llegó hasta que un
+trabajador lo toma), mensajes/s procesados, descartados e inválidos.
+
+Los trabajadores son hilos: decodificar y evaluar es poco trabajo por
+mensaje, y lo que importa es liberar el hilo de red enseguida.
+"""
+
+import collections
+import threading
+import time
+
+from formato_vitales import FormatoInvalido, decodificar
+
+CAPACIDAD = 10000
+LOTE = 256
+POLITICAS = ('descartar', 'bloquear')
+
+
+class AnilloAcotado:
+    """Cola de capacidad fija con política de contrapresión."""
+
+    def __init__(self, capacidad=CAPACIDAD, politica='descartar'):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política desconocida: {politica}")
+        self.capacidad = capacidad
+        self.politica = politica
+        self._items = collections.deque()
+        self._cambio = threading.Condition()
+        self.descartados = 0
+        self.bloqueos = 0
+        self.profundidad_maxima = 0
+        self.cerrado = False
+
+    def __len__(self):
+        return len(self._items)
+
+    def poner(self, item):
+        with self._cambio:
+            if len(self._items) >= self.capacidad:
+                if self.politica == 'descartar':
+                    self._items.popleft()
+                    self.descartados += 1
+                else:
+                    self.bloqueos += 1
+                    while len(self._items) >= self.capacidad and not self.cerrado:
+                        self._cambio.wait()
+            self._items.append(item)
+            if len(self._items) > self.profundidad_maxima:
+                self.profundidad_maxima = len(self._items)
+            self._cambio.notify_all()
+
+    def tomar_lote(self, maximo=LOTE, espera=0.5):
+        """Hasta `maximo` items (espera hasta `espera` s si está vacío). [] si se cerró."""
+        with self._cambio:
+            if not self._items and not self.cerrado:
+                self._cambio.wait(espera)
+            cantidad = min(maximo, len(self._items))
+            lote = [self._items.popleft() for _ in range(cantidad)]
+            if lote:
+                self._cambio.notify_all()
+            return lote
+
+    def cerrar(self):
+        with self._cambio:
+            self.cerrado = True
+            self._cambio.notify_all()
+
+
+class PipelineVitales:
+    """
+    procesar(lote) recibe [(tema, muestras)] ya decodificados y corre en los
+    trabajadores (varios a la vez: tiene que ser seguro entre hilos).
+    al_invalido(tema, error) se llama por cada payload que no se pudo decodificar
+    (o cuyo lote hizo fallar a `procesar`: el trabajador sigue vivo igual).
+    "tema" es lo que se pasó a encolar(): el tema MQTT o, con un enrutador
+    (enrutador_temas.py), el estado del paciente ya resuelto.
+    """
+
+    def __init__(self, procesar, trabajadores=2, capacidad=CAPACIDAD, politica='descartar', lote=LOTE,
+                 al_invalido=None):
+        self.procesar = procesar
+        self.al_invalido = al_invalido
+        self.anillo = AnilloAcotado(capacidad, politica)
+        self.lote = lote
+        self._candado = threading.Lock()
+        self._hilos = [threading.Thread(target=self._trabajar, name=f"vitales-{n}", daemon=True)
+                       for n in range(trabajadores)]
+        self.encolados = 0
+        self.procesados = 0
+        self.invalidos = 0
+        self.demora_maxima = 0.0
+        self._demora_total = 0.0
+
+    def iniciar(self):
+        for hilo in self._hilos:
+            hilo.start()
+        return self
+
+    def detener(self):
+        self.anillo.cerrar()
+        for hilo in self._hilos:
+            hilo.join()
+
+    def encolar(self, tema, payload):
+        """Lo único que hace el callback de paho."""
+        self.encolados += 1
+        self.anillo.poner((time.monotonic(), tema, payload))
+
+    def _trabajar(self):
+        while True:
+            items = self.anillo.tomar_lote(self.lote)
+            if not items:
+                if self.anillo.cerrado and not len(self.anillo):
+                    return
+                continue
+            ahora = time.monotonic()
+            lote, invalidos = [], 0
+            for _, tema, payload in items:
+                try:
+                    lote.append((tema, decodificar(payload)))
+                except FormatoInvalido as e:
+                    invalidos += 1
+                    if self.al_invalido:
+                        self.al_invalido(tema, e)
+            if lote:
+                try:
+                    self.procesar(lote)
+                except Exception as e:
+                    # Un lote que rompe `procesar` no puede matar al trabajador:
+                    # se cuenta como inválido y el hilo sigue con el próximo
+                    invalidos += len(lote)
+                    if self.al_invalido:
+                        for tema, _ in lote:
+                            self.al_invalido(tema, e)
+            demora = ahora - items[0][0]
+            with self._candado:
+                self.procesados += len(items)
+                self.invalidos += invalidos
+                self._demora_total += sum(ahora - llegada for llegada, _, _ in items)
+                self.demora_maxima = max(self.demora_maxima, demora)
+
+    def metricas(self):
+        with self._candado:
+            procesados = self.procesados
+            return {
+                "profundidad": len(self.anillo),
+                "profundidad_maxima": self.anillo.profundidad_maxima,
+                "encolados": self.encolados,
+                "procesados": procesados,
+                "descartados": self.anillo.descartados,
+                "bloqueos": self.anillo.bloqueos,
+                "invalidos": self.invalidos,
+                "demora_media_ms": self._demora_total / procesados * 1000 if procesados else 0.0,
+                "demora_maxima_ms": self.demora_maxima * 1000,
+            }
+
+    def informar(self, cada, imprimir=print):
+        """Hilo que imprime las métricas cada `cada` segundos (con mensajes/s)."""
+        def bucle():
+            anterior = 0
+            while not self.anillo.cerrado:
+                time.sleep(cada)
+                m = self.metricas()
+                imprimir(f"[métricas] {(m['procesados'] - anterior) / cada:,.0f} msg/s | "
+                         f"cola {m['profundidad']:,}/{self.anillo.capacidad:,} | "
+                         f"demora media {m['demora_media_ms']:.1f} ms (máx {m['demora_maxima_ms']:.1f}) | "
+                         f"descartados {m['descartados']:,} | inválidos {m['invalidos']:,}")
+                anterior = m['procesados']
+
+        threading.Thread(target=bucle, name="vitales-metricas", daemon=True).start()
@@ -0,0 +1,101 @@
+"""
+LABORATORIO DE RED EN UNA SOLA MÁQUINA (laboratorio_red.py)
+───────────────────────────────────────────────────────────
+Arma hosts de mentira para probar sondeo_nativo.py (y nmap) sin tocar la
+red del hospital. Necesita root y el comando `ip` (iproute2).
+
+    máquina ── iomt_h (10.99.0.1/24) ══ veth ══ iomt_l ─┐  namespace "iomt_lab"
+                                                        ├─ macvlan lab0 10.99.0.10   (MAC propia)
+                                                        ├─ macvlan lab1 10.99.0.11   ...
+                                                        └─ lo 10.98.0.10, .11, ...
+    ruta: 10.98.0.0/24 vía 10.99.0.2 (el namespace)
+
+  10.99.0.0/24  segmento local: cada host contesta ARP con su propia MAC
+  10.98.0.0/24  "detrás de un router": sólo se llega por IP (ICMP / TCP)
+
+Uso:
+    sudo python laboratorio_red.py crear --locales 50 --remotos 50
+    sudo python sondeo_nativo.py 10.99.0.0/24 10.98.0.0/24
+    sudo python laboratorio_red.py borrar
+"""
+
+import argparse
+import ipaddress
+import subprocess
+
+NAMESPACE = "iomt_lab"
+VETH_MAQUINA = "iomt_h"
+VETH_LAB = "iomt_l"
+RED_LOCAL = ipaddress.ip_network("10.99.0.0/24")
+RED_REMOTA = ipaddress.ip_network("10.98.0.0/24")
+PRIMER_HOST = 10
+
+
+def _ip(*argumentos, namespace=None, tolerar=False):
+    comando = ["ip"] + (["-n", namespace] if namespace else []) + list(argumentos)
+    resultado = subprocess.run(comando, capture_output=True, text=True)
+    if resultado.returncode and not tolerar:
+        raise RuntimeError(f"{' '.join(comando)}: {resultado.stderr.strip()}")
+    return resultado
+
+
+def hosts_locales(cantidad):
+    return [str(RED_LOCAL[PRIMER_HOST + n]) for n in range(cantidad)]
+
+
+def hosts_remotos(cantidad):
+    return [str(RED_REMOTA[PRIMER_HOST + n]) for n in range(cantidad)]
+
+
+def crear(locales=50, remotos=50):
+    if locales + PRIMER_HOST > 250 or remotos + PRIMER_HOST > 250:
+        raise ValueError("Hasta 240 hosts por red")
+    borrar()
+    _ip("netns", "add", NAMESPACE)
+    _ip("link", "add", VETH_MAQUINA, "type", "veth", "peer", "name", VETH_LAB, "netns", NAMESPACE)
+    _ip("addr", "add", f"{RED_LOCAL[1]}/{RED_LOCAL.prefixlen}", "dev", VETH_MAQUINA)
+    _ip("link", "set", VETH_MAQUINA, "up")
+
+    _ip("link", "set", "lo", "up", namespace=NAMESPACE)
+    # Sin esto cualquier interfaz del namespace contesta ARP por todas sus IPs
+    # (y todos los hosts "locales" aparecen con la MAC de iomt_l)
+    subprocess.run(["ip", "netns", "exec", NAMESPACE, "sysctl", "-qw", "net.ipv4.conf.all.arp_ignore=1"],
+                   check=True)
+    _ip("addr", "add", f"{RED_LOCAL[2]}/{RED_LOCAL.prefixlen}", "dev", VETH_LAB, namespace=NAMESPACE)
+    _ip("link", "set", VETH_LAB, "up", namespace=NAMESPACE)
+    # Un macvlan por host local: cada uno contesta ARP con su MAC
+    for n, ip in enumerate(hosts_locales(locales)):
+        nombre = f"lab{n}"
+        _ip("link", "add", nombre, "link", VETH_LAB, "type", "macvlan", "mode", "bridge", namespace=NAMESPACE)
+        _ip("addr", "add", f"{ip}/32", "dev", nombre, namespace=NAMESPACE)
+        _ip("link", "set", nombre, "up", namespace=NAMESPACE)
+    # Los remotos son direcciones del namespace (en su loopback: no hace
+    # falta el módulo dummy) a las que se llega por ruta
+    for ip in hosts_remotos(remotos):
+        _ip("addr", "add", f"{ip}/32", "dev", "lo", namespace=NAMESPACE)
+    _ip("route", "add", str(RED_REMOTA), "via", str(RED_LOCAL[2]))
+
+
+def borrar():
+    _ip("route", "del", str(RED_REMOTA), tolerar=True)
+    _ip("link", "del", VETH_MAQUINA, tolerar=True)
+    _ip("netns", "del", NAMESPACE, tolerar=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hosts de prueba en un namespace de red (veth + macvlan)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_crear = sub.add_parser('crear')
+    p_crear.add_argument('--locales', type=int, default=50)
+    p_crear.add_argument('--remotos', type=int, default=50)
+    sub.add_parser('borrar')
+    args = parser.parse_args()
+
+    if args.comando == 'crear':
+        crear(args.locales, args.remotos)
+        print(f"[+] Laboratorio listo: {args.locales} hosts en {RED_LOCAL} (ARP), "
+              f"{args.remotos} en {RED_REMOTA} (por ruta, ICMP/TCP)")
+        print(f"    Sin respuesta: el resto de las dos redes. Borrar con: laboratorio_red.py borrar")
+    else:
+        borrar()
+        print("[+] Laboratorio borrado.")
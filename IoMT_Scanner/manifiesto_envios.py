@@ -0,0 +1,102 @@
+"""
+MANIFIESTO DE ENVÍOS DICOM (manifiesto_envios.py)
+─────────────────────────────────────────────────
+Si ambulancia.py se corta a mitad de una carpeta de 10.000 archivos, volver
+a correrlo mandaba TODO otra vez y el PACS recibía C-STOREs duplicados.
+
+El manifiesto es una tabla SQLite con las instancias que cada destino ya
+confirmó (status 0x0000):
+
+    destino                      sop_instance_uid       ruta
+    ORTHANC@127.0.0.1:4242       1.3.6.1.4.1.5962...    /datos/ct_0001.dcm
+
+Al reanudar, se descartan las instancias confirmadas usando el SOP Instance
+UID del índice de metadatos (indice_dicom.py): no se abre ningún archivo y
+el tiempo es proporcional a lo que falta, no a la carpeta entera.
+
+Cada confirmación se escribe apenas llega el ACK (modo WAL de SQLite), así
+que un corte pierde como mucho las imágenes que estaban en vuelo, y varios
+hilos o procesos pueden registrar a la vez.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+ARCHIVO_MANIFIESTO = '.manifiesto_envios.sqlite'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS confirmados (
+    destino TEXT NOT NULL,
+    sop_instance_uid TEXT NOT NULL,
+    ruta TEXT,
+    momento REAL NOT NULL,
+    PRIMARY KEY (destino, sop_instance_uid)
+);
+"""
+
+
+def nombre_destino(ip, puerto, aet):
+    return f"{aet}@{ip}:{puerto}"
+
+
+class ManifiestoEnvios:
+    def __init__(self, destino, ruta=ARCHIVO_MANIFIESTO):
+        self.destino = destino
+        self.ruta = ruta
+        # Un solo objeto compartido por los hilos de enviar_lote(): el lock
+        # serializa las escrituras; entre procesos lo resuelve SQLite.
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.executescript(ESQUEMA)
+        self._lock = threading.Lock()
+
+    def cerrar(self):
+        self._conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def confirmados(self):
+        """Conjunto de SOP Instance UIDs que este destino ya confirmó."""
+        with self._lock:
+            cursor = self._conexion.execute(
+                "SELECT sop_instance_uid FROM confirmados WHERE destino = ?", (self.destino,))
+            return {uid for (uid,) in cursor}
+
+    def registrar(self, sop_instance_uid, ruta=None):
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO confirmados VALUES (?, ?, ?, ?)",
+                (self.destino, sop_instance_uid,
+                 os.path.abspath(ruta) if ruta else None, time.time()))
+
+    def olvidar(self):
+        """Borra lo registrado para este destino (p. ej. si se vació el PACS)."""
+        with self._lock, self._conexion:
+            self._conexion.execute("DELETE FROM confirmados WHERE destino = ?", (self.destino,))
+
+
+def pendientes(archivos, filas, confirmados):
+    """
+    Separa el lote en (pendientes, ya_confirmados, duplicados).
+    `filas` son las del índice, por ruta absoluta. Un SOP Instance UID que
+    aparece en varios archivos del lote se manda una sola vez.
+    """
+    a_enviar, ya_confirmados, duplicados = [], [], []
+    vistos = set()
+    for archivo in archivos:
+        uid = filas[os.path.abspath(archivo)]['sop_instance_uid']
+        if uid in confirmados:
+            ya_confirmados.append(archivo)
+        elif uid in vistos:
+            duplicados.append(archivo)
+        else:
+            vistos.add(uid)
+            a_enviar.append(archivo)
+    return a_enviar, ya_confirmados, duplicados
@@ -1,6 +1,23 @@
+"""
+GESTIÓN DE DATOS MÉDICOS (medico.py)
+────────────────────────────────────
+Demo: carga un CT de prueba, muestra sus datos sensibles (desde el índice,
+ver indice_dicom.py) y guarda una copia anonimizada en paciente_anonimo.dcm.
+
+La copia tiene que pasar la auditoría con las reglas por defecto
+(python auditor.py .): por eso además de cambiar nombre e ID se borran los
+tags de PERFIL_BASICO["eliminar"] (institución, médicos, equipo...) y los
+privados, y el comentario queda en "ANONIMIZADO". Antes se dejaban InstitutionName y
+"Datos Censurados por Ing. Emanuel", y el auditor marcaba el archivo.
+
+Para carpetas completas (en lote, con perfil): python anonimizador.py
+"""
+
 import pydicom
 from pydicom.data import get_testdata_file
 import os
+from anonimizador import PERFIL_BASICO
+from indice_dicom import IndiceDICOM
 
 print("--- SISTEMA DE GESTIÓN DE DATOS MÉDICOS (DICOM) ---")
 
@@ -8,31 +25,34 @@ print("--- SISTEMA DE GESTIÓN DE DATOS MÉDICOS (DICOM) ---")
 # Usamos un archivo de Tomografía Computarizada (CT) real que viene con la librería
 print("[1] Cargando archivo DICOM de prueba...")
 path_archivo = get_testdata_file("CT_small.dcm")
-dataset = pydicom.dcmread(path_archivo)
+# Índice de metadatos (indice_dicom.py): los tags salen de la cabecera y
+# quedan guardados, no hace falta decodificar el archivo para mostrarlos.
+indice = IndiceDICOM()
+metadatos = indice.buscar(path_archivo)
 
 # 2. LEER LOS "SECRETOS" DEL ARCHIVO
 # Los archivos DICOM guardan datos en "Tags" (Etiquetas).
 print("\n[2] LEYENDO METADATOS (Información Sensible):")
 print("-" * 50)
 
-# Accedemos a los datos como si fuera un objeto de Python
+# Accedemos a los datos como si fuera un diccionario de Python
 # Tag (0010,0010) - PatientName
-if 'PatientName' in dataset:
-    print(f" -> Nombre del Paciente: {dataset.PatientName}")
+if metadatos['patient_name'] is not None:
+    print(f" -> Nombre del Paciente: {metadatos['patient_name']}")
 else:
     print(" -> Nombre del Paciente: [NO DISPONIBLE]")
 
 # Tag (0010,0020) - PatientID
-if 'PatientID' in dataset:
-    print(f" -> ID del Paciente:     {dataset.PatientID}")
+if metadatos['patient_id'] is not None:
+    print(f" -> ID del Paciente:     {metadatos['patient_id']}")
 
 # Tag (0008,0060) - Modality (CT, MR, XA, etc.)
-if 'Modality' in dataset:
-    print(f" -> Modalidad (Tipo):    {dataset.Modality}")
+if metadatos['modality'] is not None:
+    print(f" -> Modalidad (Tipo):    {metadatos['modality']}")
 
 # Tag (0008,0070) - Manufacturer
-if 'Manufacturer' in dataset:
-    print(f" -> Fabricante Equipo:   {dataset.Manufacturer}")
+if metadatos['manufacturer'] is not None:
+    print(f" -> Fabricante Equipo:   {metadatos['manufacturer']}")
 
 print("-" * 50)
 print("¡ALERTA! Si este archivo sale del hospital así, violamos la ley GDPR.")
@@ -41,18 +61,33 @@ print("¡ALERTA! Si este archivo sale del hospital así, violamos la ley GDPR.")
 # Vamos a modificar los datos en memoria para proteger la identidad
 print("\n[3] APLICANDO PROTOCOLO DE PRIVACIDAD (Anonimización)...")
 
+# Para reescribir sí necesitamos el archivo completo
+dataset = pydicom.dcmread(path_archivo)
+
 # Cambiamos el nombre real por un código
 dataset.PatientName = "ANONIMO_001"
 # Borramos el ID original y ponemos uno genérico
 dataset.PatientID = "123456"
-# A veces es necesario borrar comentarios médicos privados
-dataset.ImageComments = "Datos Censurados por Ing. Emanuel"
+# Los comentarios pueden traer nombres: el reemplazo tampoco lleva ninguno
+# (el detector de PHI del auditor marcaría "Ing. Emanuel" como un nombre)
+dataset.ImageComments = "ANONIMIZADO"
+# Institución, médicos, equipo, fecha de nacimiento...: los mismos tags que
+# borra el anonimizador y que el auditor busca
+for palabra in PERFIL_BASICO["eliminar"]:
+    if palabra in dataset:
+        delattr(dataset, palabra)
+# Y los tags privados del fabricante, que el auditor tampoco acepta
+dataset.remove_private_tags()
 
 print(" -> Datos personales eliminados exitosamente.")
 
 # 4. GUARDAR EL NUEVO ARCHIVO
 nombre_nuevo = "paciente_anonimo.dcm"
 dataset.save_as(nombre_nuevo)
+# Lo registramos en el índice: ambulancia.py lo consulta de ahí
+indice.registrar(nombre_nuevo)
+indice.cerrar()
 
 print(f"\n[4] Archivo seguro guardado como: {nombre_nuevo}")
-print("Este archivo ya puede ser enviado a investigación de forma segura.")
\ No newline at end of file
+print("Este archivo ya puede ser enviado a investigación de forma segura.")
+print("Para anonimizar carpetas completas (en lote, con perfil): python anonimizador.py ORIGEN DESTINO")
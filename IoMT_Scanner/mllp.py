@@ -0,0 +1,138 @@
+"""
+DECODIFICADOR MLLP INCREMENTAL (mllp.py)
+────────────────────────────────────────
+TCP es un flujo de bytes, no de mensajes: un recv() puede traer medio
+mensaje, o tres mensajes pegados. Por eso no alcanza con `datos[1:-2]`.
+
+MLLP enmarca cada mensaje HL7 así:
+
+    SB (0x0b) + mensaje + EB (0x1c) + CR (0x0d)
+
+DecodificadorMLLP recibe bytes en trozos de cualquier tamaño y devuelve
+los mensajes completos a medida que aparecen. Usa un único bytearray que
+crece, recuerda hasta dónde ya buscó (no vuelve a escanear lo mismo) y sólo
+compacta el buffer cuando lo consumido supera la mitad, así que el costo
+total es lineal en los bytes recibidos.
+"""
+
+import datetime
+from collections import deque
+
+SB = b'\x0b'
+EB = b'\x1c'
+CR = b'\x0d'
+FIN_TRAMA = EB + CR
+
+# Un ORU con resultados grandes puede pesar cientos de KB; más de 16 MB ya
+# es un emisor roto (o malicioso) intentando agotarnos la memoria.
+TAMANIO_MAXIMO = 16 * 1024 * 1024
+
+
+class ErrorTramaMLLP(ValueError):
+    """La trama supera el tamaño máximo permitido."""
+
+
+def empaquetar(mensaje):
+    """Envuelve un mensaje HL7 (str o bytes) en una trama MLLP."""
+    if isinstance(mensaje, str):
+        mensaje = mensaje.encode('utf-8')
+    return SB + mensaje + FIN_TRAMA
+
+
+def armar_ack(aplicacion, id_control, id_ack, codigo='AA', detalle=None):
+    """
+    ACK HL7 en MLLP para el mensaje `id_control`. codigo AA = aceptado;
+    AE = error de aplicación (el emisor reintenta) con `detalle` en MSA-3.
+    Lo usan los dos listeners (hospital_server.py y hospital_tls.py).
+    """
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    msa = f"MSA|{codigo}|{id_control}"
+    if detalle is not None:
+        # El texto va dentro de un campo: sin separadores HL7 ni de segmento
+        msa += "|" + str(detalle).replace('|', ' ').replace('\r', ' ').replace('\n', ' ')[:80]
+    return empaquetar(f"MSH|^~\\&|{aplicacion}|LINUX|RECEPCION|HOSPITAL|{timestamp}||ACK|{id_ack}|P|2.3\r{msa}")
+
+
+class DecodificadorMLLP:
+    def __init__(self, tamanio_maximo=TAMANIO_MAXIMO):
+        self.tamanio_maximo = tamanio_maximo
+        self._buffer = bytearray()
+        self._inicio = -1      # Posición del SB de la trama en curso (-1 = sin trama)
+        self._busqueda = 0     # Desde dónde seguir buscando el fin de trama
+        self.cola = deque()    # Mensajes ya extraídos que nadie consumió aún
+
+    def alimentar(self, datos):
+        """
+        Agrega bytes recibidos y devuelve la lista de mensajes completos
+        (bytes, sin SB ni EB+CR) que se pudieron extraer.
+        """
+        self._buffer += datos
+        mensajes = []
+        buf = self._buffer
+
+        while True:
+            if self._inicio < 0:
+                # Buscar el inicio de la próxima trama; lo anterior es basura
+                inicio = buf.find(SB, self._busqueda)
+                if inicio < 0:
+                    self._busqueda = len(buf)
+                    break
+                self._inicio = inicio
+                self._busqueda = inicio + 1
+
+            # Retrocedemos un byte por si EB llegó al final del trozo anterior
+            fin = buf.find(FIN_TRAMA, max(self._busqueda - 1, self._inicio + 1))
+            if fin < 0:
+                self._busqueda = len(buf)
+                if len(buf) - self._inicio > self.tamanio_maximo:
+                    self.reiniciar()
+                    raise ErrorTramaMLLP(f"Trama MLLP mayor a {self.tamanio_maximo} bytes")
+                break
+
+            if fin - self._inicio - 1 > self.tamanio_maximo:
+                self.reiniciar()
+                raise ErrorTramaMLLP(f"Trama MLLP mayor a {self.tamanio_maximo} bytes")
+
+            mensajes.append(bytes(buf[self._inicio + 1:fin]))
+            self._busqueda = fin + 2
+            self._inicio = -1
+
+        self._compactar()
+        return mensajes
+
+    def _compactar(self):
+        # Descartamos lo ya consumido sólo cuando vale la pena (amortizado O(1))
+        corte = self._inicio if self._inicio >= 0 else self._busqueda
+        if corte and corte >= len(self._buffer) // 2:
+            del self._buffer[:corte]
+            self._busqueda -= corte
+            if self._inicio >= 0:
+                self._inicio -= corte
+
+    def reiniciar(self):
+        self._buffer.clear()
+        self._inicio = -1
+        self._busqueda = 0
+
+    @property
+    def pendientes(self):
+        """Bytes en el buffer que todavía no forman una trama completa."""
+        return len(self._buffer) - (self._inicio if self._inicio >= 0 else self._busqueda)
+
+
+def recibir_mensaje(sock, decodificador=None, tamanio_recv=4096):
+    """
+    Lee del socket hasta tener al menos un mensaje completo y lo devuelve.
+    Si llegan varios, los extra quedan en decodificador.cola para la próxima
+    llamada (por eso conviene reusar el mismo decodificador por conexión).
+    Retorna None si el otro extremo cierra la conexión.
+    """
+    if decodificador is None:
+        decodificador = DecodificadorMLLP()
+    cola = decodificador.cola
+    while not cola:
+        datos = sock.recv(tamanio_recv)
+        if not datos:
+            return None
+        cola.extend(decodificador.alimentar(datos))
+    return cola.popleft()
@@ -0,0 +1,229 @@
+"""
+MOTOR DE ALERTAS POR VENTANAS (motor_alertas.py)
+────────────────────────────────────────────────
+La regla de siempre (bpm > 120 en UN mensaje) salta con cualquier pico
+suelto y no ve tendencias: una saturación que baja 1% por minuto nunca
+pasa ningún umbral hasta que es tarde.
+
+Acá cada paciente tiene una ventana circular (NumPy) con sus últimas
+VENTANA muestras de bpm, SpO2 y hora. Una vez por TICK se evalúan TODAS las
+reglas para TODOS los pacientes con operaciones sobre matrices
+[pacientes x muestras], sin un bucle de Python por paciente:
+
+  taquicardia_sostenida → todas las últimas N muestras con bpm > umbral
+  bradicardia_sostenida → todas las últimas N muestras con bpm < umbral
+  hipoxemia             → todas las últimas N muestras con SpO2 < umbral
+  desaturacion          → pendiente de SpO2 (mínimos cuadrados) < X %/min
+  cambio_brusco         → último bpm vs promedio de las N anteriores > delta
+
+Sólo se informa cuando una alerta SE ACTIVA (no en cada tick mientras
+sigue activa), así la central no repite lo mismo cada segundo.
+
+10.000 pacientes a 1 Hz: la evaluación entera es de milisegundos en un
+núcleo (ver benchmark_alertas.py).
+"""
+
+import threading
+
+import numpy as np
+
+# Muestras guardadas por paciente (a 1 Hz: los últimos 2 minutos)
+VENTANA = 120
+TICK = 1.0
+
+REGLAS = {
+    "taquicardia_sostenida": {"umbral_bpm": 120, "muestras": 10},
+    "bradicardia_sostenida": {"umbral_bpm": 45, "muestras": 10},
+    "hipoxemia": {"umbral_spo2": 90, "muestras": 10},
+    "desaturacion": {"pendiente_por_minuto": -3.0, "muestras": 60},
+    "cambio_brusco": {"delta_bpm": 40, "muestras": 30},
+}
+
+
+class MotorAlertas:
+    def __init__(self, reglas=None, ventana=VENTANA, pacientes=1024):
+        self.reglas = {nombre: dict(config) for nombre, config in REGLAS.items()}
+        for nombre, config in (reglas or {}).items():
+            self.reglas.setdefault(nombre, {}).update(config)
+        self.nombres_reglas = list(self.reglas)
+        # +1: cambio_brusco compara la última contra las N anteriores
+        necesaria = max(config["muestras"] for config in self.reglas.values()) + 1
+        if ventana < necesaria:
+            raise ValueError(f"La ventana ({ventana}) es menor que la regla más larga ({necesaria})")
+        self.ventana = ventana
+
+        self.filas = {}
+        self.ids = []
+        self._candado = threading.Lock()
+        self._crear(pacientes)
+
+    def _crear(self, capacidad):
+        forma = (capacidad, self.ventana)
+        self.bpm = np.full(forma, np.nan, dtype=np.float32)
+        self.spo2 = np.full(forma, np.nan, dtype=np.float32)
+        self.hora = np.full(forma, np.nan, dtype=np.float64)
+        # Muestras escritas en total (la posición en la ventana es cursor % ventana)
+        self.cursor = np.zeros(capacidad, dtype=np.int64)
+        self.activas = np.zeros((capacidad, len(self.nombres_reglas)), dtype=bool)
+
+    def _crecer(self):
+        anterior = (self.bpm, self.spo2, self.hora, self.cursor, self.activas)
+        self._crear(len(self.cursor) * 2)
+        for nuevo, viejo in zip((self.bpm, self.spo2, self.hora, self.cursor, self.activas), anterior):
+            nuevo[:len(viejo)] = viejo
+
+    def _fila(self, id_paciente):
+        fila = self.filas.get(id_paciente)
+        if fila is None:
+            fila = self.filas[id_paciente] = len(self.ids)
+            self.ids.append(id_paciente)
+            if fila >= len(self.cursor):
+                self._crecer()
+        return fila
+
+    # --- INGESTA ---
+
+    def agregar(self, muestras):
+        """Muestras decodificadas (dicts de formato_vitales.py)."""
+        if not muestras:
+            return
+        with self._candado:
+            filas = np.fromiter((self._fila(m.get("id_paciente", m.get("id"))) for m in muestras),
+                                dtype=np.int64, count=len(muestras))
+            self._escribir(filas,
+                           np.fromiter((m.get("bpm", np.nan) for m in muestras), np.float32, len(muestras)),
+                           np.fromiter((m.get("spo2", np.nan) for m in muestras), np.float32, len(muestras)),
+                           np.fromiter((m.get("timestamp", np.nan) for m in muestras), np.float64, len(muestras)))
+
+    def agregar_arreglos(self, ids, bpm, spo2, hora):
+        """Lo mismo con columnas ya armadas (ids: lista; el resto, arreglos)."""
+        with self._candado:
+            filas = np.fromiter((self._fila(i) for i in ids), dtype=np.int64, count=len(ids))
+            self._escribir(filas, np.asarray(bpm, np.float32), np.asarray(spo2, np.float32),
+                           np.asarray(hora, np.float64))
+
+    def _escribir(self, filas, bpm, spo2, hora):
+        # Un mismo paciente puede venir varias veces en el lote (lotes de la
+        # pulsera): cada aparición va al lugar siguiente de su ventana
+        orden = np.argsort(filas, kind='stable')
+        filas = filas[orden]
+        unicas, inicios, cuentas = np.unique(filas, return_index=True, return_counts=True)
+        rango = np.arange(len(filas)) - np.repeat(inicios, cuentas)
+        posiciones = (self.cursor[filas] + rango) % self.ventana
+        self.bpm[filas, posiciones] = bpm[orden]
+        self.spo2[filas, posiciones] = spo2[orden]
+        self.hora[filas, posiciones] = hora[orden]
+        self.cursor[unicas] += cuentas
+
+    # --- EVALUACIÓN ---
+
+    def _indices_ultimas(self, n, cantidad):
+        """Posiciones de las últimas `cantidad` muestras de cada paciente (columna 0 = la más nueva)."""
+        return (self.cursor[:n, None] - 1 - np.arange(cantidad)) % self.ventana
+
+    def _evaluar_reglas(self, n):
+        """Retorna (disparadas [n x reglas], valores [n x reglas])."""
+        reglas = self.reglas
+        disparadas = np.zeros((n, len(self.nombres_reglas)), dtype=bool)
+        valores = np.zeros((n, len(self.nombres_reglas)), dtype=np.float64)
+
+        # Una sola lectura de las ventanas (la más larga que pida una regla);
+        # cada regla usa las primeras k columnas
+        largo = max(config["muestras"] for config in reglas.values()) + 1
+        indices = self._indices_ultimas(n, largo)
+        todas = {"bpm": np.take_along_axis(self.bpm[:n], indices, axis=1),
+                 "spo2": np.take_along_axis(self.spo2[:n], indices, axis=1),
+                 "hora": np.take_along_axis(self.hora[:n], indices, axis=1)}
+
+        for j, nombre in enumerate(self.nombres_reglas):
+            config = reglas[nombre]
+            k = config["muestras"]
+            if nombre in ("taquicardia_sostenida", "bradicardia_sostenida"):
+                ultimas = todas["bpm"][:, :k]
+                # NaN nunca cumple: hacen falta k muestras reales
+                if nombre == "taquicardia_sostenida":
+                    disparadas[:, j] = np.all(ultimas > config["umbral_bpm"], axis=1)
+                else:
+                    disparadas[:, j] = np.all(ultimas < config["umbral_bpm"], axis=1)
+                valores[:, j] = ultimas[:, 0]
+            elif nombre == "hipoxemia":
+                ultimas = todas["spo2"][:, :k]
+                disparadas[:, j] = np.all(ultimas < config["umbral_spo2"], axis=1)
+                valores[:, j] = ultimas[:, 0]
+            elif nombre == "desaturacion":
+                y = todas["spo2"][:, :k].astype(np.float64)
+                # Horas relativas a la última muestra (no pierde precisión)
+                x = todas["hora"][:, :k] - todas["hora"][:, :1]
+                validas = ~(np.isnan(y) | np.isnan(x))
+                cuenta = validas.sum(axis=1)
+                x0 = np.where(validas, x, 0.0)
+                y0 = np.where(validas, y, 0.0)
+                media_x = x0.sum(axis=1) / np.maximum(cuenta, 1)
+                media_y = y0.sum(axis=1) / np.maximum(cuenta, 1)
+                dx = np.where(validas, x - media_x[:, None], 0.0)
+                dy = np.where(validas, y - media_y[:, None], 0.0)
+                varianza = (dx * dx).sum(axis=1)
+                pendiente = np.divide((dx * dy).sum(axis=1), varianza,
+                                      out=np.zeros(n), where=varianza > 0) * 60
+                # Con la ventana completa: con pocas muestras el ruido de
+                # ±1% de la SpO2 ya parece una pendiente
+                disparadas[:, j] = (cuenta >= k) & (pendiente < config["pendiente_por_minuto"])
+                valores[:, j] = pendiente
+            elif nombre == "cambio_brusco":
+                ultimas = todas["bpm"][:, :k + 1].astype(np.float64)
+                anteriores = ultimas[:, 1:]
+                validas = ~np.isnan(anteriores)
+                cuenta = validas.sum(axis=1)
+                promedio = np.where(validas, anteriores, 0.0).sum(axis=1) / np.maximum(cuenta, 1)
+                delta = ultimas[:, 0] - promedio
+                disparadas[:, j] = ((cuenta >= k // 2) & ~np.isnan(delta)
+                                    & (np.abs(delta) > config["delta_bpm"]))
+                valores[:, j] = delta
+        return disparadas, valores
+
+    def evaluar(self):
+        """
+        Evalúa todas las reglas para todos los pacientes. Retorna las alertas
+        que se ACTIVARON en este tick: [(id_paciente, regla, valor)].
+        """
+        with self._candado:
+            n = len(self.ids)
+            if not n:
+                return []
+            disparadas, valores = self._evaluar_reglas(n)
+            nuevas = disparadas & ~self.activas[:n]
+            self.activas[:n] = disparadas
+            filas, columnas = np.nonzero(nuevas)
+            return [(self.ids[f], self.nombres_reglas[c], float(valores[f, c]))
+                    for f, c in zip(filas.tolist(), columnas.tolist())]
+
+    def activas_por_regla(self):
+        with self._candado:
+            n = len(self.ids)
+            return dict(zip(self.nombres_reglas, self.activas[:n].sum(axis=0).tolist()))
+
+    def iniciar(self, al_alertar, cada=TICK):
+        """Hilo que llama evaluar() cada `cada` segundos y pasa las nuevas a al_alertar(lista)."""
+        detener = threading.Event()
+
+        def bucle():
+            while not detener.wait(cada):
+                alertas = self.evaluar()
+                if alertas:
+                    al_alertar(alertas)
+
+        threading.Thread(target=bucle, name="motor-alertas", daemon=True).start()
+        return detener
+
+
+DESCRIPCIONES = {
+    "taquicardia_sostenida": "TAQUICARDIA SOSTENIDA ({:.0f} BPM)",
+    "bradicardia_sostenida": "BRADICARDIA SOSTENIDA ({:.0f} BPM)",
+    "hipoxemia": "HIPOXEMIA ({:.0f}% SpO2)",
+    "desaturacion": "DESATURACIÓN EN CURSO ({:+.1f}% SpO2 por minuto)",
+    "cambio_brusco": "CAMBIO BRUSCO DE RITMO ({:+.0f} BPM)",
+}
+
+
+def describir(regla, valor):
+    return DESCRIPCIONES.get(regla, regla + " ({:.1f})").format(valor)
@@ -0,0 +1,363 @@
+"""
+ORTHANC LOCAL DE PRUEBA (orthanc_local.py)
+──────────────────────────────────────────
+Una imitación de la API REST de Orthanc (puerto 8042) con pacientes y
+estudios sintéticos, para probar y medir ladron_api.py sin Docker ni datos
+reales. Los pacientes se generan al vuelo a partir de su número: 100.000
+pacientes no ocupan memoria de más.
+
+Implementa lo que usa la auditoría:
+
+    GET  /system, /statistics
+    GET  /changes                       ?since=N&limit=M  ?last
+    GET  /patients, /studies            ?expand  ?since=N&limit=M
+    GET  /patients/<id>, /studies/<id>, /patients/<id>/studies
+    POST /tools/find                    {"Level", "Query", "Expand", "Since", "Limit"}
+
+HTTP/1.1 con keep-alive y autenticación básica (orthanc/orthanc). Con
+`latencia` cada respuesta se demora lo indicado, como un servidor real
+a través de la red: ahí se ve qué gana la concurrencia.
+
+Uso:
+    python orthanc_local.py                          # 100 pacientes en 127.0.0.1:8042
+    python orthanc_local.py --pacientes 100000 --latencia 0.005
+
+Desde código:
+    orthanc = OrthancLocal(pacientes=1000, puerto=0).iniciar()
+    ... orthanc.url ...
+    print(orthanc.peticiones, orthanc.conexiones)
+    orthanc.detener()
+"""
+
+import argparse
+import base64
+import fnmatch
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PUERTO_LOCAL = 8042
+USUARIO = "orthanc"
+CLAVE = "orthanc"
+
+NOMBRES = ["ANA", "JUAN", "MARIA", "CARLOS", "LUCIA", "JORGE", "SOFIA", "PEDRO", "ELENA", "DIEGO"]
+APELLIDOS = ["GONZALEZ", "RODRIGUEZ", "PEREZ", "FERNANDEZ", "LOPEZ", "MARTINEZ", "GARCIA",
+             "SANCHEZ", "ROMERO", "DIAZ", "ALVAREZ", "TORRES"]
+DESCRIPCIONES = ["TC TORAX", "RM CEREBRO", "RX TORAX PA", "ECO ABDOMINAL", "TC ABDOMEN Y PELVIS"]
+
+
+def id_orthanc(texto):
+    """Mismo formato que Orthanc: SHA-1 en 5 grupos de 8 hex."""
+    digesto = hashlib.sha1(texto.encode()).hexdigest()
+    return '-'.join(digesto[i:i + 8] for i in range(0, 40, 8))
+
+
+class DatosSinteticos:
+    """Pacientes 0..N-1 con `estudios` estudios cada uno, generados a pedido."""
+
+    def __init__(self, pacientes, estudios=2):
+        self.estudios_por_paciente = estudios
+        # Sólo los que existen, en orden de llegada (como los lista Orthanc)
+        self.ids_pacientes = []
+        self.ids_estudios = []
+        self._paciente = {}
+        self._estudio = {}
+        self.total = 0
+        self.agregar(pacientes)
+
+    def _ids_estudios_de(self, n):
+        return [id_orthanc(f"S{n:08d}.{e}") for e in range(self.estudios_por_paciente)]
+
+    def agregar(self, cantidad):
+        """Agrega pacientes nuevos. Retorna [(id paciente, [ids estudios])]."""
+        nuevos = []
+        for n in range(self.total, self.total + cantidad):
+            id_paciente = id_orthanc(f"P{n:08d}")
+            estudios = self._ids_estudios_de(n)
+            self.ids_pacientes.append(id_paciente)
+            self._paciente[id_paciente] = n
+            for e, id_estudio in enumerate(estudios):
+                self.ids_estudios.append(id_estudio)
+                self._estudio[id_estudio] = n * self.estudios_por_paciente + e
+            nuevos.append((id_paciente, estudios))
+        self.total += cantidad
+        return nuevos
+
+    def borrar(self, id_paciente):
+        """Borra un paciente y sus estudios. Retorna los ids de los estudios."""
+        n = self._paciente.pop(id_paciente)
+        self.ids_pacientes.remove(id_paciente)
+        estudios = self._ids_estudios_de(n)
+        for id_estudio in estudios:
+            del self._estudio[id_estudio]
+            self.ids_estudios.remove(id_estudio)
+        return estudios
+
+    def _tags_paciente(self, n):
+        return {
+            "PatientBirthDate": f"{1940 + n % 70}{1 + n % 12:02d}{1 + n % 28:02d}",
+            "PatientID": f"{n:08d}",
+            "PatientName": f"{APELLIDOS[n % len(APELLIDOS)]}^{NOMBRES[n % len(NOMBRES)]}",
+            "PatientSex": "MF"[n % 2],
+        }
+
+    def paciente(self, n):
+        return {
+            "ID": id_orthanc(f"P{n:08d}"),
+            "IsStable": True,
+            "Labels": [],
+            "LastUpdate": "20240101T120000",
+            "MainDicomTags": self._tags_paciente(n),
+            "Studies": self._ids_estudios_de(n),
+            "Type": "Patient",
+        }
+
+    def estudio(self, m):
+        n, e = divmod(m, self.estudios_por_paciente)
+        return {
+            "ID": id_orthanc(f"S{n:08d}.{e}"),
+            "IsStable": True,
+            "Labels": [],
+            "LastUpdate": "20240101T120000",
+            "MainDicomTags": {
+                "AccessionNumber": f"A{m:09d}",
+                "InstitutionName": "HOSPITAL LOCAL",
+                "StudyDate": f"2024{1 + m % 12:02d}{1 + m % 28:02d}",
+                "StudyDescription": DESCRIPCIONES[(n + e) % len(DESCRIPCIONES)],
+                "StudyID": str(e + 1),
+                "StudyInstanceUID": f"1.2.826.0.1.3680043.10.{n}.{e}",
+            },
+            "ParentPatient": id_orthanc(f"P{n:08d}"),
+            "PatientMainDicomTags": self._tags_paciente(n),
+            "Series": [],
+            "Type": "Study",
+        }
+
+    def nivel(self, nombre):
+        """(ids que existen, recurso(número), número por id) de 'patients' o 'studies'."""
+        if nombre == "patients":
+            return self.ids_pacientes, self.paciente, self._paciente
+        return self.ids_estudios, self.estudio, self._estudio
+
+
+def _coincide_consulta(recurso, consulta):
+    """Como /tools/find: comodines * y ?, sin distinguir mayúsculas."""
+    tags = dict(recurso.get("PatientMainDicomTags", {}), **recurso["MainDicomTags"])
+    for tag, patron in consulta.items():
+        if patron in ("", "*"):
+            continue
+        if not fnmatch.fnmatchcase(tags.get(tag, "").upper(), str(patron).upper()):
+            return False
+    return True
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    # HTTP/1.1: la conexión queda abierta entre peticiones (keep-alive)
+    protocol_version = "HTTP/1.1"
+    # Cabecera y cuerpo salen en dos write(): sin TCP_NODELAY, Nagle + el
+    # ACK demorado del cliente suman ~40 ms a cada respuesta
+    disable_nagle_algorithm = True
+    orthanc = None
+
+    def setup(self):
+        super().setup()
+        self.orthanc._contar('conexiones')
+
+    def log_message(self, formato, *argumentos):
+        pass
+
+    def _responder(self, codigo, cuerpo=None):
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else b''
+        self.send_response(codigo)
+        if codigo == 401:
+            self.send_header("WWW-Authenticate", 'Basic realm="Orthanc Secure Area"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _autorizado(self):
+        return self.headers.get("Authorization") == self.orthanc.autorizacion
+
+    def _atender(self, metodo):
+        orthanc = self.orthanc
+        orthanc._contar('peticiones')
+        largo = int(self.headers.get("Content-Length") or 0)
+        cuerpo = self.rfile.read(largo) if largo else b''
+        if orthanc.latencia:
+            time.sleep(orthanc.latencia)
+        if not self._autorizado():
+            return self._responder(401)
+        partes = urlsplit(self.path)
+        parametros = parse_qs(partes.query, keep_blank_values=True)
+        ruta = [p for p in partes.path.split('/') if p]
+        try:
+            if metodo == "POST" and ruta == ["tools", "find"]:
+                return self._responder(200, orthanc.buscar(json.loads(cuerpo or b'{}')))
+            if metodo != "GET":
+                return self._responder(405)
+            if ruta == ["system"]:
+                return self._responder(200, {"Name": "ORTHANC_LOCAL", "Version": "1.12.4", "ApiVersion": 24})
+            if ruta == ["changes"]:
+                return self._responder(200, orthanc.listar_cambios(
+                    int(parametros.get("since", ["0"])[0]),
+                    min(int(parametros.get("limit", ["100"])[0]), 10000),
+                    "last" in parametros))
+            if ruta == ["statistics"]:
+                return self._responder(200, orthanc.estadisticas())
+            if len(ruta) == 1 and ruta[0] in ("patients", "studies"):
+                return self._responder(200, orthanc.listar(ruta[0], "expand" in parametros,
+                                                           int(parametros.get("since", ["0"])[0]),
+                                                           int(parametros.get("limit", ["0"])[0])))
+            if len(ruta) in (2, 3) and ruta[0] in ("patients", "studies"):
+                recurso = orthanc.recurso(ruta[0], ruta[1])
+                if recurso is None:
+                    return self._responder(404)
+                if len(ruta) == 2:
+                    return self._responder(200, recurso)
+                if ruta[0] == "patients" and ruta[2] == "studies":
+                    return self._responder(200, [orthanc.recurso("studies", e) for e in recurso["Studies"]])
+            return self._responder(404)
+        except (ValueError, KeyError) as e:
+            return self._responder(400, {"Message": str(e)})
+
+    def do_GET(self):
+        self._atender("GET")
+
+    def do_POST(self):
+        self._atender("POST")
+
+
+class OrthancLocal:
+    def __init__(self, pacientes=100, estudios=2, ip='127.0.0.1', puerto=PUERTO_LOCAL, latencia=0.0,
+                 usuario=USUARIO, clave=CLAVE):
+        self.datos = DatosSinteticos(0, estudios)
+        self.ip = ip
+        self.puerto = puerto
+        self.latencia = latencia
+        self.autorizacion = "Basic " + base64.b64encode(f"{usuario}:{clave}".encode()).decode()
+        self.peticiones = 0
+        self.conexiones = 0
+        self._candado = threading.Lock()
+        self._servidor = None
+        # /changes: (tipo, nivel, id); el Seq es la posición + 1
+        self.cambios = []
+        self._anotar_nuevos(self.datos.agregar(pacientes))
+
+    @property
+    def url(self):
+        return f"http://{self.ip}:{self.puerto}"
+
+    def _contar(self, campo):
+        with self._candado:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def _anotar_nuevos(self, nuevos):
+        # Mismo orden que Orthanc al recibir una instancia: el estudio, y
+        # después el paciente
+        for id_paciente, estudios in nuevos:
+            self.cambios.extend(("NewStudy", "Study", id_estudio) for id_estudio in estudios)
+            self.cambios.append(("NewPatient", "Patient", id_paciente))
+
+    def agregar_pacientes(self, cantidad):
+        """Llegan pacientes nuevos (con sus estudios). Retorna sus ids."""
+        with self._candado:
+            nuevos = self.datos.agregar(cantidad)
+            self._anotar_nuevos(nuevos)
+        return [id_paciente for id_paciente, _ in nuevos]
+
+    def borrar_paciente(self, id_paciente):
+        with self._candado:
+            for id_estudio in self.datos.borrar(id_paciente):
+                self.cambios.append(("Deleted", "Study", id_estudio))
+            self.cambios.append(("Deleted", "Patient", id_paciente))
+
+    def listar_cambios(self, desde=0, limite=100, ultimo=False):
+        """Como GET /changes?since=N&limit=M (o ?last)."""
+        with self._candado:
+            total = len(self.cambios)
+            if ultimo:
+                desde, limite = max(total - 1, 0), 1
+            elegidos = self.cambios[desde:desde + limite]
+        cambios = [{"ChangeType": tipo, "Date": "20240101T120000", "ID": id_,
+                    "Path": f"/{'patients' if nivel == 'Patient' else 'studies'}/{id_}",
+                    "ResourceType": nivel, "Seq": desde + i + 1}
+                   for i, (tipo, nivel, id_) in enumerate(elegidos)]
+        ultima = desde + len(elegidos)
+        return {"Changes": cambios, "Done": ultima >= total, "Last": ultima if cambios else total}
+
+    def estadisticas(self):
+        return {"CountPatients": len(self.datos.ids_pacientes),
+                "CountStudies": len(self.datos.ids_estudios),
+                "CountSeries": 0, "CountInstances": 0, "TotalDiskSizeMB": 0}
+
+    def listar(self, nivel, expandir, desde=0, limite=0):
+        ids, recurso, numeros = self.datos.nivel(nivel)
+        with self._candado:
+            elegidos = ids[desde:desde + limite] if limite else ids[desde:]
+        return [recurso(numeros[id_]) for id_ in elegidos] if expandir else elegidos
+
+    def recurso(self, nivel, id_):
+        _, recurso, indice = self.datos.nivel(nivel)
+        n = indice.get(id_)
+        return None if n is None else recurso(n)
+
+    def buscar(self, pedido):
+        nivel = {"Patient": "patients", "Study": "studies"}.get(pedido.get("Level"))
+        if nivel is None:
+            raise ValueError(f"Nivel no soportado: {pedido.get('Level')}")
+        ids, recurso, numeros = self.datos.nivel(nivel)
+        consulta = pedido.get("Query", {})
+        desde, limite = int(pedido.get("Since", 0)), int(pedido.get("Limit", 0))
+        with self._candado:
+            ids = list(ids)
+        salida, salteados = [], 0
+        for id_ in ids:
+            if consulta and not _coincide_consulta(recurso(numeros[id_]), consulta):
+                continue
+            # Since/Limit cuentan sobre los que coinciden, como en Orthanc
+            if salteados < desde:
+                salteados += 1
+                continue
+            salida.append(recurso(numeros[id_]) if pedido.get("Expand") else id_)
+            if limite and len(salida) >= limite:
+                break
+        return salida
+
+    def iniciar(self):
+        manejador = type("Manejador", (_Manejador,), {"orthanc": self})
+        self._servidor = ThreadingHTTPServer((self.ip, self.puerto), manejador)
+        self._servidor.daemon_threads = True
+        # puerto=0: el sistema elige uno libre
+        self.puerto = self._servidor.server_address[1]
+        threading.Thread(target=self._servidor.serve_forever, name="orthanc-local", daemon=True).start()
+        return self
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Orthanc local de prueba (API REST con datos sintéticos)")
+    parser.add_argument('--ip', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=PUERTO_LOCAL)
+    parser.add_argument('--pacientes', type=int, default=100)
+    parser.add_argument('--estudios', type=int, default=2, help="Estudios por paciente")
+    parser.add_argument('--latencia', type=float, default=0.0, help="Segundos de demora por respuesta")
+    args = parser.parse_args()
+
+    orthanc = OrthancLocal(args.pacientes, args.estudios, args.ip, args.puerto, args.latencia).iniciar()
+    print(f"--- ORTHANC LOCAL en {orthanc.url}: {args.pacientes:,} pacientes "
+          f"(usuario {USUARIO} / clave {CLAVE}) ---")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        orthanc.detener()
+        print(f"\nApagando Orthanc local. Peticiones: {orthanc.peticiones:,} "
+              f"en {orthanc.conexiones:,} conexiones.")
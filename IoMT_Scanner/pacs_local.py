@@ -0,0 +1,93 @@
+"""
+PACS LOCAL DE PRUEBA (pacs_local.py)
+────────────────────────────────────
+Un SCP de almacenamiento (C-STORE) hecho con pynetdicom que corre dentro
+del mismo proceso. Reemplaza a Orthanc para probar y medir ambulancia.py
+sin Docker.
+
+Acepta todas las clases de almacenamiento (CT, MR, CR...) con cualquier
+transfer syntax, así que no obliga a transcodificar nada. Por defecto sólo
+cuenta lo que recibe; con `directorio` además guarda cada instancia.
+
+Uso:
+    python pacs_local.py                    # escucha en 127.0.0.1:11112
+    python pacs_local.py --guardar recibidos/
+
+Desde código:
+    pacs = PacsLocal(puerto=11112)
+    pacs.iniciar()
+    ...
+    print(pacs.recibidos, pacs.bytes_recibidos)
+    pacs.detener()
+"""
+
+import argparse
+import os
+import threading
+
+from pynetdicom import AE, AllStoragePresentationContexts, ALL_TRANSFER_SYNTAXES, evt
+
+AET_LOCAL = 'PACS_LOCAL'
+PUERTO_LOCAL = 11112
+
+
+class PacsLocal:
+    def __init__(self, ip='127.0.0.1', puerto=PUERTO_LOCAL, aet=AET_LOCAL, directorio=None):
+        self.ip = ip
+        self.puerto = puerto
+        self.aet = aet
+        self.directorio = directorio
+        self.recibidos = 0
+        self.bytes_recibidos = 0
+        self.sop_instance_uids = set()
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def _al_recibir(self, event):
+        # encoded_dataset() devuelve los bytes tal como llegaron: no decodificamos nada
+        datos = event.encoded_dataset()
+        uid = event.request.AffectedSOPInstanceUID
+        with self._lock:
+            self.recibidos += 1
+            self.bytes_recibidos += len(datos)
+            self.sop_instance_uids.add(uid)
+        if self.directorio:
+            with open(os.path.join(self.directorio, f"{uid}.dcm"), 'wb') as f:
+                f.write(datos)
+        return 0x0000
+
+    def iniciar(self):
+        if self.directorio:
+            os.makedirs(self.directorio, exist_ok=True)
+        ae = AE(ae_title=self.aet)
+        # Hasta 128 contextos por asociación; las clases de almacenamiento
+        # entran todas, cada una con todas las transfer syntaxes conocidas.
+        for contexto in AllStoragePresentationContexts:
+            ae.add_supported_context(contexto.abstract_syntax, ALL_TRANSFER_SYNTAXES)
+        ae.maximum_associations = 64
+        self._servidor = ae.start_server((self.ip, self.puerto), block=False,
+                                         evt_handlers=[(evt.EVT_C_STORE, self._al_recibir)])
+        return self
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PACS local de prueba (C-STORE SCP)")
+    parser.add_argument('--ip', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=PUERTO_LOCAL)
+    parser.add_argument('--aet', default=AET_LOCAL)
+    parser.add_argument('--guardar', metavar='DIR', help="Guardar las instancias recibidas")
+    args = parser.parse_args()
+
+    pacs = PacsLocal(args.ip, args.puerto, args.aet, args.guardar).iniciar()
+    print(f"--- PACS LOCAL '{args.aet}' escuchando en {args.ip}:{args.puerto} ---")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pacs.detener()
+        print(f"\nApagando PACS. Recibidas: {pacs.recibidos} instancias "
+              f"({pacs.bytes_recibidos / 1e6:.1f} MB).")
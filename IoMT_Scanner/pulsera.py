@@ -1,20 +1,32 @@
 import paho.mqtt.client as mqtt
+import argparse
 import time
 import random
-import json
+
+from formato_vitales import FORMATOS, MAXIMO_MUESTRAS, codificar
 
 # CONFIGURACIÓN
 BROKER = "localhost"
 PUERTO = 1883 # Puerto estándar MQTT (Inseguro por defecto)
 TEMA = "hospital/pacientes/emanuel/vitales"
 
+# Formato del payload: json (el de siempre) o binario (25 bytes, ver
+# formato_vitales.py). Con --lote N se juntan N muestras en un mensaje.
+parser = argparse.ArgumentParser(description="Pulsera IoMT (publica signos vitales por MQTT)")
+parser.add_argument('--formato', choices=FORMATOS, default='json')
+parser.add_argument('--lote', type=int, default=1, help="Muestras por mensaje (1 por segundo)")
+args = parser.parse_args()
+if not 0 < args.lote <= MAXIMO_MUESTRAS:
+    parser.error(f"--lote debe estar entre 1 y {MAXIMO_MUESTRAS}")
+
 print("--- PULSERA INTELIGENTE v1.0 (IoMT) ---")
 print(f"[.] Conectando al broker en {BROKER}...")
 
 cliente = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2) #explicar en .md
 cliente.connect(BROKER, PUERTO, 60)
 
-print("[+] Conectado. Iniciando monitoreo...")
+print(f"[+] Conectado. Iniciando monitoreo (formato {args.formato}, {args.lote} muestra/s por mensaje)...")
+lote = []
 
 try:
     while True:
@@ -27,7 +39,7 @@ try:
         if random.random() < 0.1:
             bpm = random.randint(150, 190) # Taquicardia
         
-        # 2. Empaquetar en JSON (Estándar moderno)
+        # 2. Empaquetar (JSON o binario, ver formato_vitales.py)
         payload = {
             "id_paciente": "123456",
             "timestamp": time.time(),
@@ -35,10 +47,12 @@ try:
             "spo2": oxigeno,
             "bateria": 85
         }
-        mensaje_json = json.dumps(payload) # Convertir a cadena JSON
-        
-        # 3. PUBLICAR (Gritar al aire)
-        cliente.publish(TEMA, mensaje_json)
+        lote.append(payload)
+
+        # 3. PUBLICAR (Gritar al aire) cuando el lote está completo
+        if len(lote) == args.lote:
+            cliente.publish(TEMA, codificar(lote, args.formato))
+            lote = []
         
         # Feedback visual para ti
         estado = "❤️ NORMAL" if bpm < 120 else "⚠️ PELIGRO"
@@ -1,10 +1,12 @@
-import json
+import argparse
 import random
 import ssl
 import time
 
 import paho.mqtt.client as mqtt
 
+from formato_vitales import FORMATOS, codificar
+
 # CONFIGURACIÓN SEGURA
 BROKER = "localhost"
 PUERTO = 8883 # Puerto TLS
@@ -13,6 +15,11 @@ USUARIO = "paciente"
 CLAVE = "1234"
 CA_CERT = "hospital.crt" # Certificado para validar al servidor
 
+# json (el de siempre) o binario (ver formato_vitales.py)
+parser = argparse.ArgumentParser(description="Pulsera IoMT sobre MQTTS")
+parser.add_argument('--formato', choices=FORMATOS, default='json')
+args = parser.parse_args()
+
 print("--- PULSERA BLINDADA (MQTTS) ---")
 
 cliente = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
@@ -34,8 +41,12 @@ try:
         bpm = random.randint(60, 100)
         # Taquicardia aleatoria
         if random.random() < 0.1: bpm = 160  # explicar en .md que es este código y como funcina
-        payload = {"id": "123456", "bpm": bpm, "seguridad": "TLS_1.2"}
-        cliente.publish(TEMA, json.dumps(payload))
+        payload = {"id": "123456", "timestamp": time.time(), "bpm": bpm,
+                   "spo2": random.randint(90, 100), "seguridad": "TLS_1.2"}
+        if args.formato == 'binario':
+            # El binario no lleva "seguridad": la central ve que llegó por TLS
+            del payload["seguridad"]
+        cliente.publish(TEMA, codificar(payload, args.formato))
         
         print(f" -> Dato cifrado enviado: {bpm} BPM")
         time.sleep(1)
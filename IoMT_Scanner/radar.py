@@ -1,52 +1,73 @@
-import nmap
+import argparse
 import sys
+import time
+
+import nmap
+
+from descubrimiento_red import agregar_argumentos, backend_desde_argumentos, descubrir, ordenar_ips
 
 # 1. Configuración del Objetivo
-# Cambia esto si tu red no es 192.168.1.0/24
+# Cambia esto si tu red no es 192.168.1.0/24 (o usa --red)
 target_network = "192.168.1.0/24"
 
+parser = argparse.ArgumentParser(description="Radar IoMT: quién está vivo en la red")
+agregar_argumentos(parser, target_network)
+args = parser.parse_args()
+target_network = args.red
+
 print(f"--- Iniciando Escaneo IoMT en {target_network} ---")
-print("Espere un momento, esto puede tardar unos segundos...")
+print(f"Fragmentos /{args.prefijo}, {args.trabajadores} escaneos en paralelo...")
 
-# 2. Inicializar el Escáner
-nm = nmap.PortScanner()
+# 2. Inicializar el Escáner (un nmap por fragmento, ver descubrimiento_red.py)
+def al_encontrar(ip, datos):
+    # Sólo con --motor nativo: cada host aparece apenas contesta
+    print(f"  + {ip:<18} {datos['mac'] or ''}")
 
+backend = backend_desde_argumentos(args, al_encontrar)
+
+def al_terminar(fragmento, hosts, segundos, hechos, total, error):
+    # Los resultados se van juntando a medida que termina cada fragmento
+    if error is None:
+        print(f"  [{hechos}/{total}] {fragmento}: {len(hosts)} vivos ({segundos:.1f} s)")
+    else:
+        print(f"  [{hechos}/{total}] {fragmento}: error ({str(error)[:60]})")
+
+inicio = time.perf_counter()
 try:
-    # 3. Ejecutar el Escaneo (Equivalente a nmap -sn)
-    # arguments='-sn' significa "Ping Scan" (solo ver quién está vivo)
-    nm.scan(hosts=target_network, arguments='-sn')
+    # 3. Ejecutar el Escaneo (Equivalente a nmap -sn, por fragmentos)
+    # -sn significa "Ping Scan" (solo ver quién está vivo)
+    hosts, fallidos = descubrir(target_network, backend, args.trabajadores, args.prefijo, al_terminar)
+except ValueError as e:
+    print(f"Error: red inválida ({e})")
+    sys.exit(0)
 
-except nmap.PortScannerError:
+if fallidos and not hosts and all(isinstance(e, nmap.PortScannerError) for _, e in fallidos):
     print("Error: No se encontró nmap. ¿Lo instalaste con dnf?")
     sys.exit(0)
-except:
-    print("Error inesperado:", sys.exc_info()[0])
+if fallidos and not hosts and all(isinstance(e, PermissionError) for _, e in fallidos):
+    print("Error: el motor nativo usa sockets crudos. Corre el radar con SUDO.")
     sys.exit(0)
 
 # 4. Procesar y Mostrar Resultados
-# nm.all_hosts() devuelve una lista de todas las IPs encontradas
-hosts_found = nm.all_hosts()
+hosts_found = ordenar_ips(hosts)
 
-print(f"\nDispositivos detectados: {len(hosts_found)}")
+print(f"\nDispositivos detectados: {len(hosts_found)} en {time.perf_counter() - inicio:.1f} s")
 print("-" * 40)
 print(f"{'IP':<20} {'MAC Address':<20} {'Fabricante'}")
 print("-" * 40)
 
 for host in hosts_found:
-    try:
-        # Intentamos obtener la MAC y el Fabricante
-        # Nota: Esto solo funciona si corres el script con SUDO
-        if 'mac' in nm[host]['addresses']:
-            mac = nm[host]['addresses']['mac']
-            vendor = nm[host]['vendor'].get(mac, "Desconocido")
-        else:
-            mac = "Desconocido/Local"
-            vendor = "-"
-
-        print(f"{host:<20} {mac:<20} {vendor}")
+    # Nota: la MAC sólo aparece si corres el script con SUDO
+    mac = hosts[host]["mac"]
+    if mac:
+        vendor = hosts[host]["fabricante"] or "Desconocido"
+    else:
+        mac = "Desconocido/Local"
+        vendor = "-"
 
-    except Exception as e:
-        print(f"{host:<20} Error al leer datos")
+    print(f"{host:<20} {mac:<20} {vendor}")
 
 print("-" * 40)
-print("Escaneo finalizado.")
\ No newline at end of file
+if fallidos:
+    print(f"⚠️ {len(fallidos)} fragmentos no se pudieron escanear.")
+print("Escaneo finalizado.")
@@ -50,11 +50,15 @@ print(f" -> Ubicación:         {h[2][3]}")   # PV1-3 (Urgencias)
 print("\n✅ Paciente admitido digitalmente.") """
 
 
-import hl7
+import argparse
 import datetime
 import socket
+from mllp import DecodificadorMLLP, empaquetar, recibir_mensaje
+from emisor_lote import EmisorLote, generar_admisiones, leer_mensajes
 
-print("--- SISTEMA DE ADMISIÓN HOSPITALARIA (HL7 v2 + MLLP) ---")
+# 4. ENVIAR POR LA RED (TCP SOCKET)
+IP_MIRTH = 'localhost'
+PUERTO_MIRTH = 6661  # El puerto que configuraste en el TCP Listener
 
 # 1. DATOS DEL PACIENTE
 nombre = "EMANUEL"
@@ -63,45 +67,77 @@ id_paciente = "123456"
 fecha_nacimiento = "19991108"
 sexo = "M"
 
-# 2. CREAR EL MENSAJE HL7
-timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-msh = f"MSH|^~\\&|SISTEMA_PY|FEDORA|MIRTH|SERVER|{timestamp}||ADT^A01|MSG-{timestamp}|P|2.3"
-pid = f"PID|||{id_paciente}||{apellido}^{nombre}||{fecha_nacimiento}|{sexo}"
-pv1 = "PV1||I|URGENCIAS^304^1||||001^DR. HOUSE"
-mensaje_hl7 = f"{msh}\r{pid}\r{pv1}"
-
-print(f"[1] Mensaje Generado: MSG-{timestamp}")
+def enviar_admision():
+    # 2. CREAR EL MENSAJE HL7
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    msh = f"MSH|^~\\&|SISTEMA_PY|FEDORA|MIRTH|SERVER|{timestamp}||ADT^A01|MSG-{timestamp}|P|2.3"
+    pid = f"PID|||{id_paciente}||{apellido}^{nombre}||{fecha_nacimiento}|{sexo}"
+    pv1 = "PV1||I|URGENCIAS^304^1||||001^DR. HOUSE"
+    mensaje_hl7 = f"{msh}\r{pid}\r{pv1}"
 
-# 3. EMPAQUETAR EN MLLP (El protocolo de transporte médico)
-# Inicio de bloque (VT - Vertical Tab - ASCII 11)
-SB = chr(11)
-# Fin de bloque (FS - File Separator - ASCII 28) + (CR - Carriage Return - ASCII 13)
-EB = chr(28) + chr(13)
+    print(f"[1] Mensaje Generado: MSG-{timestamp}")
 
-mensaje_mllp = SB + mensaje_hl7 + EB
+    # 3. EMPAQUETAR EN MLLP (El protocolo de transporte médico)
+    # Inicio de bloque (VT - Vertical Tab - ASCII 11) + mensaje +
+    # Fin de bloque (FS - File Separator - ASCII 28) + (CR - Carriage Return - ASCII 13)
+    mensaje_mllp = empaquetar(mensaje_hl7)
 
-# 4. ENVIAR POR LA RED (TCP SOCKET)
-IP_MIRTH = 'localhost'
-PUERTO_MIRTH = 6661  # El puerto que configuraste en el TCP Listener
-
-try:
     print(f"[2] Conectando a Mirth Connect ({IP_MIRTH}:{PUERTO_MIRTH})...")
-    
+
     # Crear el "cable" virtual
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     s.connect((IP_MIRTH, PUERTO_MIRTH))
-    
+
     # Enviar datos (convertidos a bytes)
-    s.send(mensaje_mllp.encode('utf-8'))
+    s.sendall(mensaje_mllp)
     print(" -> Datos enviados.")
-    
+
     # Esperar respuesta (ACK) del servidor
-    # Mirth siempre responde "Entendido"
-    respuesta = s.recv(1024)
-    print(f"[3] Respuesta del Servidor:\n {respuesta.decode('utf-8')}")
-    
+    # Mirth siempre responde "Entendido". El ACK puede llegar en varios
+    # pedazos, así que leemos hasta tener la trama MLLP completa.
+    respuesta = recibir_mensaje(s, DecodificadorMLLP())
+    if respuesta is None:
+        print("[3] El servidor cerró la conexión sin responder.")
+    else:
+        print(f"[3] Respuesta del Servidor:\n {respuesta.decode('utf-8')}")
+
     s.close()
     print("✅ Transmisión Exitosa.")
 
-except ConnectionRefusedError:
-    print("❌ ERROR: No se pudo conectar. ¿Creaste y DESPLEGASTE el canal en Mirth en el puerto 6661?")
\ No newline at end of file
+def enviar_lote(mensajes, ventana, reintentos, timeout):
+    # MODO LOTE: una sola conexión, varios mensajes en vuelo (ver emisor_lote.py)
+    print(f"[1] Enviando lote a {IP_MIRTH}:{PUERTO_MIRTH} (ventana={ventana})...")
+    emisor = EmisorLote(IP_MIRTH, PUERTO_MIRTH, ventana=ventana,
+                        reintentos=reintentos, timeout=timeout)
+    resumen = emisor.enviar(mensajes)
+    resumen.imprimir()
+    if not resumen.fallidos:
+        print("✅ Lote transmitido completo.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Admisión de pacientes por HL7 + MLLP")
+    origen = parser.add_mutually_exclusive_group()
+    origen.add_argument('--lote', metavar='ARCHIVO',
+                        help="Enviar todos los mensajes HL7 de un archivo por una conexión")
+    origen.add_argument('--generar', type=int, metavar='N',
+                        help="Enviar N admisiones sintéticas por una conexión")
+    parser.add_argument('--ventana', type=int, default=32, help="Mensajes en vuelo sin ACK")
+    parser.add_argument('--reintentos', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=5.0, help="Segundos de espera por ACK")
+    parser.add_argument('--puerto', type=int, default=PUERTO_MIRTH)
+    args = parser.parse_args()
+    PUERTO_MIRTH = args.puerto
+
+    print("--- SISTEMA DE ADMISIÓN HOSPITALARIA (HL7 v2 + MLLP) ---")
+    try:
+        if args.lote:
+            enviar_lote(leer_mensajes(args.lote), args.ventana, args.reintentos, args.timeout)
+        elif args.generar:
+            enviar_lote(generar_admisiones(args.generar), args.ventana, args.reintentos, args.timeout)
+        else:
+            enviar_admision()
+    except ConnectionRefusedError:
+        print(f"❌ ERROR: No se pudo conectar. ¿Creaste y DESPLEGASTE el canal en Mirth en el puerto {PUERTO_MIRTH}?")
+    except OSError as e:
+        # Reset o caída que no se pudo recuperar reconectando (ver emisor_lote.py)
+        print(f"❌ ERROR: Se perdió la conexión con {IP_MIRTH}:{PUERTO_MIRTH} ({e}).")
@@ -1,66 +1,116 @@
+import argparse
 import datetime
 import socket
 import ssl
+import time
+from mllp import DecodificadorMLLP, empaquetar, recibir_mensaje
 
-print("--- CLIENTE HL7 SEGURO (TLS) ---")
+# 2. CONFIGURACIÓN DE RED SEGURA
+IP_SERVIDOR = 'localhost'
+PUERTO_SERVIDOR = 6662 # Puerto seguro
+CERT_FILE = 'hospital.crt' # Necesitamos el certificado para verificar que el server es quien dice ser
 
 # 1. DATOS (Igual que siempre)
 nombre = "EMANUEL"
 apellido = "LEDESMA"
 id_paciente = "999999" # Cambiamos el ID para notar la diferencia
-timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-
-# Mensaje HL7
-msh = f"MSH|^~\\&|SISTEMA_TLS|FEDORA|HOSPITAL_TLS|SERVER|{timestamp}||ADT^A01|MSG-{timestamp}|P|2.3"
-pid = f"PID|||{id_paciente}||{apellido}^{nombre}||19991108|M"
-mensaje_hl7 = f"{msh}\r{pid}"
-# MLLP
-SB = chr(11)
-EB = chr(28) + chr(13)
-mensaje_mllp = SB + mensaje_hl7 + EB
 
-# 2. CONFIGURACIÓN DE RED SEGURA
-IP_SERVIDOR = 'localhost'
-PUERTO_SERVIDOR = 6662 # Puerto seguro
-CERT_FILE = 'hospital.crt' # Necesitamos el certificado para verificar que el server es quien dice ser
+def armar_mensaje(numero=0):
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    # Mensaje HL7
+    msh = f"MSH|^~\\&|SISTEMA_TLS|FEDORA|HOSPITAL_TLS|SERVER|{timestamp}||ADT^A01|MSG-{timestamp}-{numero}|P|2.3"
+    pid = f"PID|||{id_paciente}||{apellido}^{nombre}||19991108|M"
+    mensaje_hl7 = f"{msh}\r{pid}"
+    # MLLP
+    return empaquetar(mensaje_hl7)
 
-try:
-    print("[1] Preparando contexto de seguridad...")
+def crear_contexto():
     # Creamos un contexto para CLIENTE
     context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-    
-    # IMPORTANTE: Como es un certificado "casero" (Self-signed), 
+
+    # IMPORTANTE: Como es un certificado "casero" (Self-signed),
     # tenemos que decirle a Python que confíe explícitamente en este archivo.
     context.load_verify_locations(CERT_FILE)
-    
+
     # Opcional: Desactivar chequeo de hostname si usaste algo distinto a 'localhost' en el certificado
-    # context.check_hostname = False 
+    # context.check_hostname = False
+    return context
 
-    print(f"[2] Conectando a {IP_SERVIDOR}:{PUERTO_SERVIDOR}...")
-    
+def conectar(context, sesion=None):
+    """
+    Abre el túnel TLS. Si le pasamos la sesión de una conexión anterior,
+    el servidor la reanuda (handshake abreviado) en vez de hacer uno completo.
+    Retorna (conexión, milisegundos de handshake).
+    """
+    t0 = time.perf_counter()
     # Conexión TCP pura
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    
+    sock = socket.create_connection((IP_SERVIDOR, PUERTO_SERVIDOR))
     # ¡EL ENVOLTORIO! Convertimos el socket normal en socket seguro
-    conn_segura = context.wrap_socket(sock, server_hostname=IP_SERVIDOR)
-    
-    # Ahora nos conectamos usando el tubo seguro
-    conn_segura.connect((IP_SERVIDOR, PUERTO_SERVIDOR))
-    
-    print("[+] ¡Túnel TLS establecido!")
-    print(f"    Versión: {conn_segura.version()}")
-    
-    # Enviar datos
-    conn_segura.send(mensaje_mllp.encode('utf-8'))
-    print(" -> Datos encriptados enviados.")
-    
-    # Recibir ACK
-    respuesta = conn_segura.recv(1024)
-    print(f"[3] Respuesta del Servidor (Descifrada):\n {respuesta.decode('utf-8')}")
-    
-    conn_segura.close()
-
-except ssl.SSLError as e:
-    print(f"❌ Error de SSL (Certificado inválido o untrusted): {e}")
-except ConnectionRefusedError:
-    print("❌ No se puede conectar. ¿Está corriendo hospital_tls.py?")
\ No newline at end of file
+    conn_segura = context.wrap_socket(sock, server_hostname=IP_SERVIDOR, session=sesion)
+    return conn_segura, (time.perf_counter() - t0) * 1000
+
+def enviar(conn_segura, decodificador, mensaje_mllp):
+    """Envía un mensaje y espera su ACK. Retorna (ACK, milisegundos)."""
+    t0 = time.perf_counter()
+    conn_segura.sendall(mensaje_mllp)
+    respuesta = recibir_mensaje(conn_segura, decodificador)
+    return respuesta, (time.perf_counter() - t0) * 1000
+
+def promedio(valores):
+    return sum(valores) / len(valores) if valores else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Cliente HL7 sobre MLLP + TLS")
+    parser.add_argument('--mensajes', type=int, default=1,
+                        help="Mensajes a enviar por la MISMA conexión TLS")
+    parser.add_argument('--conexiones', type=int, default=1,
+                        help="Conexiones sucesivas; desde la 2da se reanuda la sesión TLS")
+    args = parser.parse_args()
+
+    print("--- CLIENTE HL7 SEGURO (TLS) ---")
+    print("[1] Preparando contexto de seguridad...")
+    context = crear_contexto()
+
+    sesion = None
+    handshakes_completos, handshakes_reanudados, latencias_mensaje = [], [], []
+
+    for numero_conexion in range(args.conexiones):
+        print(f"[2] Conectando a {IP_SERVIDOR}:{PUERTO_SERVIDOR}...")
+        conn_segura, ms_handshake = conectar(context, sesion)
+        reanudada = conn_segura.session_reused
+        (handshakes_reanudados if reanudada else handshakes_completos).append(ms_handshake)
+
+        print("[+] ¡Túnel TLS establecido!")
+        print(f"    Versión: {conn_segura.version()} | Handshake "
+              f"{'REANUDADO' if reanudada else 'COMPLETO'}: {ms_handshake:.2f} ms")
+
+        decodificador = DecodificadorMLLP()
+        with conn_segura:
+            for numero in range(args.mensajes):
+                respuesta, ms = enviar(conn_segura, decodificador,
+                                       armar_mensaje(numero_conexion * args.mensajes + numero))
+                latencias_mensaje.append(ms)
+                if respuesta is None:
+                    print("[3] El servidor cerró el túnel sin responder.")
+                    break
+                if args.mensajes == 1:
+                    print(" -> Datos encriptados enviados.")
+                    print(f"[3] Respuesta del Servidor (Descifrada):\n {respuesta.decode('utf-8')}")
+
+            # En TLS 1.3 el ticket llega después del handshake; tras leer el
+            # ACK ya lo tenemos y lo guardamos para la próxima conexión.
+            sesion = conn_segura.session
+
+    if args.mensajes > 1 or args.conexiones > 1:
+        print("\n--- LATENCIAS (ms) ---")
+        print(f" Handshake completo:  {promedio(handshakes_completos):8.2f}  (x{len(handshakes_completos)})")
+        print(f" Handshake reanudado: {promedio(handshakes_reanudados):8.2f}  (x{len(handshakes_reanudados)})")
+        print(f" Mensaje + ACK:       {promedio(latencias_mensaje):8.2f}  (x{len(latencias_mensaje)})")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ssl.SSLError as e:
+        print(f"❌ Error de SSL (Certificado inválido o untrusted): {e}")
+    except ConnectionRefusedError:
+        print("❌ No se puede conectar. ¿Está corriendo hospital_tls.py?")
@@ -0,0 +1,363 @@
+"""
+REESCRITOR DICOM EN STREAMING (reescritor_dicom.py)
+───────────────────────────────────────────────────
+dcmread + save_as (medico.py) arma el dataset entero en memoria, pixel data
+incluido, para cambiar dos nombres. Con una RM multi-frame de 800 MB eso
+son 800 MB de RAM por archivo (y por proceso del anonimizador).
+
+Acá el archivo se recorre elemento por elemento leyendo SÓLO las cabeceras
+(tag, VR, largo). Con eso se arma un plan:
+
+    [escribir: preámbulo + file meta (regenerado, largo de grupo corregido)]
+    [copiar:   bytes 340..1210 del original]     ← elementos sin cambios
+    [escribir: PatientName nuevo]                ← largo corregido
+    [copiar:   bytes 1232..812.000.000]          ← ... y el pixel data
+
+Los tramos "copiar" se pasan al kernel (copy_file_range / sendfile): los
+bytes van de archivo a archivo sin pasar por Python. La memoria máxima es
+la misma para una imagen de 1 MB que para una de 1 GB.
+
+Límites (a propósito):
+  - Sólo se tocan elementos del nivel superior. Las secuencias se copian
+    tal cual; quien necesite cambiar algo ADENTRO de una secuencia (p. ej.
+    un ReferencedSOPInstanceUID anidado) pasa `revisar_anidado` y, si la
+    secuencia tiene alguno de esos tags, recibe SecuenciaConCambios y
+    puede volver a dcmread + save_as. Nunca se copia en silencio.
+  - Un elemento de largo indefinido (secuencia, UN) se puede eliminar (no
+    se copia, delimitador incluido); cambiarle el valor → SecuenciaConCambios.
+  - Transfer syntaxes little endian (implícita, explícita y todas las
+    comprimidas/encapsuladas). Big endian y deflate → TransferSyntaxNoSoportada
+    (quien llama puede volver a dcmread + save_as).
+"""
+
+import os
+import struct
+
+from pydicom.datadict import dictionary_VR
+
+PREAMBULO = 128
+IMPLICITA = '1.2.840.10008.1.2'
+NO_SOPORTADAS = {
+    '1.2.840.10008.1.2.2': 'Explicit VR Big Endian',
+    '1.2.840.10008.1.2.1.99': 'Deflated Explicit VR Little Endian',
+}
+# VRs explícitos con 2 bytes reservados + largo de 4 bytes
+VR_LARGOS = {b'OB', b'OD', b'OF', b'OL', b'OV', b'OW', b'SQ', b'SV', b'UC', b'UN',
+             b'UR', b'UT', b'UV'}
+INDEFINIDO = 0xFFFFFFFF
+ITEM, FIN_ITEM, FIN_SECUENCIA = 0xFFFEE000, 0xFFFEE00D, 0xFFFEE0DD
+TAG_GRUPO_META = 0x00020000
+TAG_MEDIA_SOP_INSTANCE = 0x00020003
+TAG_TRANSFER_SYNTAX = 0x00020010
+
+# Tamaño del búfer cuando el kernel no puede copiar solo
+BLOQUE = 1 << 20
+
+# Valor especial para "no tocar este elemento"
+MANTENER = object()
+
+
+class ErrorReescritura(ValueError):
+    pass
+
+
+class TransferSyntaxNoSoportada(ErrorReescritura):
+    pass
+
+
+class SecuenciaConCambios(ErrorReescritura):
+    pass
+
+
+def _leer(f, n):
+    datos = f.read(n)
+    if len(datos) != n:
+        raise ErrorReescritura("Archivo truncado")
+    return datos
+
+
+def _cabecera(f, explicita):
+    """Lee la cabecera de un elemento. Retorna (tag, vr o None, largo, bytes_cabecera)."""
+    grupo, elemento, resto = struct.unpack('<HH4s', _leer(f, 8))
+    tag = (grupo << 16) | elemento
+    if grupo == 0xFFFE:
+        # Items y delimitadores: nunca llevan VR
+        return tag, None, struct.unpack('<I', resto)[0], 8
+    if not explicita:
+        return tag, None, struct.unpack('<I', resto)[0], 8
+    vr = resto[:2]
+    if vr in VR_LARGOS:
+        return tag, vr.decode('ascii'), struct.unpack('<I', _leer(f, 4))[0], 12
+    return tag, vr.decode('ascii'), struct.unpack('<H', resto[2:])[0], 8
+
+
+def _saltar_indefinido(f, explicita):
+    """Avanza hasta el fin de una secuencia (o pixel data encapsulado) de largo indefinido."""
+    while True:
+        tag, _, largo, _ = _cabecera(f, explicita)
+        if tag == FIN_SECUENCIA:
+            return
+        if tag != ITEM:
+            raise ErrorReescritura(f"Se esperaba un item y vino ({tag >> 16:04X},{tag & 0xFFFF:04X})")
+        if largo != INDEFINIDO:
+            f.seek(largo, os.SEEK_CUR)
+            continue
+        # Item de largo indefinido: un dataset anidado hasta FIN_ITEM
+        while True:
+            tag, vr, largo, _ = _cabecera(f, explicita)
+            if tag == FIN_ITEM:
+                break
+            if largo == INDEFINIDO:
+                # UN con largo indefinido se codifica siempre implícito
+                _saltar_indefinido(f, explicita and vr != 'UN')
+            else:
+                f.seek(largo, os.SEEK_CUR)
+
+
+def _es_secuencia(tag, vr, largo):
+    """
+    SQ, o UN que en realidad es una secuencia: con largo indefinido, o un
+    tag que el diccionario conoce como SQ (p. ej. un equipo que no lo
+    conocía y lo guardó como UN). Un UN siempre va codificado implícito.
+    """
+    if vr == 'SQ':
+        return True
+    if vr != 'UN':
+        return False
+    try:
+        return largo == INDEFINIDO or dictionary_VR(tag) == 'SQ'
+    except KeyError:
+        return False
+
+
+def tags_anidados(f, inicio_valor, largo, explicita):
+    """
+    Genera los tags de todos los elementos dentro de una secuencia (y de
+    sus secuencias anidadas), sin leer valores. Deja `f` en cualquier lado.
+    """
+    f.seek(inicio_valor)
+    fin = None if largo == INDEFINIDO else inicio_valor + largo
+    while fin is None or f.tell() < fin:
+        tag, _, largo_item, _ = _cabecera(f, explicita)
+        if tag == FIN_SECUENCIA:
+            return
+        if tag != ITEM:
+            raise ErrorReescritura(f"Se esperaba un item y vino ({tag >> 16:04X},{tag & 0xFFFF:04X})")
+        fin_item = None if largo_item == INDEFINIDO else f.tell() + largo_item
+        while fin_item is None or f.tell() < fin_item:
+            tag, vr, largo_elemento, _ = _cabecera(f, explicita)
+            if tag == FIN_ITEM:
+                break
+            if vr is None:
+                try:
+                    vr = dictionary_VR(tag)
+                except KeyError:
+                    vr = 'UN'
+            yield tag
+            inicio_elemento = f.tell()
+            if _es_secuencia(tag, vr, largo_elemento):
+                yield from tags_anidados(f, inicio_elemento, largo_elemento, explicita and vr != 'UN')
+                if largo_elemento != INDEFINIDO:
+                    f.seek(inicio_elemento + largo_elemento)
+            elif largo_elemento == INDEFINIDO:
+                _saltar_indefinido(f, explicita)
+            else:
+                f.seek(largo_elemento, os.SEEK_CUR)
+
+
+def recorrer(f, explicita):
+    """
+    Genera los elementos del nivel superior SIN leer sus valores:
+    (tag, vr, inicio, inicio_valor, largo_valor, fin).
+    """
+    while True:
+        inicio = f.tell()
+        if not f.read(1):
+            return
+        f.seek(inicio)
+        tag, vr, largo, tamanio_cabecera = _cabecera(f, explicita)
+        inicio_valor = inicio + tamanio_cabecera
+        if largo == INDEFINIDO:
+            _saltar_indefinido(f, explicita and vr != 'UN')
+            fin = f.tell()
+        else:
+            fin = inicio_valor + largo
+            f.seek(fin)
+        if vr is None and tag >> 16 != 0xFFFE:
+            try:
+                vr = dictionary_VR(tag)
+            except KeyError:
+                vr = 'UN'
+        yield tag, vr, inicio, inicio_valor, largo, fin
+
+
+def codificar_elemento(tag, vr, valor, explicita=True):
+    """Elemento completo (cabecera + valor con largo par)."""
+    if len(valor) % 2:
+        valor += b'\0' if vr in ('UI', 'OB', 'UN') else b' '
+    grupo, elemento = tag >> 16, tag & 0xFFFF
+    if not explicita:
+        return struct.pack('<HHI', grupo, elemento, len(valor)) + valor
+    vr_bytes = vr.encode('ascii')
+    if vr_bytes in VR_LARGOS:
+        return struct.pack('<HH2s2xI', grupo, elemento, vr_bytes, len(valor)) + valor
+    if len(valor) > 0xFFFF:
+        raise ErrorReescritura(f"Valor demasiado largo para VR {vr}")
+    return struct.pack('<HH2sH', grupo, elemento, vr_bytes, len(valor)) + valor
+
+
+def texto(valor):
+    """Valor de texto DICOM (bytes con relleno) → str."""
+    return valor.rstrip(b' \0').decode('latin-1')
+
+
+def leer_meta(f):
+    """Lee la file meta (grupo 0002, siempre explícita LE). Retorna [(tag, vr, valor)]."""
+    f.seek(0)
+    if len(f.read(PREAMBULO)) != PREAMBULO or f.read(4) != b'DICM':
+        raise ErrorReescritura("Falta el preámbulo DICOM (128 bytes + 'DICM')")
+    meta = []
+    while True:
+        inicio = f.tell()
+        encabezado = f.read(2)
+        f.seek(inicio)
+        if len(encabezado) < 2 or struct.unpack('<H', encabezado)[0] != 0x0002:
+            return meta
+        tag, vr, largo, _ = _cabecera(f, True)
+        meta.append((tag, vr, _leer(f, largo)))
+
+
+def _codificar_meta(meta):
+    cuerpo = b''.join(codificar_elemento(tag, vr, valor)
+                      for tag, vr, valor in meta if tag != TAG_GRUPO_META)
+    return codificar_elemento(TAG_GRUPO_META, 'UL', struct.pack('<I', len(cuerpo))) + cuerpo
+
+
+def planificar(f, transformar, revisar_anidado=None):
+    """
+    Recorre el archivo y arma el plan. `transformar(tag, vr, leer_valor)`
+    retorna MANTENER, None (eliminar) o los bytes del valor nuevo;
+    `leer_valor()` lee el valor actual sólo si hace falta.
+    `revisar_anidado(tag)` dice si un tag dentro de una secuencia necesitaría
+    cambios: si alguno da True se lanza SecuenciaConCambios.
+    Retorna (plan, meta, explicita), con plan = [(inicio, largo) | bytes].
+    """
+    meta = leer_meta(f)
+    transfer_syntax = next((texto(v) for t, _, v in meta if t == TAG_TRANSFER_SYNTAX), None)
+    if transfer_syntax is None:
+        raise ErrorReescritura("La file meta no tiene Transfer Syntax UID")
+    if transfer_syntax in NO_SOPORTADAS:
+        raise TransferSyntaxNoSoportada(f"Transfer syntax no soportada en streaming: "
+                                        f"{NO_SOPORTADAS[transfer_syntax]}")
+    explicita = transfer_syntax != IMPLICITA
+
+    plan = []
+
+    def copiar(inicio, fin):
+        if plan and isinstance(plan[-1], tuple) and sum(plan[-1]) == inicio:
+            plan[-1] = (plan[-1][0], plan[-1][1] + fin - inicio)
+        elif fin > inicio:
+            plan.append((inicio, fin - inicio))
+
+    for tag, vr, inicio, inicio_valor, largo, fin in list(recorrer(f, explicita)):
+        # Largos de grupo (gggg,0000) fuera de la meta: retirados y quedarían
+        # mal si cambia algún elemento del grupo → se eliminan
+        if tag & 0xFFFF == 0 and tag >> 16 != 0x0002:
+            continue
+
+        def leer_valor(inicio_valor=inicio_valor, largo=largo, tag=tag):
+            if largo == INDEFINIDO:
+                # Secuencia (o UN) de largo indefinido: no hay un valor que
+                # devolver; si hay que cambiarlo, que lo haga dcmread
+                raise SecuenciaConCambios(f"({tag >> 16:04X},{tag & 0xFFFF:04X}) tiene largo "
+                                          f"indefinido y hay que cambiar su valor")
+            f.seek(inicio_valor)
+            return _leer(f, largo)
+
+        # También los de largo indefinido: eliminarlos es no copiar
+        # [inicio, fin), que ya incluye el delimitador de la secuencia
+        resultado = transformar(tag, vr, leer_valor)
+        if largo == INDEFINIDO and resultado is not MANTENER and resultado is not None:
+            raise SecuenciaConCambios(f"({tag >> 16:04X},{tag & 0xFFFF:04X}) tiene largo "
+                                      f"indefinido y hay que reemplazarlo")
+        if revisar_anidado and resultado is MANTENER and _es_secuencia(tag, vr, largo):
+            anidado = next((t for t in tags_anidados(f, inicio_valor, largo, explicita and vr != 'UN')
+                            if revisar_anidado(t)), None)
+            if anidado is not None:
+                raise SecuenciaConCambios(f"({anidado >> 16:04X},{anidado & 0xFFFF:04X}) dentro de la "
+                                          f"secuencia ({tag >> 16:04X},{tag & 0xFFFF:04X})")
+        if resultado is MANTENER:
+            copiar(inicio, fin)
+        elif resultado is not None:
+            plan.append(codificar_elemento(tag, vr, resultado, explicita))
+    return plan, meta, explicita
+
+
+def _copiar_rango(fuente, destino, inicio, largo):
+    """Copia [inicio, inicio+largo) de fuente al final de destino, sin pasar por Python si se puede."""
+    destino.flush()
+    fd_fuente, fd_destino = fuente.fileno(), destino.fileno()
+    pendiente = largo
+    for llamada in ('copy_file_range', 'sendfile'):
+        if not pendiente or not hasattr(os, llamada):
+            continue
+        try:
+            while pendiente:
+                desde = inicio + largo - pendiente
+                if llamada == 'copy_file_range':
+                    copiados = os.copy_file_range(fd_fuente, fd_destino, pendiente, desde)
+                else:
+                    copiados = os.sendfile(fd_destino, fd_fuente, desde, pendiente)
+                if not copiados:
+                    raise ErrorReescritura("Archivo truncado")
+                pendiente -= copiados
+        except OSError:
+            continue
+    # Último recurso: búfer fijo (memoria constante igual)
+    if pendiente:
+        bufer = memoryview(bytearray(BLOQUE))
+        fuente.seek(inicio + largo - pendiente)
+        while pendiente:
+            n = fuente.readinto(bufer[:min(BLOQUE, pendiente)])
+            if not n:
+                raise ErrorReescritura("Archivo truncado")
+            destino.write(bufer[:n])
+            pendiente -= n
+        destino.flush()
+    # copy_file_range/sendfile movieron el offset del fd, no el del objeto
+    destino.seek(0, os.SEEK_END)
+
+
+def reescribir(origen, destino, transformar, transformar_meta=None, revisar_anidado=None):
+    """
+    Reescribe `origen` en `destino` aplicando `transformar` (ver planificar).
+    `transformar_meta(meta)` puede modificar la lista de la file meta antes
+    de escribirla (p. ej. MediaStorageSOPInstanceUID). Retorna bytes escritos.
+    """
+    with open(origen, 'rb') as fuente:
+        plan, meta, _ = planificar(fuente, transformar, revisar_anidado)
+        if transformar_meta:
+            meta = transformar_meta(meta)
+        temporal = destino + '.tmp'
+        try:
+            with open(temporal, 'wb') as salida:
+                salida.write(b'\0' * PREAMBULO + b'DICM' + _codificar_meta(meta))
+                for paso in plan:
+                    if isinstance(paso, tuple):
+                        _copiar_rango(fuente, salida, *paso)
+                    else:
+                        salida.write(paso)
+                escritos = salida.tell()
+        except BaseException:
+            # Un archivo a medias no se deja tirado (ni se confunde con la salida)
+            os.remove(temporal)
+            raise
+    os.replace(temporal, destino)
+    return escritos
+
+
+def reemplazar_meta(meta, tag, vr, valor):
+    """Copia de `meta` con `tag` reemplazado (o agregado) por `valor`."""
+    nueva = [(t, v, x) for t, v, x in meta if t != tag]
+    nueva.append((tag, vr, valor))
+    return sorted(nueva, key=lambda elemento: elemento[0])
@@ -0,0 +1,264 @@
+"""
+SIMULADOR DE CARGA: MILES DE PULSERAS (simulador_pulseras.py)
+─────────────────────────────────────────────────────────────
+pulsera.py es UN paciente que publica un JSON por segundo. Para probar el
+broker y la central de monitoreo hacen falta miles. Acá N pulseras virtuales
+(10.000 o más) salen de un solo proceso:
+
+  - Cada pulsera publica en SU tema: hospital/pacientes/<id>/vitales
+  - Las pulseras se reparten entre unas pocas conexiones MQTT (--conexiones);
+    cada conexión publica por tandas cada TICK segundos lo que le toca según
+    la frecuencia pedida (--hz por pulsera), sin un sleep por mensaje.
+  - QoS 0 o 1 (--qos). Con QoS 1 se mide la latencia hasta el PUBACK.
+  - Payload JSON o binario (--formato, ver formato_vitales.py).
+
+Cada segundo informa:
+    tasa lograda vs pedida, pendientes (publicados sin confirmar: la
+    contrapresión del broker), rechazados (cola local llena) y, con
+    --verificar, los perdidos (confirmados que nunca llegaron a un suscriptor).
+
+No hace falta mosquitto: --broker-embebido levanta broker_local.py en un
+proceso aparte.
+
+Uso:
+    python simulador_pulseras.py --broker-embebido --pulseras 10000 --hz 1
+    python simulador_pulseras.py --pulseras 2000 --hz 5 --qos 1 --segundos 30
+    python simulador_pulseras.py --broker 10.0.0.5 --pulseras 500 --verificar
+"""
+
+import argparse
+import multiprocessing
+import random
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+import broker_local
+from emisor_lote import percentil
+from formato_vitales import FORMATOS, codificar
+
+BROKER = "localhost"
+PUERTO = 1883
+TEMA = "hospital/pacientes/{}/vitales"
+TEMA_TODOS = "hospital/pacientes/+/vitales"
+
+# Cada cuánto publica cada conexión la tanda que le toca
+TICK = 0.01
+# Mensajes que paho puede tener encolados por conexión antes de rechazar
+MAXIMO_ENCOLADOS = 20000
+# Mensajes QoS 1 sin PUBACK por conexión
+MAXIMO_EN_VUELO = 1000
+
+
+def generar_vitales(id_paciente, azar=random):
+    """Los mismos signos vitales que pulsera.py, para un paciente cualquiera."""
+    bpm = azar.randint(55, 110)
+    # Evento crítico aleatorio (10% de probabilidad): taquicardia
+    if azar.random() < 0.1:
+        bpm = azar.randint(150, 190)
+    return {
+        "id_paciente": id_paciente,
+        "timestamp": time.time(),
+        "bpm": bpm,
+        "spo2": azar.randint(90, 100),
+        "bateria": 85,
+    }
+
+
+class Metricas:
+    """Contadores compartidos por todas las conexiones (cada una suma los suyos)."""
+
+    def __init__(self):
+        self.candado = threading.Lock()
+        self.publicados = 0
+        self.confirmados = 0
+        self.rechazados = 0
+        self.latencias = []
+        self.recibidos = 0
+
+    def pendientes(self):
+        return self.publicados - self.confirmados - self.rechazados
+
+
+class Conexion:
+    """Una conexión MQTT que publica en nombre de muchas pulseras."""
+
+    def __init__(self, numero, pulseras, hz, qos, metricas, formato='json'):
+        self.pulseras = pulseras
+        self.formato = formato
+        self.intervalo = 1.0 / (hz * len(pulseras))
+        self.qos = qos
+        self.metricas = metricas
+        self.enviados_en = {}
+        self.termino = None
+        self.azar = random.Random(numero)
+        self.cliente = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"simulador-{numero}")
+        self.cliente.max_queued_messages_set(MAXIMO_ENCOLADOS)
+        self.cliente.max_inflight_messages_set(MAXIMO_EN_VUELO)
+        self.cliente.on_publish = self._al_confirmar
+
+    def _al_confirmar(self, cliente, userdata, mid, codigo, propiedades):
+        # QoS 0: el mensaje salió por el socket. QoS 1: llegó el PUBACK.
+        t0 = self.enviados_en.pop(mid, None)
+        with self.metricas.candado:
+            self.metricas.confirmados += 1
+            if t0 is not None and self.qos:
+                self.metricas.latencias.append(time.perf_counter() - t0)
+
+    def conectar(self, broker, puerto):
+        self.cliente.connect(broker, puerto, 60)
+        self.cliente.loop_start()
+
+    def publicar(self, segundos, detener):
+        """Publica round-robin entre sus pulseras: cada una sale a `hz` por segundo."""
+        cliente, pulseras, metricas = self.cliente, self.pulseras, self.metricas
+        cursor = 0
+        inicio = time.perf_counter()
+        while not detener.is_set():
+            ahora = time.perf_counter()
+            if ahora - inicio >= segundos:
+                break
+            debidos = int((ahora - inicio) / self.intervalo) - cursor
+            publicados = rechazados = 0
+            for _ in range(debidos):
+                id_paciente = pulseras[cursor % len(pulseras)]
+                cursor += 1
+                t0 = time.perf_counter()
+                info = cliente.publish(TEMA.format(id_paciente),
+                                       codificar(generar_vitales(id_paciente, self.azar), self.formato),
+                                       qos=self.qos)
+                publicados += 1
+                if info.rc == mqtt.MQTT_ERR_SUCCESS:
+                    if self.qos:
+                        self.enviados_en[info.mid] = t0
+                else:
+                    # Cola local llena o sin conexión: el mensaje se pierde
+                    rechazados += 1
+            with metricas.candado:
+                metricas.publicados += publicados
+                metricas.rechazados += rechazados
+            time.sleep(TICK)
+        self.termino = time.perf_counter()
+
+    def cerrar(self):
+        self.cliente.disconnect()
+        self.cliente.loop_stop()
+
+
+def verificador(broker, puerto, metricas):
+    """Suscriptor que cuenta lo que realmente entrega el broker."""
+    def al_recibir(cliente, userdata, msg):
+        metricas.recibidos += 1
+
+    cliente = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id="simulador-verificador")
+    cliente.on_message = al_recibir
+    cliente.connect(broker, puerto, 60)
+    cliente.subscribe(TEMA_TODOS)
+    cliente.loop_start()
+    return cliente
+
+
+def simular(broker, puerto, cantidad, hz, qos, conexiones, segundos, verificar=False, formato='json'):
+    metricas = Metricas()
+    ids = [f"{i:06d}" for i in range(1, cantidad + 1)]
+    conexiones = max(1, min(conexiones, cantidad))
+    grupos = [ids[i::conexiones] for i in range(conexiones)]
+    clientes = [Conexion(n, grupo, hz, qos, metricas, formato) for n, grupo in enumerate(grupos)]
+
+    suscriptor = verificador(broker, puerto, metricas) if verificar else None
+    for conexion in clientes:
+        conexion.conectar(broker, puerto)
+    time.sleep(0.5)
+
+    detener = threading.Event()
+    hilos = [threading.Thread(target=c.publicar, args=(segundos, detener), daemon=True) for c in clientes]
+    print(f"[+] {cantidad} pulseras x {hz} Hz = {cantidad * hz:,.0f} msg/s pedidos "
+          f"({conexiones} conexiones, QoS {qos}, {formato})")
+    t0 = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+
+    anterior = 0
+    try:
+        while any(hilo.is_alive() for hilo in hilos):
+            time.sleep(1)
+            publicados = metricas.publicados
+            print(f" -> {publicados - anterior:8,d} msg/s | pendientes {metricas.pendientes():7,d} | "
+                  f"rechazados {metricas.rechazados:,d}"
+                  + (f" | recibidos {metricas.recibidos:,d}" if verificar else ""))
+            anterior = publicados
+    except KeyboardInterrupt:
+        detener.set()
+    for hilo in hilos:
+        hilo.join()
+    duracion = max(c.termino for c in clientes) - t0
+
+    # Se espera a que se vacíen las colas antes de contar perdidos
+    limite = time.perf_counter() + 5
+    while metricas.pendientes() > 0 and time.perf_counter() < limite:
+        time.sleep(0.1)
+    if suscriptor:
+        time.sleep(1)
+        suscriptor.disconnect()
+        suscriptor.loop_stop()
+    for conexion in clientes:
+        conexion.cerrar()
+    return metricas, duracion
+
+
+def imprimir_resumen(metricas, duracion, pedidos, verificar):
+    print("-" * 40)
+    print(f"Duración:            {duracion:.1f} s")
+    print(f"Publicados:          {metricas.publicados:,d} ({metricas.publicados / duracion:,.0f} msg/s, "
+          f"pedidos {pedidos:,.0f})")
+    print(f"Confirmados:         {metricas.confirmados:,d}")
+    print(f"Rechazados (local):  {metricas.rechazados:,d}")
+    print(f"Sin confirmar:       {metricas.pendientes():,d}")
+    if metricas.latencias:
+        print(f"PUBACK p50 / p99:    {percentil(metricas.latencias, 50) * 1000:.2f} / "
+              f"{percentil(metricas.latencias, 99) * 1000:.2f} ms")
+    if verificar:
+        perdidos = metricas.confirmados - metricas.recibidos
+        print(f"Recibidos:           {metricas.recibidos:,d} (perdidos en el broker: {max(perdidos, 0):,d})")
+    print("-" * 40)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de carga MQTT: N pulseras virtuales")
+    parser.add_argument('--broker', default=BROKER)
+    parser.add_argument('--puerto', type=int, default=PUERTO)
+    parser.add_argument('--pulseras', type=int, default=1000)
+    parser.add_argument('--hz', type=float, default=1.0, help="Mensajes por segundo por pulsera")
+    parser.add_argument('--qos', type=int, choices=[0, 1], default=0)
+    parser.add_argument('--conexiones', type=int, default=4,
+                        help="Conexiones MQTT entre las que se reparten las pulseras")
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--formato', choices=FORMATOS, default='json',
+                        help="Payload JSON o binario (ver formato_vitales.py)")
+    parser.add_argument('--verificar', action='store_true',
+                        help="Suscribirse también y contar lo que entrega el broker")
+    parser.add_argument('--broker-embebido', action='store_true',
+                        help="Levantar broker_local.py en un proceso aparte")
+    args = parser.parse_args()
+
+    print("--- SIMULADOR DE PULSERAS (CARGA MQTT) ---")
+    broker = None
+    if args.broker_embebido:
+        broker = multiprocessing.Process(target=broker_local.iniciar,
+                                         args=('127.0.0.1', args.puerto), daemon=True)
+        broker.start()
+        time.sleep(0.5)
+
+    try:
+        metricas, duracion = simular(args.broker, args.puerto, args.pulseras, args.hz, args.qos,
+                                     args.conexiones, args.segundos, args.verificar, args.formato)
+        imprimir_resumen(metricas, duracion, args.pulseras * args.hz, args.verificar)
+    finally:
+        if broker:
+            broker.terminate()
+            broker.join()
+
+
+if __name__ == "__main__":
+    main()
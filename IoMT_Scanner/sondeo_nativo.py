@@ -0,0 +1,322 @@
+"""
+SONDEO NATIVO ARP / ICMP / TCP (sondeo_nativo.py)
+─────────────────────────────────────────────────
+El mismo "¿quién está vivo?" que `nmap -sn`, sin lanzar nmap: sockets
+crudos sobre asyncio, y cada host se entrega APENAS responde (nmap recién
+da el XML cuando terminó todo, y hay que parsearlo).
+
+Igual que nmap decide la sonda según dónde está el objetivo:
+
+    en un segmento local    ARP who-has por la interfaz (socket AF_PACKET):
+                            responde hasta lo que filtra ICMP, y trae la MAC
+    detrás de un router     ICMP echo (socket crudo) y TCP SYN a PUERTOS_TCP:
+                            un SYN-ACK o un RST alcanzan para saber que está
+
+Un solo hilo manda las sondas a ritmo fijo (--tasa) mientras los lectores
+de asyncio reciben; a quien no contestó se le reintenta después de
+`espera` segundos.
+
+Necesita root (o CAP_NET_RAW). Para probarlo en una sola máquina, sin
+tocar la red real: laboratorio_red.py arma un namespace con hosts de
+mentira del otro lado de un par veth.
+
+Uso:
+    sudo python sondeo_nativo.py 10.99.0.0/24 10.98.0.0/24
+    sudo python sondeo_nativo.py 192.168.1.0/24 --metodos arp --espera 0.5
+"""
+
+import argparse
+import asyncio
+import fcntl
+import ipaddress
+import os
+import random
+import socket
+import struct
+import time
+from collections import namedtuple
+
+METODOS = ("arp", "icmp", "tcp")
+PUERTOS_TCP = (80, 443)
+ESPERA = 1.0
+REINTENTOS = 1
+TASA = 5000
+
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891B
+SIOCGIFHWADDR = 0x8927
+ETH_P_ARP = 0x0806
+BROADCAST = b'\xff' * 6
+
+Respuesta = namedtuple("Respuesta", "ip mac metodo rtt")
+Interfaz = namedtuple("Interfaz", "nombre red ip mac")
+
+
+def _ioctl(s, codigo, nombre):
+    return fcntl.ioctl(s.fileno(), codigo, struct.pack('256s', nombre[:15].encode()))
+
+
+def interfaces_locales():
+    """Interfaces con IPv4 (menos loopback): su red, su IP y su MAC."""
+    salida = []
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        for _, nombre in socket.if_nameindex():
+            try:
+                ip = socket.inet_ntoa(_ioctl(s, SIOCGIFADDR, nombre)[20:24])
+                mascara = socket.inet_ntoa(_ioctl(s, SIOCGIFNETMASK, nombre)[20:24])
+                mac = _ioctl(s, SIOCGIFHWADDR, nombre)[18:24]
+            except OSError:
+                # Sin IPv4 o caída
+                continue
+            red = ipaddress.ip_interface(f"{ip}/{mascara}").network
+            if not red.is_loopback:
+                salida.append(Interfaz(nombre, red, ip, mac))
+    return salida
+
+
+def _suma_verificacion(datos):
+    if len(datos) % 2:
+        datos += b'\0'
+    total = sum(struct.unpack(f'!{len(datos) // 2}H', datos))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _mac_texto(mac):
+    return ':'.join(f'{b:02X}' for b in mac)
+
+
+def paquete_arp(interfaz, ip_destino):
+    return struct.pack('!6s6sHHHBBH6s4s6s4s', BROADCAST, interfaz.mac, ETH_P_ARP,
+                       1, 0x0800, 6, 4, 1, interfaz.mac, socket.inet_aton(interfaz.ip),
+                       b'\0' * 6, socket.inet_aton(ip_destino))
+
+
+def paquete_icmp(identificador, secuencia):
+    cabecera = struct.pack('!BBHHH', 8, 0, 0, identificador, secuencia)
+    carga = struct.pack('!d', time.time())
+    suma = _suma_verificacion(cabecera + carga)
+    return struct.pack('!BBHHH', 8, 0, suma, identificador, secuencia) + carga
+
+
+def paquete_syn(ip_origen, ip_destino, puerto_origen, puerto_destino, secuencia):
+    # Sin IP_HDRINCL: el kernel arma la cabecera IP, la suma TCP va con la pseudo-cabecera
+    cabecera = struct.pack('!HHIIBBHHH', puerto_origen, puerto_destino, secuencia, 0, 5 << 4, 0x02, 1024, 0, 0)
+    pseudo = socket.inet_aton(ip_origen) + socket.inet_aton(ip_destino) + struct.pack('!BBH', 0, 6, len(cabecera))
+    suma = _suma_verificacion(pseudo + cabecera)
+    return cabecera[:16] + struct.pack('!H', suma) + cabecera[18:]
+
+
+def expandir(objetivos):
+    """'10.0.0.0/24 10.0.1.5' o una lista de redes → lista de IPs (texto)."""
+    if isinstance(objetivos, (str, ipaddress.IPv4Network)):
+        objetivos = str(objetivos).replace(',', ' ').split()
+    ips = []
+    for objetivo in objetivos:
+        red = ipaddress.ip_network(objetivo, strict=False)
+        ips.extend(str(ip) for ip in (red.hosts() if red.num_addresses > 2 else red))
+    return ips
+
+
+def _ip_origen(ip_destino):
+    """La IP propia que el kernel usaría para llegar a ip_destino (connect de UDP no manda nada)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.connect((ip_destino, 9))
+        return s.getsockname()[0]
+
+
+class _Sondeo:
+    def __init__(self, ips, metodos, puertos, espera, reintentos, tasa):
+        self.metodos = metodos
+        self.puertos = set(puertos)
+        self.espera = espera
+        self.reintentos = reintentos
+        self.tasa = tasa
+        self.cola = asyncio.Queue()
+        self.objetivos = set(ips)
+        self.enviado = {}
+        self.vistos = set()
+        self.identificador = os.getpid() & 0xFFFF
+        self.puerto_origen = random.randint(40000, 60000)
+        self.sockets = []
+        self._lazo = asyncio.get_running_loop()
+
+        interfaces = interfaces_locales()
+        propias = {i.ip: i for i in interfaces}
+        self.por_arp, self.remotos = {}, []
+        for ip in ips:
+            if ip in propias:
+                # La propia máquina está viva (nmap también la lista)
+                self._encontrado(ip, _mac_texto(propias[ip].mac), "local")
+                continue
+            direccion = ipaddress.ip_address(ip)
+            interfaz = next((i for i in interfaces if direccion in i.red), None)
+            if interfaz is not None and "arp" in metodos:
+                self.por_arp.setdefault(interfaz, []).append(ip)
+            elif "icmp" in metodos or "tcp" in metodos:
+                self.remotos.append(ip)
+
+    # --- RECEPCIÓN ---
+
+    def _encontrado(self, ip, mac, metodo):
+        if ip in self.vistos or ip not in self.objetivos:
+            return
+        self.vistos.add(ip)
+        rtt = time.monotonic() - self.enviado[ip] if ip in self.enviado else 0.0
+        self.cola.put_nowait(Respuesta(ip, mac, metodo, rtt))
+
+    def _leer(self, sock, procesar):
+        while True:
+            try:
+                datos = sock.recv(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            procesar(datos)
+
+    def _procesar_arp(self, datos):
+        if len(datos) >= 42 and datos[12:14] == b'\x08\x06' and datos[20:22] == b'\x00\x02':
+            self._encontrado(socket.inet_ntoa(datos[28:32]), _mac_texto(datos[22:28]), "arp")
+
+    def _procesar_icmp(self, datos):
+        largo_ip = (datos[0] & 0x0F) * 4
+        if len(datos) >= largo_ip + 8 and datos[largo_ip] == 0:
+            if struct.unpack_from('!H', datos, largo_ip + 4)[0] == self.identificador:
+                self._encontrado(socket.inet_ntoa(datos[12:16]), None, "icmp")
+
+    def _procesar_tcp(self, datos):
+        largo_ip = (datos[0] & 0x0F) * 4
+        if len(datos) < largo_ip + 14:
+            return
+        origen, destino = struct.unpack_from('!HH', datos, largo_ip)
+        banderas = datos[largo_ip + 13]
+        # SYN-ACK (abierto) o RST (cerrado): en los dos casos el host está
+        if destino == self.puerto_origen and origen in self.puertos and (banderas & 0x12 == 0x12 or banderas & 0x04):
+            self._encontrado(socket.inet_ntoa(datos[12:16]), None, "tcp")
+
+    def _abrir(self, sock, procesar):
+        sock.setblocking(False)
+        self.sockets.append(sock)
+        self._lazo.add_reader(sock.fileno(), self._leer, sock, procesar)
+        return sock
+
+    def abrir(self):
+        self.arp = {}
+        for interfaz in self.por_arp:
+            sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+            sock.bind((interfaz.nombre, ETH_P_ARP))
+            self.arp[interfaz] = self._abrir(sock, self._procesar_arp)
+        self.icmp = self.tcp = None
+        if self.remotos and "icmp" in self.metodos:
+            self.icmp = self._abrir(socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP),
+                                    self._procesar_icmp)
+        if self.remotos and "tcp" in self.metodos:
+            self.tcp = self._abrir(socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP),
+                                   self._procesar_tcp)
+            self.origenes = {}
+
+    def cerrar(self):
+        for sock in self.sockets:
+            self._lazo.remove_reader(sock.fileno())
+            sock.close()
+
+    # --- ENVÍO ---
+
+    async def _mandar(self, sock, paquete, destino=None):
+        while True:
+            try:
+                if destino is None:
+                    sock.send(paquete)
+                else:
+                    sock.sendto(paquete, destino)
+                return
+            except (BlockingIOError, InterruptedError):
+                await asyncio.sleep(0.001)
+            except OSError:
+                # Sin ruta, etc.: ese objetivo queda sin respuesta
+                return
+
+    def _sondas(self):
+        """(ip, [(socket, paquete, destino)]) para los que todavía no contestaron."""
+        for interfaz, ips in self.por_arp.items():
+            for ip in ips:
+                if ip not in self.vistos:
+                    yield ip, [(self.arp[interfaz], paquete_arp(interfaz, ip), None)]
+        for secuencia, ip in enumerate(self.remotos):
+            if ip in self.vistos:
+                continue
+            sondas = []
+            if self.icmp is not None:
+                sondas.append((self.icmp, paquete_icmp(self.identificador, secuencia & 0xFFFF), (ip, 0)))
+            if self.tcp is not None:
+                origen = self.origenes.get(ip)
+                if origen is None:
+                    try:
+                        origen = self.origenes[ip] = _ip_origen(ip)
+                    except OSError:
+                        continue
+                for puerto in self.puertos:
+                    syn = paquete_syn(origen, ip, self.puerto_origen, puerto, random.getrandbits(32))
+                    sondas.append((self.tcp, syn, (ip, 0)))
+            yield ip, sondas
+
+    async def enviar(self):
+        lote = max(1, self.tasa // 100)
+        for ronda in range(self.reintentos + 1):
+            inicio, enviados = time.monotonic(), 0
+            for ip, sondas in self._sondas():
+                self.enviado.setdefault(ip, time.monotonic())
+                for sock, paquete, destino in sondas:
+                    await self._mandar(sock, paquete, destino)
+                    enviados += 1
+                    if enviados % lote == 0:
+                        # Ritmo fijo: no inundar el segmento ni la tabla ARP del switch
+                        await asyncio.sleep(max(0.0, inicio + enviados / self.tasa - time.monotonic()))
+            # Esperar respuestas (cortando antes si ya contestaron todos)
+            limite = time.monotonic() + self.espera
+            while time.monotonic() < limite and len(self.vistos) < len(self.objetivos):
+                await asyncio.sleep(min(0.05, self.espera))
+            if len(self.vistos) >= len(self.objetivos):
+                break
+        self.cola.put_nowait(None)
+
+
+async def barrer(objetivos, metodos=METODOS, puertos=PUERTOS_TCP, espera=ESPERA, reintentos=REINTENTOS,
+                 tasa=TASA):
+    """Generador asíncrono de Respuesta(ip, mac, metodo, rtt), en el orden en que contestan."""
+    sondeo = _Sondeo(expandir(objetivos), metodos, puertos, espera, reintentos, tasa)
+    sondeo.abrir()
+    envio = asyncio.ensure_future(sondeo.enviar())
+    try:
+        while True:
+            respuesta = await sondeo.cola.get()
+            if respuesta is None:
+                return
+            yield respuesta
+    finally:
+        envio.cancel()
+        sondeo.cerrar()
+
+
+async def _main(args):
+    inicio = time.perf_counter()
+    cantidad = 0
+    async for r in barrer(args.objetivos, args.metodos, args.puertos, args.espera, args.reintentos, args.tasa):
+        cantidad += 1
+        print(f"{r.ip:<16} {r.mac or '-':<18} {r.metodo:<5} {r.rtt * 1000:7.1f} ms "
+              f"(a los {time.perf_counter() - inicio:.2f} s)")
+    print(f"{cantidad} hosts vivos en {time.perf_counter() - inicio:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Descubrimiento de hosts con sockets crudos (ARP/ICMP/TCP)")
+    parser.add_argument('objetivos', nargs='+', help="Redes o IPs")
+    parser.add_argument('--metodos', nargs='+', choices=METODOS, default=list(METODOS))
+    parser.add_argument('--puertos', type=int, nargs='+', default=list(PUERTOS_TCP), help="Puertos del SYN")
+    parser.add_argument('--espera', type=float, default=ESPERA, help="Segundos de espera por ronda")
+    parser.add_argument('--reintentos', type=int, default=REINTENTOS)
+    parser.add_argument('--tasa', type=int, default=TASA, help="Sondas por segundo")
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except PermissionError:
+        print("Error: los sockets crudos necesitan root (o CAP_NET_RAW).")
@@ -0,0 +1,78 @@
+"""
+LISTENERS MULTIPROCESO (trabajadores.py)
+────────────────────────────────────────
+Un solo proceso Python usa un solo núcleo (por el GIL), aunque cada
+mensaje HL7 sea independiente. Con SO_REUSEPORT varios procesos pueden
+hacer bind() al MISMO puerto y el kernel reparte las conexiones nuevas
+entre ellos.
+
+    ┌──────────┐        ┌─► trabajador 1 (bind :6661)
+    │  kernel  │ ───────┼─► trabajador 2 (bind :6661)
+    └──────────┘        └─► trabajador N (bind :6661)
+
+Los ACK necesitan un control ID único. Como cada trabajador es un proceso
+aparte, el contador vive en memoria compartida (multiprocessing.Value) y
+se incrementa con su lock: dos trabajadores nunca obtienen el mismo número.
+
+Los trabajadores se crean SIEMPRE con fork (no con el método por defecto,
+que desde Python 3.14 en Linux es forkserver): heredan el contexto TLS ya
+armado, con la llave de tickets compartida, y la configuración del módulo
+que fijó el padre. Nada de eso se puede picklear para un spawn.
+"""
+
+import datetime
+import multiprocessing
+import signal
+import socket
+import sys
+
+
+class GeneradorIdControl:
+    def __init__(self, prefijo='ACK'):
+        # El sello de arranque evita repetir IDs entre reinicios del servidor
+        self._base = prefijo + datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        self._contador = multiprocessing.Value('Q', 0)
+
+    def siguiente(self):
+        with self._contador.get_lock():
+            self._contador.value += 1
+            numero = self._contador.value
+        return f"{self._base}-{numero}"
+
+
+def crear_socket_escucha(host, puerto, reuse_port=False, backlog=128):
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            s.close()
+            raise OSError("Este sistema operativo no soporta SO_REUSEPORT")
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    s.bind((host, puerto))
+    s.listen(backlog)
+    return s
+
+
+def lanzar_trabajadores(cantidad, objetivo, *args):
+    """
+    Arranca `cantidad` procesos que ejecutan objetivo(numero, *args) y
+    espera a que terminen. Ctrl+C (o un SIGTERM al padre) los apaga a todos.
+    """
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    contexto = multiprocessing.get_context('fork')
+    procesos = []
+    for numero in range(1, cantidad + 1):
+        p = contexto.Process(target=objetivo, args=(numero, *args), daemon=True)
+        p.start()
+        procesos.append(p)
+    print(f"[.] {cantidad} trabajadores escuchando (SO_REUSEPORT).")
+
+    try:
+        for p in procesos:
+            p.join()
+    finally:
+        for p in procesos:
+            if p.is_alive():
+                p.terminate()
+        for p in procesos:
+            p.join()
@@ -1,8 +1,12 @@
-import nmap
+import argparse
 import json
 import os
+import sys
 import datetime
 
+from descubrimiento_red import (PREFIJO_FRAGMENTO, TRABAJADORES, BackendNmap, agregar_argumentos,
+                                 backend_desde_argumentos, descubrir)
+
 # --- CONFIGURACIÓN ---
 RED_OBJETIVO = "192.168.1.0/24"
 ARCHIVO_WHITELIST = "whitelist.json"
@@ -19,29 +23,41 @@ def guardar_whitelist(dispositivos):
         json.dump(dispositivos, f, indent=4)
     print(f"\n[INFO] Lista blanca guardada con {len(dispositivos)} dispositivos.")
 
-def escanear_red():
-    nm = nmap.PortScanner()
-    print(f"--- Escaneando {RED_OBJETIVO} ... ---")
-    nm.scan(hosts=RED_OBJETIVO, arguments='-sn')
-    
-    # Convertimos el resultado complejo de nmap a un diccionario simple:
+def escanear_red(red=RED_OBJETIVO, backend=None, trabajadores=TRABAJADORES, prefijo=PREFIJO_FRAGMENTO):
+    print(f"--- Escaneando {red} ... ---")
+    # Por fragmentos, varios a la vez (nmap o --motor nativo, ver descubrimiento_red.py)
+    hosts, fallidos = descubrir(red, backend or BackendNmap(), trabajadores, prefijo)
+    for fragmento, error in fallidos:
+        print(f"[AVISO] No se pudo escanear {fragmento}: {error}")
+    if fallidos and not hosts:
+        # Nada escaneado (p. ej. no está nmap): mejor fallar que entrenar
+        # una lista blanca vacía o declarar la red segura
+        raise fallidos[0][1]
+    # Con fallas parciales se sigue (los intrusos que SÍ se vieron importan),
+    # pero el llamador tiene que saber que la red no se vio entera
+
+    # Convertimos el resultado a un diccionario simple:
     # { 'MAC_ADDRESS': 'IP_ADDRESS' }
     resultado = {}
-    for host in nm.all_hosts():
-        if 'mac' in nm[host]['addresses']:
-            mac = nm[host]['addresses']['mac']
-            resultado[mac] = host
+    for host, datos in hosts.items():
+        if datos["mac"]:
+            resultado[datos["mac"]] = host
         else:
             # Si es la propia máquina (localhost), a veces no da MAC. Usamos una fake.
             if host == "192.168.1.75": # Tu IP local
                  resultado["00:00:00:00:00:00"] = host
-            
-    return resultado
+
+    return resultado, fallidos
 
 # --- LÓGICA PRINCIPAL ---
 def main():
+    parser = argparse.ArgumentParser(description="Vigilante: alerta de dispositivos fuera de la lista blanca")
+    agregar_argumentos(parser, RED_OBJETIVO)
+    args = parser.parse_args()
+
     # 1. Escanear la red actual
-    dispositivos_actuales = escanear_red()
+    dispositivos_actuales, fallidos = escanear_red(args.red, backend_desde_argumentos(args),
+                                                   args.trabajadores, args.prefijo)
     
     # 2. Cargar la memoria (Whitelist)
     whitelist = cargar_whitelist()
@@ -49,6 +65,11 @@ def main():
     # CASO A: Primera ejecución (Entrenamiento)
     if whitelist is None:
         print("\n[MODO ENTRENAMIENTO]")
+        if fallidos:
+            # Una lista blanca de media red haría saltar como intrusos a
+            # todos los equipos legítimos de los fragmentos que faltaron
+            print(f"[ERROR] {len(fallidos)} fragmento(s) sin escanear: no se guarda la lista blanca.")
+            return 1
         print("No se encontró base de datos. Asumiendo que la red actual es segura.")
         guardar_whitelist(dispositivos_actuales)
     
@@ -69,8 +90,14 @@ def main():
             for ip, mac in intrusos:
                 print(f" -> IP: {ip} | MAC: {mac}")
                 # Aquí podrías agregar código para enviar un email o bloquear el puerto
+        elif fallidos:
+            # Sin intrusos en lo escaneado, pero no se vio toda la red
+            print(f"\n[!] Sin intrusos en lo escaneado, pero {len(fallidos)} fragmento(s) fallaron: "
+                  f"no se puede declarar la red segura.")
         else:
             print("\n[OK] Red segura. No hay dispositivos nuevos.")
+    # Escaneo incompleto → código de salida distinto de cero (para cron/alertas)
+    return 1 if fallidos else 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file